@@ -1,10 +1,13 @@
 # app/event_handlers.py
 import subprocess
 import csv
+import os
 from tkinter import messagebox, Menu, filedialog
 
 from ui_components import DetailsWindow
 from printer_utils import WindowsPrinterManager
+from export_sinks import open_sink, SINK_FILETYPES
+from .ui_manager import STREAM_BUTTON_TEXT
 
 
 class EventHandlers:
@@ -32,9 +35,9 @@ class EventHandlers:
         context_menu.add_command(label=f"Copiar IP ({ip})", 
                                 command=lambda: self.copy_to_clipboard(ip))
         
-        if device_data.get('mac'):
-            context_menu.add_command(label=f"Copiar MAC ({device_data['mac']})", 
-                                    command=lambda: self.copy_to_clipboard(device_data['mac']))
+        if device_data.mac:
+            context_menu.add_command(label=f"Copiar MAC ({device_data.mac})", 
+                                    command=lambda: self.copy_to_clipboard(device_data.mac))
         
         # Adiciona opções de impressora se aplicável
         self._add_printer_options(context_menu, device_data, ip)
@@ -43,10 +46,10 @@ class EventHandlers:
 
     def _add_printer_options(self, context_menu, device_data, ip):
         """Adiciona opções de impressora ao menu de contexto."""
-        if (device_data.get('type') == 'shared_printer' and 
-            device_data.get('shared_printers')):
+        if (device_data.type == 'shared_printer' and 
+            device_data.shared_printers):
             context_menu.add_separator()
-            for printer in device_data['shared_printers']:
+            for printer in device_data.shared_printers:
                 share_name = printer.get('ShareName')
                 full_path = f"\\\\{ip}\\{share_name}"
                 context_menu.add_command(
@@ -92,7 +95,42 @@ class EventHandlers:
         """Abre a janela de detalhes para um IP específico."""
         device_data = self.app.device_details.get(ip)
         if device_data:
-            DetailsWindow(self.app, device_data)
+            # O detalhe completo só é lido do arquivo de blobs agora
+            DetailsWindow(self.app, device_data, self._scan_detail(ip))
+
+    def _scan_detail(self, ip):
+        """Detalhe do host no arquivo de blobs do scan atual (None sem arquivo)."""
+        store = self.app.details_store
+        return store.get(ip) if store is not None else None
+
+    def toggle_export_sink(self):
+        """Anexa um arquivo que recebe cada resultado durante o scan, ou desanexa o atual."""
+        sink = self.app.export_sink
+        if sink is not None:
+            self.app.export_sink = None
+            sink.close()
+            self.app.ui_manager.stream_button.configure(text=STREAM_BUTTON_TEXT)
+            self.app.ui_manager.status_label.configure(
+                text=f"Exportação encerrada: {sink.written} hosts em {sink.path}"
+            )
+            return
+        
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=".jsonl",
+            filetypes=SINK_FILETYPES + [("All files", "*.*")],
+            title="Exportar resultados durante o scan"
+        )
+        if not filepath:
+            return
+        
+        sink = open_sink(filepath, details=self._scan_detail)
+        if sink is None:
+            messagebox.showerror("Erro na Exportação",
+                               f"Não foi possível abrir para exportação:\n{filepath}\n\n"
+                               "Use .csv, .jsonl ou .db/.sqlite.")
+            return
+        self.app.export_sink = sink
+        self.app.ui_manager.stream_button.configure(text=f"📡 Exportando ({os.path.basename(filepath)})")
 
     def export_csv(self):
         """Exporta os resultados para um arquivo CSV."""
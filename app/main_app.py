@@ -3,6 +3,10 @@ import customtkinter as ctk
 from tkinter import ttk
 from queue import Queue
 
+from result_store import ResultStore
+from inventory_db import open_inventory
+from scan_client import server_url_from_env
+from scan_jobs import ScanJobManager
 from .ui_manager import UIManager
 from .scanner import Scanner
 from .event_handlers import EventHandlers
@@ -26,15 +30,22 @@ class NetworkScannerApp(ctk.CTk):
         # Variáveis de estado
         self.queue = Queue()
         self.scanning = False
-        self.cancel_flag = False
         self.device_details = {}
-        self.completed_count = 0
+        self.results = ResultStore()
+        self.details_store = None
+        self.export_sink = None
+        self.inventory = open_inventory()
+        # Modo cliente: com PRINTER_FINDER_SERVER definido, os scans rodam no servidor
+        self.server_url = server_url_from_env()
         self.ip_list = []
         
         # Inicializar componentes
         self.setup_styles()
         self.ui_manager = UIManager(self)
         self.scanner = Scanner(self)
+        # Pool compartilhado pelos scans simultâneos da interface
+        self.job_manager = ScanJobManager(self.inventory, scan_function=self.scanner.scan_single_ip,
+                                          keep_results=False)
         self.event_handlers = EventHandlers(self)
         
         # Configurar a UI
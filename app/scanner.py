@@ -1,197 +1,281 @@
 # app/scanner.py
 import threading
-import ipaddress
+import time
 from queue import Empty
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from tkinter import messagebox
 
-from network_utils import get_nmap_scan_data, detect_device_type, get_device_vendor_info
-from printer_utils import get_windows_shared_printers, WindowsPrinterManager
+from printer_utils import WindowsPrinterManager
+from scan_pipeline import scan_host, parse_ip_range
+from blob_store import open_scan_store
+from scan_jobs import ScanJob
+from scan_policy import ScanPolicy, DeltaScanPolicy, DeadlineScanPolicy
+from scan_client import ScanClient
+from device_record import DeviceRecord
+from .ui_manager import STREAM_BUTTON_TEXT
+
+
+# Fila de resultados: tempo máximo por quadro e limite de linhas inseridas por quadro
+QUEUE_FRAME_BUDGET = 0.015
+QUEUE_BATCH_LIMIT = 500
+QUEUE_POLL_MS = 50
+
+ACTIVE_CATEGORY = "💻 Dispositivos Ativos"
+PRINTER_CATEGORY = "🖨️ Impressoras Encontradas"
 
 
 class Scanner:
     def __init__(self, app):
         self.app = app
-        
+        # Scans da leva atual (iniciados enquanto outro ainda rodava), na ordem de início
+        self.jobs = []
+
     def start_scan(self):
-        """Inicia o processo de scanning."""
-        if self.app.scanning:
-            return
-            
+        """Inicia um scan; pode ser chamado com outros scans em andamento."""
         ip_range_str = self.app.ui_manager.ip_entry.get().strip()
         if not ip_range_str:
             messagebox.showerror("Erro", "Por favor, digite um IP ou intervalo de IPs.")
             return
-        
+
         try:
             self.app.ip_list = self._parse_ip_range(ip_range_str)
         except ValueError as e:
-            messagebox.showerror("Erro de Formato", 
+            messagebox.showerror("Erro de Formato",
                                f"Formato de IP ou intervalo inválido: {e}\n"
-                               "Use '192.168.0.1' ou '192.168.0.1-255'.")
+                               "Use '192.168.0.1', '192.168.0.1-255' ou '192.168.0.0/24'.")
             return
-        
-        self._initialize_scan()
-        
+
+        deadline_text = self.app.ui_manager.deadline_entry.get().strip().replace(',', '.')
+        if deadline_text:
+            try:
+                seconds = float(deadline_text)
+            except ValueError:
+                seconds = 0
+            if seconds <= 0:
+                messagebox.showerror("Erro de Formato", "Prazo inválido: informe os segundos (ex: 30).")
+                return
+            policy = DeadlineScanPolicy(seconds)
+        elif self.app.ui_manager.delta_var.get() and self.app.inventory is not None:
+            policy = DeltaScanPolicy(self.app.inventory)
+        else:
+            policy = ScanPolicy()
+        self._initialize_scan(ip_range_str, self.app.ip_list, policy)
+
     def _parse_ip_range(self, ip_range_str):
         """Converte string de IP/range em lista de IPs."""
-        if "-" in ip_range_str:
-            parts = ip_range_str.split("-")
-            if len(parts) != 2:
-                raise ValueError("Formato de intervalo incorreto.")
-            
-            start_ip_str = parts[0].strip()
-            end_ip_str = parts[1].strip()
-
-            start_ip = ipaddress.IPv4Address(start_ip_str)
-            
-            # Se o IP final for apenas o último octeto
-            if len(end_ip_str.split('.')) == 1:
-                end_ip_str = ".".join(start_ip_str.split('.')[:-1] + [end_ip_str])
-            
-            end_ip = ipaddress.IPv4Address(end_ip_str)
-
-            if end_ip < start_ip:
-                raise ValueError("O IP final do intervalo deve ser maior que o IP inicial.")
-                
-            return [str(ipaddress.IPv4Address(ip)) for ip in range(int(start_ip), int(end_ip) + 1)]
-        else:
-            return [str(ipaddress.IPv4Address(ip_range_str))]
-            
-    def _initialize_scan(self):
-        """Inicializa as variáveis e inicia o thread de scanning."""
-        self.app.ui_manager.clear_results()
-        self.app.scanning = True
-        self.app.cancel_flag = False
-        self.app.completed_count = 0
-        self.app.ui_manager.update_ui_state(scanning=True)
-        
-        threading.Thread(target=self.run_scan_in_parallel, daemon=True).start()
-        self.app.after(100, self.update_progress)
-        self.app.after(100, self.process_queue)
+        return parse_ip_range(ip_range_str)
+
+    def _initialize_scan(self, target, ips, policy):
+        """
+        Inicia um scan. O primeiro de uma leva limpa os resultados anteriores;
+        os seguintes somam os seus aos que já estão na tela.
+        """
+        if not self.app.scanning:
+            self.app.ui_manager.clear_results()
+            self.app.ui_manager.clear_job_rows()
+            self.jobs = []
+            if self.app.details_store is not None:
+                self.app.details_store.close()
+            self.app.details_store = open_scan_store() if not self.app.server_url else None
+            self.app.scanning = True
+            self.app.ui_manager.update_ui_state(scanning=True)
+            self.app.after(100, self.update_progress)
+            self.app.after(100, self.process_queue)
+
+        job = self.run_scan_in_parallel(target, ips, policy)
+        self.jobs.append(job)
+        self.app.ui_manager.add_job_row(job)
 
     def cancel_scan(self):
-        """Cancela o scanning em andamento."""
+        """Cancela todos os scans em andamento."""
         if self.app.scanning:
-            self.app.cancel_flag = True
+            for job in self.jobs:
+                job.cancel()
             self.app.ui_manager.status_label.configure(text="Cancelando scan...")
             self.app.ui_manager.cancel_button.configure(state="disabled")
 
-    def run_scan_in_parallel(self):
-        """Executa o scanning em paralelo usando ThreadPoolExecutor."""
-        with ThreadPoolExecutor(max_workers=20) as executor:
-            future_to_ip = {executor.submit(self.scan_single_ip, ip): ip 
-                           for ip in self.app.ip_list}
-            
-            for future in as_completed(future_to_ip):
-                if self.app.cancel_flag:
+    def cancel_job(self, job):
+        """Cancela um scan; os demais continuam."""
+        job.cancel()
+        self.app.ui_manager.update_job_rows()
+
+    def run_scan_in_parallel(self, target, ips, policy):
+        """
+        Envia um scan ao pool compartilhado de workers (app.job_manager).
+
+        Os scans simultâneos são atendidos em rodízio pelos mesmos workers e
+        compartilham os caches; a política (policy) escolhe quais IPs agendar
+        e como escanear cada um. Com um servidor configurado, o scan é
+        delegado a ele.
+
+        Returns:
+            ScanJob: Job com o progresso e os resultados do scan
+        """
+        if self.app.server_url:
+            job = ScanJob(0, target, ips, policy)
+            threading.Thread(target=self._run_remote_scan, args=(job,), daemon=True).start()
+            return job
+        return self.app.job_manager.submit(target, ips, policy, listener=self._deliver, on_done=self._job_done)
+
+    def _deliver(self, job, result):
+        """Entrega um resultado (na thread do worker): exportação incremental primeiro, depois a interface."""
+        sink = self.app.export_sink
+        if sink is not None:
+            sink.write(result['data'])
+        self.app.queue.put(("result", result))
+
+    def _job_done(self, job):
+        self.app.queue.put(("done", job))
+
+    def _run_remote_scan(self, job):
+        """Envia o scan ao servidor (modo cliente) e repassa os resultados do fluxo de eventos."""
+        client = ScanClient(self.app.server_url)
+        job.status = 'running'
+        try:
+            deadline = job.policy.seconds if isinstance(job.policy, DeadlineScanPolicy) else None
+            remote = client.submit(job.target, delta=isinstance(job.policy, DeltaScanPolicy), deadline=deadline)
+            job.id = remote['id']
+            job.total = remote['total']
+            for event, data in client.events(job.id):
+                if job.cancelled:
+                    client.cancel(job.id)
                     break
-                try:
-                    result = future.result()
-                    if result:
-                        self.app.queue.put(("result", result))
-                except Exception as e:
-                    print(f"Erro ao processar o futuro: {e}")
-                finally:
-                    self.app.completed_count += 1
-                    
-        completion_msg = "Scan cancelado." if self.app.cancel_flag else "Scan finalizado!"
-        self.app.queue.put(("done", completion_msg))
+                job.total = data.get('total', job.total)
+                job.completed = data.get('completed', job.completed)
+                if event == 'host':
+                    record = DeviceRecord.from_dict(data['host'])
+                    job._add_result(record)
+                    self._deliver(job, {"is_printer": record.is_printer, "data": record})
+                elif event == 'done':
+                    job.message = data.get('message', '')
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Erro no scan pelo servidor {self.app.server_url}: {e}")
+            job.message = f"Falha no servidor {self.app.server_url}: {e}"
+        job.finished = time.time()
+        job.status = 'cancelled' if job.cancelled else 'done'
+        self._job_done(job)
 
     def update_progress(self):
-        """Atualiza a barra de progresso."""
+        """Atualiza a barra de progresso com a soma dos scans da leva."""
         if self.app.scanning:
-            total_ips = len(self.app.ip_list)
-            progress_pct = (self.app.completed_count / total_ips) * 100 if total_ips > 0 else 0
+            completed = sum(job.completed for job in self.jobs)
+            total_ips = sum(job.total for job in self.jobs)
+            progress_pct = (completed / total_ips) * 100 if total_ips > 0 else 0
             self.app.ui_manager.progress['value'] = progress_pct
-            self.app.ui_manager.status_label.configure(
-                text=f"🔍 Escaneando... {self.app.completed_count}/{total_ips} IPs verificados."
-            )
+            text = f"🔍 Escaneando... {completed}/{total_ips} IPs verificados."
+            running = sum(1 for job in self.jobs if job.active)
+            if running > 1:
+                text += f" ({running} scans em andamento)"
+            self.app.ui_manager.status_label.configure(text=text)
+            self.app.ui_manager.update_job_rows()
             self.app.after(200, self.update_progress)
 
-    def scan_single_ip(self, ip: str):
-        """Escaneia um único IP e retorna os dados encontrados."""
-        if self.app.cancel_flag:
-            return None
-            
-        nmap_data = get_nmap_scan_data(ip)
-        if not nmap_data:
-            return None
-
-        # Obtém informações básicas do dispositivo
-        vendor_info = get_device_vendor_info(nmap_data)
-        device_type, status_display = detect_device_type(nmap_data, ip)
-        
-        full_data = {
-            'ip': ip,
-            'hostname': nmap_data.get('hostnames', [{}])[0].get('name', ''),
-            'mac': vendor_info['mac'],
-            'vendor': vendor_info['vendor'],
-            'status': nmap_data.get('status', {}),
-            'tcp': nmap_data.get('tcp', {}),
-            'type': device_type,
-            'simple_status': status_display,
-            'shared_printers': []
-        }
-
-        # Se for impressora compartilhada, obtém detalhes das impressoras
-        is_printer = device_type in ['network_printer', 'shared_printer']
-        if device_type == 'shared_printer':
-            shared_printers = get_windows_shared_printers(ip)
-            if shared_printers:
-                full_data['shared_printers'] = shared_printers
-                # Atualiza o status com nome mais descritivo da primeira impressora
-                printer_display = WindowsPrinterManager.get_printer_display_name(shared_printers[0])
-                full_data['simple_status'] = f"Compartilhando: {printer_display}"
-
-        return {"is_printer": is_printer, "data": full_data}
-
-
+    def scan_single_ip(self, ip: str, deadline=None):
+        """Escaneia um único IP e retorna os dados encontrados (deadline: prazo do scan com prazo)."""
+        return scan_host(ip, self.app.details_store, deadline)
 
     def process_queue(self):
-        """Processa a fila de resultados do scanning."""
-        try:
-            msg_type, data = self.app.queue.get_nowait()
-            
+        """
+        Processa a fila de resultados do scanning.
+
+        A cada quadro esvazia a fila até QUEUE_FRAME_BUDGET segundos ou
+        QUEUE_BATCH_LIMIT resultados e insere tudo de uma vez. Se ainda houver
+        mensagens pendentes, o próximo quadro é agendado imediatamente.
+        """
+        deadline = time.perf_counter() + QUEUE_FRAME_BUDGET
+        results = []
+        finished_jobs = []
+        while len(results) < QUEUE_BATCH_LIMIT and time.perf_counter() < deadline:
+            try:
+                msg_type, data = self.app.queue.get_nowait()
+            except Empty:
+                break
             if msg_type == "result":
-                self._process_scan_result(data)
+                results.append(data)
             elif msg_type == "done":
-                self._finalize_scan(data)
-                return
-                
-        except Empty:
-            pass
-            
+                finished_jobs.append(data)
+
+        if results:
+            self._process_scan_results(results)
+        for job in finished_jobs:
+            self._job_finished(job)
+
         if self.app.scanning:
-            self.app.after(50, self.process_queue)
-            
+            self.app.after(1 if not self.app.queue.empty() else QUEUE_POLL_MS, self.process_queue)
+
     def _process_scan_result(self, data):
         """Processa um resultado individual do scan."""
-        is_printer = data['is_printer']
-        device_data = data['data']
-        ip = device_data['ip']
-        
-        self.app.device_details[ip] = device_data
-
-        # Adiciona aos dispositivos ativos
-        values_active = (ip, device_data['hostname'], device_data['mac'], device_data['simple_status'])
-        self.app.ui_manager.collapsible_frames["💻 Dispositivos Ativos"].add_entry(values_active)
-        self.app.ui_manager.data_to_export["💻 Dispositivos Ativos"].append(values_active)
-
-        # Se for impressora, adiciona também à categoria de impressoras
-        if is_printer:
-            values_printer = (ip, device_data['hostname'], device_data['mac'], device_data['simple_status'])
-            self.app.ui_manager.collapsible_frames["🖨️ Impressoras Encontradas"].add_entry(values_printer)
-            self.app.ui_manager.data_to_export["🖨️ Impressoras Encontradas"].append(values_printer)
+        self._process_scan_results([data])
+
+    def _process_scan_results(self, results):
+        """Processa um lote de resultados: uma inserção e uma atualização de cabeçalho por categoria."""
+        active_rows = []
+        printer_rows = []
+        for data in results:
+            record = data['data']
+            # Faixas sobrepostas: o mesmo IP chega de mais de um scan, mas entra uma vez na tabela
+            if record.ip in self.app.device_details:
+                self.app.device_details[record.ip] = record
+                self.app.results.add(record)
+                continue
+            self.app.device_details[record.ip] = record
+            self.app.results.add(record)
+
+            values = (record.ip, record.hostname, record.mac, record.simple_status)
+            active_rows.append(values)
+            # Se for impressora, adiciona também à categoria de impressoras
+            if data['is_printer']:
+                printer_rows.append(values)
+
+        for category, rows in ((ACTIVE_CATEGORY, active_rows), (PRINTER_CATEGORY, printer_rows)):
+            if rows:
+                self.app.ui_manager.collapsible_frames[category].add_entries(rows)
+                self.app.ui_manager.data_to_export[category].extend(rows)
+
+        # Com um filtro ativo, os hosts novos precisam passar pela consulta
+        if self.app.ui_manager.filter_text or self.app.ui_manager.job_filter is not None:
+            self.app.ui_manager.refresh_filter()
+
+    def _job_finished(self, job):
+        """Um scan da leva terminou; a leva termina quando não resta nenhum ativo."""
+        self.app.ui_manager.update_job_rows()
+        if any(other.active for other in self.jobs):
+            state = {'cancelled': "cancelado", 'failed': "falhou"}.get(job.status, "finalizado")
+            self.app.ui_manager.status_label.configure(
+                text=f"Scan #{job.id} ({job.target}) {state}. {job.message}".rstrip())
+            return
+        self._finalize_scan(self._completion_message())
+
+    def _completion_message(self):
+        cancelled = all(job.status == 'cancelled' for job in self.jobs)
+        message = "Scan cancelado." if cancelled else "Scan finalizado!"
+        if len(self.jobs) == 1:
+            details = [self.jobs[0].message]
+        else:
+            details = [f"#{job.id}: {job.message}" for job in self.jobs if job.message]
+        return " ".join([message] + [detail for detail in details if detail])
 
     def _finalize_scan(self, message):
         """Finaliza o processo de scanning."""
+        WindowsPrinterManager.flush_method_affinity()
+        if self.app.details_store is not None:
+            self.app.details_store.flush()
+        stats = WindowsPrinterManager.get_cache_stats()
+        if stats['misses']:
+            print(f"Enumeração de compartilhamentos: {stats['misses']} hosts consultados, "
+                  f"{stats['hits']} consultas repetidas evitadas")
+        sink = self.app.export_sink
+        if sink is not None:
+            self.app.export_sink = None
+            sink.close()
+            message += f" {sink.written} hosts exportados para {sink.path}."
+
         self.app.scanning = False
         self.app.ui_manager.status_label.configure(text=message)
         self.app.ui_manager.update_ui_state(scanning=False)
+        self.app.ui_manager.stream_button.configure(text=STREAM_BUTTON_TEXT)
         self.app.ui_manager.progress['value'] = 100
-        
+
         if "cancelado" in message.lower():
             self.app.ui_manager.progress.configure(style="red.Horizontal.TProgressbar")
         else:
-            self.app.ui_manager.progress.configure(style="green.Horizontal.TProgressbar")
\ No newline at end of file
+            self.app.ui_manager.progress.configure(style="green.Horizontal.TProgressbar")
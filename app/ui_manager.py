@@ -2,6 +2,13 @@
 import customtkinter as ctk
 from tkinter import ttk
 from ui_components import CollapsibleFrame
+from result_store import QueryError
+
+
+# Espera após a última tecla antes de aplicar o filtro
+FILTER_DELAY_MS = 150
+
+STREAM_BUTTON_TEXT = "📡 Exportar Durante o Scan"
 
 
 class UIManager:
@@ -9,6 +16,11 @@ class UIManager:
         self.app = app
         self.collapsible_frames = {}
         self.data_to_export = {}
+        self.filter_text = ""
+        self._filter_job = None
+        # Scan cujos resultados a tabela mostra (None: todos os scans da leva)
+        self.job_filter = None
+        self._job_rows = {}
         
     def setup_ui(self):
         """Configura toda a interface do usuário."""
@@ -17,6 +29,8 @@ class UIManager:
         self._create_input_section()
         self._create_button_section()
         self._create_progress_section()
+        self._create_filter_section()
+        self._create_jobs_section()
         self._create_results_section()
         
     def _create_main_frame(self):
@@ -69,6 +83,84 @@ class UIManager:
         self.status_label = ctk.CTkLabel(self.main_frame, text="Pronto para iniciar.", anchor="w")
         self.status_label.grid(row=4, column=0, columnspan=3, padx=15, sticky="ew")
         
+    def _create_filter_section(self):
+        """Cria a caixa de filtro dos resultados."""
+        self.filter_entry = ctk.CTkEntry(self.main_frame,
+                                        placeholder_text="Filtro: port 9100 AND vendor=HP AND NOT 445",
+                                        height=30)
+        self.filter_entry.grid(row=5, column=0, columnspan=3, padx=15, pady=(10, 0), sticky="ew")
+        self.filter_entry.bind("<KeyRelease>", self._schedule_filter)
+        
+    def _schedule_filter(self, event=None):
+        """Aplica o filtro quando o usuário para de digitar."""
+        if self._filter_job is not None:
+            self.app.after_cancel(self._filter_job)
+        self._filter_job = self.app.after(FILTER_DELAY_MS, self.apply_filter)
+        
+    def apply_filter(self):
+        """Consulta o ResultStore com o texto da caixa de filtro e atualiza as tabelas."""
+        self._filter_job = None
+        self.filter_text = self.filter_entry.get().strip()
+        self.refresh_filter(keep_position=False)
+        
+    def refresh_filter(self, keep_position: bool = True):
+        """Reaplica o filtro atual (chamado também quando chegam novos resultados)."""
+        ips = None
+        if self.filter_text:
+            try:
+                ips = set(self.app.results.query(self.filter_text))
+            except QueryError as e:
+                self.status_label.configure(text=f"Filtro inválido: {e}")
+                return
+        if self.job_filter is not None:
+            job_ips = {record.ip for record in self.job_filter.results}
+            ips = job_ips if ips is None else ips & job_ips
+        for frame in self.collapsible_frames.values():
+            frame.set_filter(ips, keep_position)
+        
+    def _create_jobs_section(self):
+        """Cria a lista de scans em andamento (um por linha, com ver e cancelar)."""
+        self.jobs_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        self.jobs_frame.grid(row=6, column=0, columnspan=3, padx=15, sticky="ew")
+        
+    def add_job_row(self, job):
+        """Adiciona a linha de um scan à lista."""
+        row = ctk.CTkFrame(self.jobs_frame, fg_color="transparent")
+        row.pack(fill="x", pady=(4, 0))
+        label = ctk.CTkLabel(row, text="", anchor="w")
+        label.pack(side="left", fill="x", expand=True)
+        cancel_button = ctk.CTkButton(row, text="⏹️", width=32,
+                                     command=lambda: self.app.scanner.cancel_job(job))
+        cancel_button.pack(side="right")
+        view_button = ctk.CTkButton(row, text="🔍", width=32,
+                                   command=lambda: self.toggle_job_filter(job))
+        view_button.pack(side="right", padx=5)
+        self._job_rows[job] = (row, label, view_button, cancel_button)
+        self.update_job_rows()
+        
+    def update_job_rows(self):
+        """Atualiza o progresso de cada scan da lista."""
+        states = {'queued': "na fila", 'running': "escaneando", 'done': "concluído", 'cancelled': "cancelado", 'failed': "falhou"}
+        for job, (row, label, view_button, cancel_button) in self._job_rows.items():
+            text = (f"#{job.id} {job.target} — {states.get(job.status, job.status)} "
+                    f"{job.completed}/{job.total}, {len(job.results)} hosts")
+            label.configure(text=text)
+            view_button.configure(fg_color="#0078d4" if job is self.job_filter else "gray30")
+            cancel_button.configure(state="normal" if job.active and not job.cancelled else "disabled")
+        
+    def toggle_job_filter(self, job):
+        """Mostra só os resultados de um scan (ou volta a mostrar todos)."""
+        self.job_filter = None if self.job_filter is job else job
+        self.update_job_rows()
+        self.refresh_filter(keep_position=False)
+        
+    def clear_job_rows(self):
+        """Remove a lista de scans da leva anterior."""
+        for row, *_ in self._job_rows.values():
+            row.destroy()
+        self._job_rows = {}
+        self.job_filter = None
+        
     def _create_results_section(self):
         """Cria a seção de resultados."""
         results_container = ctk.CTkScrollableFrame(self.app, label_text="📊 Resultados do Scan")
@@ -92,6 +184,7 @@ class UIManager:
         self.status_label.configure(text="Pronto para iniciar.")
         self.export_button.configure(state="disabled")
         self.app.device_details.clear()
+        self.app.results.clear()
         
         for frame in self.collapsible_frames.values():
             frame.clear()
@@ -100,8 +193,8 @@ class UIManager:
             
     def update_ui_state(self, scanning=False):
         """Atualiza o estado dos controles da UI."""
+        # O botão de scan continua ativo: um novo intervalo entra no mesmo pool de workers
         if scanning:
-            self.scan_button.configure(state="disabled")
             self.cancel_button.configure(state="normal")
         else:
             self.scan_button.configure(state="normal")
@@ -133,6 +226,18 @@ class UIManager:
                                               width=120)
         self.credentials_button.pack(side="left", padx=15)
         
+        # Scan delta: confirma os hosts do último scan e amostra o resto do intervalo
+        self.delta_var = ctk.BooleanVar(value=False)
+        self.delta_checkbox = ctk.CTkCheckBox(button_frame,
+                                             text="⚡ Scan Delta",
+                                             variable=self.delta_var,
+                                             state="normal" if self.app.inventory is not None else "disabled")
+        self.delta_checkbox.pack(side="left")
+        
+        # Scan com prazo: em branco, sem limite de tempo
+        self.deadline_entry = ctk.CTkEntry(button_frame, placeholder_text="⏱️ Prazo (s)", width=90)
+        self.deadline_entry.pack(side="left", padx=(15, 0))
+        
         # Botão de exportar (direita)
         self.export_button = ctk.CTkButton(button_frame, 
                                           text="📁 Exportar CSV", 
@@ -140,6 +245,12 @@ class UIManager:
                                           state="disabled")
         self.export_button.pack(side="right", padx=15)
         
+        # Exportação incremental: anexada antes (ou durante) o scan
+        self.stream_button = ctk.CTkButton(button_frame,
+                                          text=STREAM_BUTTON_TEXT,
+                                          command=self.app.event_handlers.toggle_export_sink)
+        self.stream_button.pack(side="right")
+        
     def open_credentials_dialog(self):
         """Abre o diálogo de configuração de credenciais."""
         from credentials_dialog import CredentialsDialog
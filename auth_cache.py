@@ -0,0 +1,155 @@
+# auth_cache.py
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+DEFAULT_AUTH_CACHE_FILE = "auth_cache.json"
+
+# Validade dos resultados: sucesso dura um expediente, falha é tentada de novo logo
+SUCCESS_TTL = 12 * 3600
+FAILURE_TTL = 15 * 60
+
+# Intervalo mínimo entre gravações do arquivo durante um scan
+SAVE_INTERVAL = 5.0
+
+
+class AuthResultCache:
+    """
+    Resultados de autenticação por host e por domínio, com validade.
+
+    As chaves usam a impressão digital da credencial (CredentialContext.fingerprint),
+    nunca a senha. O resultado em um host de domínio vale para todos os hosts do
+    mesmo domínio (quem valida é o controlador de domínio): um sucesso evita
+    testar os demais, e uma falha substitui o sucesso do domínio (a senha pode
+    ter mudado) e faz os demais hosts seguirem sem a credencial até expirar. O
+    cache é gravado em JSON no diretório atual, como as credenciais e a
+    afinidade de métodos.
+    """
+
+    def __init__(self, path: str = DEFAULT_AUTH_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, object]] = {}
+        self._domains: Dict[str, Dict[str, object]] = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """Carrega os resultados salvos, se existirem."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            # Arquivos antigos guardavam só a validade dos sucessos de domínio
+            domains = {key: entry if isinstance(entry, dict) else {'ok': True, 'expires': entry}
+                       for key, entry in data.get('domains', {}).items()}
+            with self._lock:
+                self._hosts = data.get('hosts', {})
+                self._domains = domains
+        except (OSError, ValueError) as e:
+            print(f"Erro ao carregar cache de autenticação: {e}")
+
+    def save(self):
+        """Grava os resultados ainda válidos (arquivo temporário + substituição)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            data = {
+                'hosts': {key: entry for key, entry in self._hosts.items() if entry['expires'] > now},
+                'domains': {key: entry for key, entry in self._domains.items() if entry['expires'] > now},
+            }
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Erro ao salvar cache de autenticação: {e}")
+
+    def _maybe_save(self):
+        if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            self.save()
+
+    @staticmethod
+    def _host_key(ip: str, fingerprint: str) -> str:
+        return f"{ip}|{fingerprint}"
+
+    @staticmethod
+    def _domain_key(domain: str, fingerprint: str) -> str:
+        return f"{domain.lower()}|{fingerprint}"
+
+    def lookup(self, ip: str, fingerprint: str, domain: str = '') -> Optional[bool]:
+        """
+        Consulta o resultado conhecido de uma credencial em um host.
+
+        Args:
+            ip (str): Endereço IP do host
+            fingerprint (str): Impressão digital da credencial
+            domain (str): Domínio do host, se conhecido
+
+        Returns:
+            bool | None: True/False se há resultado válido, None se é preciso testar
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._hosts.get(self._host_key(ip, fingerprint))
+            if entry and entry['expires'] > now:
+                self.hits += 1
+                return entry['ok']
+            entry = self._domains.get(self._domain_key(domain, fingerprint)) if domain else None
+            if entry and entry['expires'] > now:
+                self.hits += 1
+                return entry['ok']
+            self.misses += 1
+            return None
+
+    def record(self, ip: str, fingerprint: str, ok: bool, domain: str = ''):
+        """
+        Registra o resultado de um teste de credencial.
+
+        Args:
+            ip (str): Endereço IP do host
+            fingerprint (str): Impressão digital da credencial
+            ok (bool): Se a credencial foi aceita
+            domain (str): Domínio do host, se conhecido
+        """
+        entry = {'ok': ok, 'expires': time.time() + (SUCCESS_TTL if ok else FAILURE_TTL)}
+        with self._lock:
+            self._hosts[self._host_key(ip, fingerprint)] = entry
+            if domain:
+                self._domains[self._domain_key(domain, fingerprint)] = entry
+            self._dirty = True
+        self._maybe_save()
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna acertos, faltas e quantidade de domínios validados."""
+        now = time.time()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'domains': sum(1 for entry in self._domains.values() if entry['ok'] and entry['expires'] > now),
+            }
+
+
+_auth_cache = None
+_auth_cache_lock = threading.Lock()
+
+
+def get_auth_cache() -> AuthResultCache:
+    """Retorna o cache compartilhado entre a enumeração e o gerenciador de credenciais."""
+    global _auth_cache
+    with _auth_cache_lock:
+        if _auth_cache is None:
+            _auth_cache = AuthResultCache()
+        return _auth_cache
@@ -0,0 +1,175 @@
+# blob_store.py
+"""
+Arquivo de blobs compactados, só de acréscimo, com leitura via mmap.
+
+Guarda o detalhe completo de cada host (XML do Nmap, respostas das sondas,
+saída da enumeração) fora da memória; a interface só lê um blob quando a
+janela de detalhes é aberta ou uma exportação pede.
+
+Formato:
+
+    cabeçalho do arquivo: MAGIC (8 bytes)
+    registro:             <HII> tamanho da chave, tamanho dos dados, CRC32 dos dados
+                          chave (UTF-8) + dados (JSON compactado com zlib)
+
+O índice chave -> (posição, tamanho) fica em memória e é reconstruído ao
+abrir um arquivo existente; um registro incompleto no fim (queda durante a
+gravação) é descartado. Gravar a mesma chave de novo acrescenta um registro
+novo, que passa a valer.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, Optional, Tuple
+
+
+MAGIC = b'PFBLOB1\n'
+RECORD_HEADER = struct.Struct('<HII')
+COMPRESSION_LEVEL = 6
+
+DEFAULT_DETAILS_DIR = "scan_details"
+
+
+class BlobStore:
+    """Blobs JSON compactados por chave em um único arquivo só de acréscimo."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._map: Optional[mmap.mmap] = None
+        self.bytes_raw = 0
+        self.bytes_stored = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a+b')
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+        else:
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        self._file.seek(0)
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{self.path} não é um arquivo de blobs")
+        position = len(MAGIC)
+        while True:
+            header = self._file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            key_length, data_length, crc = RECORD_HEADER.unpack(header)
+            key = self._file.read(key_length)
+            data = self._file.read(data_length)
+            if len(key) < key_length or len(data) < data_length or zlib.crc32(data) != crc:
+                break
+            data_offset = position + RECORD_HEADER.size + key_length
+            self._index[key.decode('utf-8')] = (data_offset, data_length)
+            position = data_offset + data_length
+
+        # Descarta o registro incompleto deixado por uma gravação interrompida
+        self._file.truncate(position)
+        self._file.seek(0, os.SEEK_END)
+
+    def put(self, key: str, value: dict) -> bool:
+        """
+        Grava o blob de uma chave.
+
+        Args:
+            key (str): Chave (o IP do host)
+            value (dict): Dados serializáveis em JSON
+
+        Returns:
+            bool: True se o blob foi gravado
+        """
+        raw = json.dumps(value, default=str, separators=(',', ':')).encode('utf-8')
+        data = zlib.compress(raw, COMPRESSION_LEVEL)
+        key_bytes = key.encode('utf-8')
+        try:
+            with self._lock:
+                self._file.seek(0, os.SEEK_END)
+                offset = self._file.tell() + RECORD_HEADER.size + len(key_bytes)
+                self._file.write(RECORD_HEADER.pack(len(key_bytes), len(data), zlib.crc32(data)) + key_bytes + data)
+                self._file.flush()
+                self._index[key] = (offset, len(data))
+                self.bytes_raw += len(raw)
+                self.bytes_stored += len(data)
+            return True
+        except (OSError, ValueError) as e:
+            print(f"Erro ao gravar detalhes de {key}: {e}")
+            return False
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Lê o blob de uma chave.
+
+        Returns:
+            dict | None: Dados gravados ou None se a chave não existe
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            offset, length = entry
+            if self._map is None or offset + length > len(self._map):
+                # O arquivo cresceu desde o último mapeamento
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            data = self._map[offset:offset + length]
+        try:
+            return json.loads(zlib.decompress(data))
+        except (zlib.error, ValueError) as e:
+            print(f"Erro ao ler detalhes de {key}: {e}")
+            return None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+    def flush(self):
+        """Força a gravação em disco (fsync)."""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """Fecha o mapeamento e o arquivo."""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if not self._file.closed:
+                self._file.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna a quantidade de blobs e os bytes antes e depois da compactação."""
+        return {'blobs': len(self._index), 'bytes_raw': self.bytes_raw, 'bytes_stored': self.bytes_stored}
+
+
+def open_scan_store(directory: str = DEFAULT_DETAILS_DIR) -> Optional[BlobStore]:
+    """
+    Cria o arquivo de detalhes de um novo scan (scan_details/scan-AAAAMMDD-HHMMSS.blob).
+
+    Os arquivos de scans anteriores são mantidos para auditoria.
+
+    Returns:
+        BlobStore | None: Arquivo aberto ou None se não foi possível criá-lo
+    """
+    path = os.path.join(directory, time.strftime("scan-%Y%m%d-%H%M%S.blob"))
+    try:
+        return BlobStore(path)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao criar arquivo de detalhes do scan: {e}")
+        return None
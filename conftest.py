@@ -0,0 +1,2 @@
+# conftest.py
+# Os testes importam os módulos da raiz do projeto (pytest coloca este diretório no sys.path)
@@ -0,0 +1,59 @@
+# credential_context.py
+import hashlib
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class CredentialContext:
+    """
+    Credenciais de uma chamada de enumeração.
+
+    Imutável: cada chamada recebe o contexto que deve usar, então threads de
+    scan e testes de credenciais podem usar credenciais diferentes ao mesmo
+    tempo sem trocar estado global. Sem usuário/senha representa o acesso
+    sem credenciais (sessão atual do Windows ou sessão anônima).
+    """
+    username: str = ''
+    password: str = field(default='', repr=False)
+    domain: str = ''
+
+    @classmethod
+    def from_input(cls, username: str = None, password: str = None) -> 'CredentialContext':
+        """
+        Cria o contexto a partir do que o usuário digitou.
+
+        Args:
+            username (str): 'usuario', 'DOMINIO\\usuario' ou 'usuario@dominio'
+            password (str): Senha
+
+        Returns:
+            CredentialContext: Contexto com o domínio separado do usuário
+        """
+        username = (username or '').strip()
+        domain = ''
+        if '\\' in username:
+            domain, username = username.split('\\', 1)
+        elif '@' in username:
+            username, domain = username.split('@', 1)
+        return cls(username, password or '', domain)
+
+    @property
+    def is_set(self) -> bool:
+        """Indica se há usuário e senha para usar."""
+        return bool(self.username and self.password)
+
+    @property
+    def qualified_username(self) -> str:
+        """Usuário no formato aceito por wmic/net/PowerShell ('DOMINIO\\usuario')."""
+        return f"{self.domain}\\{self.username}" if self.domain else self.username
+
+    @property
+    def fingerprint(self) -> str:
+        """Identificador estável da credencial, sem expor a senha (para chaves de cache)."""
+        if not self.is_set:
+            return 'anonymous'
+        material = f"{self.domain.lower()}\\{self.username.lower()}\x00{self.password}"
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()[:16]
+
+
+ANONYMOUS = CredentialContext()
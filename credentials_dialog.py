@@ -4,6 +4,7 @@ from tkinter import messagebox
 import json
 import os
 from printer_utils import WindowsPrinterManager
+from credential_context import CredentialContext
 
 
 class CredentialsDialog(ctk.CTkToplevel):
@@ -193,12 +194,9 @@ class CredentialsDialog(ctk.CTkToplevel):
         self.update()
         
         try:
-            # Define as credenciais temporariamente
-            old_username, old_password = WindowsPrinterManager.get_credentials()
-            WindowsPrinterManager.set_credentials(username, password)
-            
-            # Testa a conexão
-            printers = WindowsPrinterManager.get_shared_printers(test_ip)
+            # Testa com um contexto próprio, sem alterar as credenciais do scan em andamento
+            credentials = CredentialContext.from_input(username, password)
+            printers = WindowsPrinterManager.get_shared_printers(test_ip, credentials=credentials)
             
             if printers:
                 printer_names = [p.get('Name', 'N/A') for p in printers[:3]]
@@ -221,8 +219,6 @@ class CredentialsDialog(ctk.CTkToplevel):
                                 "• As credenciais estão corretas\n"
                                 "• O WMI está habilitado no host remoto")
         finally:
-            # Restaura as credenciais antigas
-            WindowsPrinterManager.set_credentials(old_username, old_password)
             self.test_button.configure(text="🧪 Testar Conexão", state="normal")
             
     def ok_clicked(self):
@@ -0,0 +1,157 @@
+# device_record.py
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Estados de porta do Nmap; cada porta guarda só o índice nesta tupla
+PORT_STATES = ('open', 'closed', 'filtered', 'open|filtered', 'closed|filtered', 'unfiltered')
+
+_EMPTY_SERVICE = ('', '', '')
+
+# (nome, produto, versão) já vistos: hosts com o mesmo serviço compartilham a mesma tupla
+_services: Dict[Tuple[str, str, str], Tuple[str, str, str]] = {_EMPTY_SERVICE: _EMPTY_SERVICE}
+
+
+def intern_text(value) -> str:
+    """Internaliza textos repetidos entre hosts (fabricantes, status, serviços)."""
+    return sys.intern(value) if value else ''
+
+
+def _intern_service(name: str, product: str, version: str) -> Tuple[str, str, str]:
+    key = (name or '', product or '', version or '')
+    service = _services.get(key)
+    if service is None:
+        service = _services.setdefault(key, tuple(intern_text(value) for value in key))
+    return service
+
+
+class DeviceRecord:
+    """
+    Dados de um dispositivo encontrado no scan, em formato compacto.
+
+    Substitui o dicionário completo do Nmap: as portas ficam em arrays de
+    inteiros (número e índice do estado) e os serviços em tuplas
+    compartilhadas; fabricante, tipo e status são textos internalizados.
+    Os blocos opcionais (PJL, web, SMB, certificado) só existem nos hosts
+    em que a sonda respondeu. skipped lista as etapas do scan que ficaram
+    de fora por falta de tempo (registro parcial).
+    """
+
+    __slots__ = ('ip', 'hostname', 'mac', 'vendor', 'type', 'simple_status', 'state', 'domain',
+                 'model', 'rule', 'confidence', 'ports', 'port_states', 'services',
+                 'shared_printers', 'pjl', 'web', 'smb', 'certificate', 'skipped')
+
+    def __init__(self, ip: str, hostname: str = '', mac: str = '', vendor: str = '',
+                 type: str = '', simple_status: str = '', state: str = '', domain: str = ''):
+        self.ip = ip
+        self.hostname = hostname or ''
+        self.mac = mac or ''
+        self.vendor = intern_text(vendor)
+        self.type = intern_text(type)
+        self.simple_status = intern_text(simple_status)
+        self.state = intern_text(state)
+        self.domain = intern_text(domain)
+        self.model = ''
+        self.rule = ''
+        self.confidence = 0.0
+        self.ports = array('H')
+        self.port_states = array('B')
+        self.services: Tuple[Tuple[str, str, str], ...] = ()
+        self.shared_printers: List[Dict[str, str]] = []
+        self.pjl: Optional[dict] = None
+        self.web: Optional[dict] = None
+        self.smb: Optional[dict] = None
+        self.certificate: Optional[dict] = None
+        self.skipped: Tuple[str, ...] = ()
+
+    def set_ports(self, tcp: dict):
+        """
+        Copia as portas do resultado do Nmap, descartando os campos não usados.
+
+        Args:
+            tcp (dict): nmap_data['tcp'] ({porta: {'state', 'name', 'product', 'version', ...}})
+        """
+        ports = array('H')
+        states = array('B')
+        services = []
+        for port in sorted(tcp):
+            info = tcp[port]
+            state = info.get('state', '')
+            ports.append(int(port))
+            states.append(PORT_STATES.index(state) if state in PORT_STATES else PORT_STATES.index('filtered'))
+            services.append(_intern_service(info.get('name', ''), info.get('product', ''), info.get('version', '')))
+        self.ports = ports
+        self.port_states = states
+        self.services = tuple(services)
+
+    def port_state(self, port: int) -> str:
+        """Estado de uma porta ('' se não foi escaneada)."""
+        for index, number in enumerate(self.ports):
+            if number == port:
+                return PORT_STATES[self.port_states[index]]
+        return ''
+
+    def open_ports(self) -> List[int]:
+        """Números das portas abertas."""
+        open_code = PORT_STATES.index('open')
+        return [port for port, state in zip(self.ports, self.port_states) if state == open_code]
+
+    def iter_ports(self) -> Iterator[Tuple[int, str, str, str, str]]:
+        """Percorre (porta, estado, nome, produto, versão)."""
+        for port, state, (name, product, version) in zip(self.ports, self.port_states, self.services):
+            yield port, PORT_STATES[state], name, product, version
+
+    @property
+    def is_printer(self) -> bool:
+        return self.type in ('network_printer', 'shared_printer')
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.skipped)
+
+    def to_dict(self) -> dict:
+        """Converte para dicionário (exportação e integração com outras ferramentas)."""
+        data = {
+            'ip': self.ip,
+            'hostname': self.hostname,
+            'mac': self.mac,
+            'vendor': self.vendor,
+            'type': self.type,
+            'simple_status': self.simple_status,
+            'state': self.state,
+            'domain': self.domain,
+            'model': self.model,
+            'classification': {'rule': self.rule, 'confidence': self.confidence},
+            'tcp': {port: {'state': state, 'name': name, 'product': product, 'version': version}
+                    for port, state, name, product, version in self.iter_ports()},
+            'shared_printers': self.shared_printers,
+        }
+        for key in ('pjl', 'web', 'smb', 'certificate'):
+            value = getattr(self, key)
+            if value:
+                data[key] = value
+        if self.skipped:
+            data['skipped'] = list(self.skipped)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DeviceRecord':
+        """Reconstrói um registro a partir de to_dict() (ex: recebido do modo servidor em JSON)."""
+        record = cls(data.get('ip', ''), data.get('hostname', ''), data.get('mac', ''), data.get('vendor', ''),
+                     data.get('type', ''), data.get('simple_status', ''), data.get('state', ''),
+                     data.get('domain', ''))
+        record.model = intern_text(data.get('model', ''))
+        classification = data.get('classification') or {}
+        record.rule = classification.get('rule', '')
+        record.confidence = classification.get('confidence', 0.0)
+        # Em JSON as chaves das portas viram texto
+        record.set_ports({int(port): info for port, info in (data.get('tcp') or {}).items()})
+        record.shared_printers = list(data.get('shared_printers') or [])
+        for key in ('pjl', 'web', 'smb', 'certificate'):
+            setattr(record, key, data.get(key))
+        record.skipped = tuple(data.get('skipped') or ())
+        return record
+
+    def __repr__(self) -> str:
+        return f"DeviceRecord({self.ip!r}, {self.hostname!r}, {self.type!r})"
@@ -0,0 +1,449 @@
+# enum_worker.py
+"""
+Processo auxiliar de longa duração para enumerar impressoras compartilhadas.
+
+Protocolo (uma mensagem JSON por linha, stdin -> stdout):
+
+    requisição: {"id": 7, "op": "enumerate", "hosts": ["10.0.0.5", ...],
+                 "username": "...", "password": "..."}
+    resposta:   {"id": 7, "results": {"10.0.0.5": {"printers": [...] | null, "error": ""}}}
+
+    requisição: {"id": 8, "op": "ping"}
+    resposta:   {"id": 8, "pong": true}
+
+O worker mantém uma sessão do PowerShell aberta entre as requisições, evitando
+os segundos de inicialização a cada host. Com --stub ARQUIVO ele responde a
+partir de um JSON {ip: [impressoras]}, o que permite testar o protocolo e o
+pool fora do Windows.
+
+Só o PowerShell passa pelo worker: NET VIEW e WMIC são executáveis de uma
+consulta só, sem modo de sessão, e continuariam abrindo um processo por host
+mesmo chamados de dentro dele. O worker não importa printer_utils (nem os
+módulos que ele carrega); o que os dois compartilham fica aqui.
+"""
+import base64
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+
+# Hosts enviados em uma única requisição e tempo de espera para juntá-los
+BATCH_SIZE = 8
+BATCH_WAIT = 0.02
+
+# Prazo de cada host de um lote (as consultas do lote rodam em paralelo); abaixo
+# do tempo que o cliente espera pela resposta
+HOST_TIMEOUT = 20
+
+CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+# Laço da sessão, passado com -EncodedCommand: cada linha recebida é
+# "<marcador> <script em base64 UTF-8>"; o script roda inteiro como um bloco e
+# a saída termina com o marcador, sem depender de como o console lê comandos
+# de várias linhas
+SESSION_LOOP = r"""
+while ($null -ne ($line = [Console]::In.ReadLine())) {
+    $marker, $encoded = $line.Split(' ', 2)
+    try {
+        $source = [Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($encoded))
+        . ([ScriptBlock]::Create($source)) 2>$null | Out-String -Stream -Width 4096 |
+            ForEach-Object { [Console]::Out.WriteLine($_) }
+    } catch {
+        [Console]::Out.WriteLine("ERROR: $_")
+    }
+    [Console]::Out.WriteLine($marker)
+    [Console]::Out.Flush()
+}
+"""
+
+
+class WorkerError(Exception):
+    """O worker terminou ou respondeu fora do protocolo."""
+
+
+def powershell_command(script: str) -> List[str]:
+    """Linha de comando que executa o script com -EncodedCommand (UTF-16LE em base64)."""
+    encoded = base64.b64encode(script.encode('utf-16-le')).decode('ascii')
+    return ['powershell', '-NoLogo', '-NoProfile', '-NonInteractive', '-EncodedCommand', encoded]
+
+
+def parse_printer_csv(output: str) -> List[Dict[str, str]]:
+    """
+    Converte o CSV do Get-WmiObject Win32_Printer (ConvertTo-Csv) em impressoras.
+
+    Args:
+        output (str): Saída do PowerShell (cabeçalho + uma linha por impressora)
+
+    Returns:
+        list: Impressoras com ShareName, marcadas como compartilhadas
+    """
+    printers = []
+    lines = output.strip().split('\n')
+    
+    if len(lines) < 2:  # Precisa ter pelo menos header + 1 linha
+        return printers
+    
+    # Primeira linha é o header
+    headers = [h.strip('"') for h in lines[0].split(',')]
+    
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+            
+        values = [v.strip('"') for v in line.split(',')]
+        if len(values) >= len(headers):
+            printer_info = {}
+            for i, header in enumerate(headers):
+                printer_info[header] = values[i] if i < len(values) else ''
+            
+            # Só adiciona se tem ShareName
+            if printer_info.get('ShareName'):
+                printer_info['Status'] = 'Compartilhada'
+                printer_info['IsDefault'] = 'FALSE'
+                printers.append(printer_info)
+    
+    return printers
+
+
+# ---------------------------------------------------------------------- #
+# Lado do worker
+# ---------------------------------------------------------------------- #
+class PowerShellSession:
+    """
+    Processo do PowerShell reutilizado: cada consulta termina com um marcador único.
+
+    O processo roda SESSION_LOOP (-EncodedCommand) e recebe cada script como
+    uma única linha em base64, então blocos de várias linhas chegam inteiros.
+    """
+
+    def __init__(self):
+        self._process = None
+
+    def _ensure_started(self):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                powershell_command(SESSION_LOOP),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+                creationflags=CREATE_NO_WINDOW
+            )
+
+    def run(self, script: str) -> str:
+        """Executa um bloco de script e retorna a saída até o marcador de fim."""
+        self._ensure_started()
+        marker = f"##END-{uuid.uuid4().hex}"
+        encoded = base64.b64encode(script.encode('utf-8')).decode('ascii')
+        try:
+            self._process.stdin.write(f"{marker} {encoded}\n")
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise WorkerError(f"PowerShell indisponível: {e}")
+
+        lines = []
+        for line in self._process.stdout:
+            if line.strip() == marker:
+                return ''.join(lines)
+            lines.append(line)
+        raise WorkerError("PowerShell encerrou durante a consulta")
+
+
+class PowerShellEnumerator:
+    """
+    Enumera impressoras compartilhadas via Get-WmiObject na sessão persistente.
+
+    Cada host do lote vira um job do PowerShell (-AsJob); todos esperam pelo
+    mesmo prazo de HOST_TIMEOUT segundos, e um host que não responde a tempo
+    é interrompido e volta como falha ("timeout") sem atrasar os demais.
+    """
+
+    def __init__(self, host_timeout: float = HOST_TIMEOUT):
+        self._session = PowerShellSession()
+        self.host_timeout = host_timeout
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        return "'" + value.replace("'", "''") + "'"
+
+    def enumerate(self, hosts: List[str], username: str = '', password: str = '') -> Dict[str, dict]:
+        credential = ''
+        if username and password:
+            credential = (f"$cred = New-Object PSCredential({self._quote(username)}, "
+                          f"(ConvertTo-SecureString {self._quote(password)} -AsPlainText -Force))\n")
+        if not hosts:
+            return {}
+        marker = f"##HOST-{uuid.uuid4().hex}"
+        script = credential
+        for index, ip in enumerate(hosts):
+            script += (f"$job{index} = Get-WmiObject -Class Win32_Printer -ComputerName {self._quote(ip)} "
+                       f"{'-Credential $cred ' if credential else ''}-AsJob\n")
+        script += f"$deadline = (Get-Date).AddSeconds({self.host_timeout})\n"
+        for index in range(len(hosts)):
+            script += (
+                f"Write-Output '{marker}'\n"
+                "$left = [int][Math]::Max(0, [Math]::Ceiling(($deadline - (Get-Date)).TotalSeconds))\n"
+                f"if (Wait-Job $job{index} -Timeout $left) {{\n"
+                "    try {\n"
+                f"        Receive-Job $job{index} -ErrorAction Stop |\n"
+                "        Where-Object {$_.Shared -eq $true} |\n"
+                "        Select-Object Name,ShareName,DriverName,Location,Comment |\n"
+                "        ConvertTo-Csv -NoTypeInformation\n"
+                "    } catch {\n"
+                "        Write-Output \"ERROR: $_\"\n"
+                "    }\n"
+                "} else {\n"
+                f"    Stop-Job $job{index}\n"
+                "    Write-Output 'ERROR: timeout'\n"
+                "}\n"
+                f"Remove-Job $job{index} -Force\n"
+            )
+
+        # A saída de cada host vem depois do seu marcador, na ordem do lote
+        sections = self._session.run(script).split(marker + '\n')[1:]
+        results = {}
+        for index, ip in enumerate(hosts):
+            output = sections[index].lstrip() if index < len(sections) else "ERROR: sem resposta"
+            if output.startswith("ERROR"):
+                results[ip] = {'printers': None, 'error': output.strip()[7:]}
+            else:
+                results[ip] = {'printers': parse_printer_csv(output), 'error': ''}
+        return results
+
+
+class StubEnumerator:
+    """Responde a partir de um arquivo JSON {ip: [impressoras]}; usado em testes."""
+
+    def __init__(self, path: str):
+        with open(path, 'r') as f:
+            self._data = json.load(f)
+
+    def enumerate(self, hosts: List[str], username: str = '', password: str = '') -> Dict[str, dict]:
+        return {ip: {'printers': self._data.get(ip), 'error': '' if ip in self._data else 'not found'}
+                for ip in hosts}
+
+
+def serve(enumerator, stdin=sys.stdin, stdout=sys.stdout):
+    """Atende requisições até o fim da entrada."""
+    for line in stdin:
+        if not line.strip():
+            continue
+        request = None
+        try:
+            request = json.loads(line)
+            if request.get('op') == 'ping':
+                response = {'id': request.get('id'), 'pong': True}
+            else:
+                results = enumerator.enumerate(request.get('hosts', []),
+                                               request.get('username', ''), request.get('password', ''))
+                response = {'id': request.get('id'), 'results': results}
+        except Exception as e:
+            response = {'id': request.get('id') if isinstance(request, dict) else None, 'error': str(e)}
+        stdout.write(json.dumps(response) + '\n')
+        stdout.flush()
+
+
+# ---------------------------------------------------------------------- #
+# Lado do cliente
+# ---------------------------------------------------------------------- #
+class EnumWorkerClient:
+    """Conexão com um processo worker; várias requisições podem estar em andamento."""
+
+    def __init__(self, command: List[str]):
+        self.command = command
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Dict[str, List[Future]]] = {}
+        self._lock = threading.Lock()
+        self._process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+            creationflags=CREATE_NO_WINDOW
+        )
+        threading.Thread(target=self._read_responses, name="enum-worker-reader", daemon=True).start()
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    @property
+    def load(self) -> int:
+        """Quantidade de hosts aguardando resposta deste worker."""
+        with self._lock:
+            return sum(len(hosts) for hosts in self._pending.values())
+
+    def send(self, hosts: Dict[str, List[Future]], username: str = '', password: str = ''):
+        """Envia um lote de hosts; cada Future recebe a lista de impressoras (ou None)."""
+        request_id = next(self._ids)
+        message = {'id': request_id, 'op': 'enumerate', 'hosts': list(hosts),
+                   'username': username or '', 'password': password or ''}
+        with self._lock:
+            self._pending[request_id] = hosts
+        try:
+            self._process.stdin.write(json.dumps(message) + '\n')
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self._fail(request_id, WorkerError(f"Falha ao enviar ao worker: {e}"))
+
+    def _fail(self, request_id: int, error: Exception):
+        with self._lock:
+            hosts = self._pending.pop(request_id, {})
+        for futures in hosts.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+
+    def _read_responses(self):
+        for line in self._process.stdout:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                hosts = self._pending.pop(response.get('id'), None)
+            if hosts is None:
+                continue
+            results = response.get('results') or {}
+            for ip, futures in hosts.items():
+                for future in futures:
+                    if future.done():
+                        continue
+                    if 'error' in response and not results:
+                        future.set_exception(WorkerError(response['error']))
+                    else:
+                        future.set_result((results.get(ip) or {}).get('printers'))
+
+        # Fim da saída: o processo terminou, falha o que estava pendente
+        with self._lock:
+            request_ids = list(self._pending)
+        for request_id in request_ids:
+            self._fail(request_id, WorkerError("O worker de enumeração terminou"))
+
+    def close(self):
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+
+
+class EnumWorkerPool:
+    """
+    Pool de workers de enumeração.
+
+    Requisições de várias threads de scan são agrupadas em lotes de até
+    BATCH_SIZE hosts e enviadas ao worker com menos hosts pendentes. Workers
+    que terminam são recriados no próximo lote.
+    """
+
+    def __init__(self, size: int = 2, command: Optional[List[str]] = None,
+                 batch_size: int = BATCH_SIZE, batch_wait: float = BATCH_WAIT):
+        self.size = size
+        self.command = command or [sys.executable, WORKER_SCRIPT]
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._workers: List[EnumWorkerClient] = []
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._dispatcher = None
+        self.batches_sent = 0
+
+    def submit(self, ip: str, username: str = '', password: str = '') -> Future:
+        """Agenda a enumeração de um host. O Future recebe a lista de impressoras ou None."""
+        future = Future()
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="enum-worker-pool", daemon=True)
+                self._dispatcher.start()
+        self._requests.put((ip, username or '', password or '', future))
+        return future
+
+    def enumerate(self, ip: str, username: str = '', password: str = '', timeout: float = 30,
+                  cancel: threading.Event = None) -> Optional[List[Dict[str, str]]]:
+        """
+        Versão bloqueante de submit.
+
+        Raises:
+            WorkerError: Se o worker falhar
+            TimeoutError: Se não houver resposta no prazo ou a espera for cancelada
+        """
+        future = self.submit(ip, username, password)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (cancel is not None and cancel.is_set()):
+                future.cancel()
+                raise TimeoutError(f"Sem resposta do worker para {ip}")
+            try:
+                return future.result(min(remaining, 0.2))
+            except FutureTimeout:
+                continue
+
+    def _pick_worker(self) -> EnumWorkerClient:
+        self._workers = [worker for worker in self._workers if worker.alive]
+        if len(self._workers) < self.size:
+            worker = EnumWorkerClient(self.command)
+            self._workers.append(worker)
+            return worker
+        return min(self._workers, key=lambda worker: worker.load)
+
+    def _dispatch(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._requests.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._requests.put(None)
+                    break
+                batch.append(item)
+
+            # Um lote por conjunto de credenciais
+            groups: Dict[tuple, Dict[str, List[Future]]] = {}
+            for ip, username, password, future in batch:
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault((username, password), {}).setdefault(ip, []).append(future)
+            for (username, password), hosts in groups.items():
+                try:
+                    worker = self._pick_worker()
+                except OSError as e:
+                    for futures in hosts.values():
+                        for future in futures:
+                            future.set_exception(WorkerError(f"Não foi possível iniciar o worker: {e}"))
+                    continue
+                worker.send(hosts, username, password)
+                self.batches_sent += 1
+
+    def close(self):
+        """Encerra o despachante e os processos worker."""
+        self._requests.put(None)
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--stub':
+        serve(StubEnumerator(sys.argv[2]))
+    else:
+        serve(PowerShellEnumerator())
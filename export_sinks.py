@@ -0,0 +1,280 @@
+# export_sinks.py
+"""
+Exportação incremental dos resultados durante o scan.
+
+Um sink é anexado antes do scan e recebe cada resultado assim que ele fica
+pronto, então nada precisa ficar na memória só para ser exportado no fim.
+As linhas ficam em um buffer curto e são gravadas a cada FLUSH_ROWS
+resultados ou FLUSH_INTERVAL segundos (uma thread do sink grava o buffer
+mesmo quando não chegam resultados novos):
+
+    CsvSink     mesmo formato do "Exportar CSV" (Categoria, IP, Hostname, MAC, Status)
+    JsonlSink   um objeto JSON por host, com portas, serviços e impressoras; as
+                sondas (pjl, web, smb, certificado) vêm do arquivo de detalhes
+    SqliteSink  tabelas devices, ports e shared_printers; cada lote é uma transação
+
+CSV e JSON Lines recebem fsync a cada gravação do buffer; uma queda perde
+no máximo o buffer atual. O SQLite usa journal WAL e transações por lote.
+Um lote que falha continua no buffer e é tentado de novo na gravação seguinte.
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+
+from device_record import DeviceRecord
+
+
+FLUSH_ROWS = 200
+FLUSH_INTERVAL = 2.0
+# Linhas mantidas no buffer enquanto a gravação falha (as mais antigas são descartadas)
+MAX_BUFFERED_ROWS = 10 * FLUSH_ROWS
+
+# Campos do detalhe do host (arquivo de blobs) incluídos no JSON Lines
+DETAIL_FIELDS = ('pjl', 'web', 'smb', 'certificate')
+
+ACTIVE_CATEGORY = "💻 Dispositivos Ativos"
+PRINTER_CATEGORY = "🖨️ Impressoras Encontradas"
+
+SINK_FILETYPES = [
+    ("CSV", "*.csv"),
+    ("JSON Lines", "*.jsonl"),
+    ("SQLite", "*.db *.sqlite *.sqlite3"),
+]
+
+
+class ExportSink:
+    """Base dos sinks: buffer, gravação periódica e fechamento seguro entre threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._buffer: List[DeviceRecord] = []
+        self._last_flush = time.monotonic()
+        self._closing = threading.Event()
+        self._flusher = None
+        self.written = 0
+        self.closed = False
+
+    def _flush_periodically(self):
+        # Sem esta thread, um buffer parcial só seria gravado na chegada do próximo resultado
+        while not self._closing.wait(FLUSH_INTERVAL):
+            with self._lock:
+                if self.closed:
+                    return
+                if self._buffer and time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                    self._flush_locked()
+
+    def write(self, record: DeviceRecord):
+        """Recebe um resultado; grava o buffer quando ele enche ou o intervalo passa."""
+        with self._lock:
+            if self.closed:
+                return
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_periodically, name="export-sink-flush", daemon=True)
+                self._flusher.start()
+            self._buffer.append(record)
+            if len(self._buffer) >= FLUSH_ROWS or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush_locked()
+
+    def flush(self):
+        """Grava o buffer imediatamente."""
+        with self._lock:
+            if not self.closed:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        try:
+            self._write_batch(self._buffer)
+        except (OSError, sqlite3.Error) as e:
+            # Os registros ficam no buffer até uma gravação dar certo
+            print(f"Erro ao exportar para {self.path}: {e}")
+            if len(self._buffer) > MAX_BUFFERED_ROWS:
+                dropped = len(self._buffer) - MAX_BUFFERED_ROWS
+                del self._buffer[:dropped]
+                print(f"{dropped} resultados descartados da exportação para {self.path}")
+            return
+        self.written += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        """Grava o que falta e fecha o arquivo."""
+        with self._lock:
+            if self.closed:
+                return
+            self._flush_locked()
+            self.closed = True
+            self._closing.set()
+            self._close()
+
+    def _write_batch(self, records: List[DeviceRecord]):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class _TextSink(ExportSink):
+    """Sinks de texto: cada lote é uma única escrita seguida de fsync."""
+
+    encoding = 'utf-8'
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding=self.encoding)
+        if new_file:
+            header = self._header()
+            if header:
+                self._file.write(header)
+                self._file.flush()
+
+    def _header(self) -> str:
+        return ''
+
+    def _format(self, record: DeviceRecord) -> str:
+        raise NotImplementedError
+
+    def _write_batch(self, records: List[DeviceRecord]):
+        self._file.write(''.join(self._format(record) for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _close(self):
+        self._file.close()
+
+
+class CsvSink(_TextSink):
+    """CSV no formato da exportação da interface; impressoras aparecem nas duas categorias."""
+
+    encoding = 'utf-8-sig'
+
+    @staticmethod
+    def _rows_to_text(rows: list) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def _header(self) -> str:
+        return self._rows_to_text([["Categoria", "IP", "Hostname", "MAC", "Status"]])
+
+    def _format(self, record: DeviceRecord) -> str:
+        values = [record.ip, record.hostname, record.mac, record.simple_status]
+        rows = [[ACTIVE_CATEGORY] + values]
+        if record.is_printer:
+            rows.append([PRINTER_CATEGORY] + values)
+        return self._rows_to_text(rows)
+
+
+class JsonlSink(_TextSink):
+    """Um objeto JSON por linha com o registro completo do host."""
+
+    def __init__(self, path: str, details: Optional[Callable[[str], Optional[dict]]] = None):
+        super().__init__(path)
+        # details(ip): detalhe do host no arquivo de blobs (o registro em memória não traz as sondas)
+        self.details = details
+
+    def _format(self, record: DeviceRecord) -> str:
+        data = record.to_dict()
+        detail = self.details(record.ip) if self.details is not None else None
+        if detail:
+            for key in DETAIL_FIELDS:
+                if detail.get(key):
+                    data[key] = detail[key]
+        data['is_printer'] = record.is_printer
+        data['scanned_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        return json.dumps(data, ensure_ascii=False, default=str) + '\n'
+
+
+class SqliteSink(ExportSink):
+    """Banco SQLite com inserções em lote; um IP repetido substitui o registro anterior."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS devices (
+            ip TEXT PRIMARY KEY, hostname TEXT, mac TEXT, vendor TEXT, type TEXT,
+            status TEXT, state TEXT, domain TEXT, model TEXT, rule TEXT, confidence REAL,
+            is_printer INTEGER, scanned_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS ports (
+            ip TEXT, port INTEGER, state TEXT, name TEXT, product TEXT, version TEXT,
+            PRIMARY KEY (ip, port)
+        );
+        CREATE TABLE IF NOT EXISTS shared_printers (
+            ip TEXT, name TEXT, share_name TEXT, driver TEXT, location TEXT, comment TEXT
+        );
+        CREATE INDEX IF NOT EXISTS shared_printers_ip ON shared_printers (ip);
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        # O scan grava de outra thread; o acesso é serializado pelo lock da base
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+        self._db.commit()
+
+    def _write_batch(self, records: List[DeviceRecord]):
+        # Um IP repetido no lote fica só com o último registro (senão as impressoras seriam duplicadas)
+        records = list({record.ip: record for record in records}.values())
+        scanned_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        ips = [(record.ip,) for record in records]
+        with self._db:
+            self._db.executemany("DELETE FROM ports WHERE ip = ?", ips)
+            self._db.executemany("DELETE FROM shared_printers WHERE ip = ?", ips)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(record.ip, record.hostname, record.mac, record.vendor, record.type,
+                  record.simple_status, record.state, record.domain, record.model, record.rule,
+                  record.confidence, int(record.is_printer), scanned_at) for record in records]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO ports VALUES (?, ?, ?, ?, ?, ?)",
+                [(record.ip,) + port for record in records for port in record.iter_ports()]
+            )
+            self._db.executemany(
+                "INSERT INTO shared_printers VALUES (?, ?, ?, ?, ?, ?)",
+                [(record.ip, printer.get('Name', ''), printer.get('ShareName', ''),
+                  printer.get('DriverName', ''), printer.get('Location', ''), printer.get('Comment', ''))
+                 for record in records for printer in record.shared_printers]
+            )
+
+    def _close(self):
+        self._db.close()
+
+
+def open_sink(path: str, details: Optional[Callable[[str], Optional[dict]]] = None) -> Optional[ExportSink]:
+    """
+    Abre o sink adequado à extensão do arquivo.
+
+    Args:
+        path (str): .csv, .jsonl/.ndjson ou .db/.sqlite/.sqlite3
+        details (callable): details(ip) com o detalhe do host no arquivo de blobs (usado pelo JSON Lines)
+
+    Returns:
+        ExportSink | None: Sink aberto ou None se a extensão não é suportada ou o arquivo não abriu
+    """
+    extension = os.path.splitext(path)[1].lower()
+    sink_class = {
+        '.csv': CsvSink,
+        '.jsonl': JsonlSink,
+        '.ndjson': JsonlSink,
+        '.db': SqliteSink,
+        '.sqlite': SqliteSink,
+        '.sqlite3': SqliteSink,
+    }.get(extension)
+    if sink_class is None:
+        print(f"Formato de exportação não suportado: {extension}")
+        return None
+    try:
+        return sink_class(path, details) if sink_class is JsonlSink else sink_class(path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Erro ao abrir {path} para exportação: {e}")
+        return None
@@ -0,0 +1,338 @@
+# fingerprint_engine.py
+import json
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fingerprints.json')
+
+# Versão do formato do arquivo de regras suportada por este motor
+SUPPORTED_RULES_VERSION = 1
+
+# Limite de assinaturas memorizadas antes de esvaziar o cache
+MAX_MEMO_ENTRIES = 65536
+
+
+class Classification(NamedTuple):
+    """Resultado da classificação de um dispositivo."""
+    device_type: str
+    label: str
+    confidence: float
+    rule_id: str
+    os_type: str
+
+
+class FingerprintEngine:
+    """
+    Classifica dispositivos a partir de regras declarativas em um arquivo versionado.
+
+    As regras são compiladas uma única vez: portas e OUIs viram dicionários,
+    serviços e produtos viram uma única expressão regular combinada (um grupo
+    nomeado por regra), e os OIDs SNMP viram uma lista de prefixos. As
+    classificações são memorizadas pela assinatura do host, de modo que hosts
+    com o mesmo conjunto de portas/serviços/produtos são avaliados uma vez só.
+    """
+
+    def __init__(self, rules_path: str = DEFAULT_RULES_PATH):
+        self.rules_path = rules_path
+        with open(rules_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.version = data.get('version')
+        if self.version != SUPPORTED_RULES_VERSION:
+            raise ValueError(f"Versão de regras não suportada: {self.version} "
+                             f"(esperada {SUPPORTED_RULES_VERSION})")
+
+        self._compile(data)
+        self._memo: Dict[tuple, Classification] = {}
+        self._vendor_memo: Dict[tuple, Tuple[str, str]] = {}
+        self._memo_lock = threading.Lock()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    # ------------------------------------------------------------------ #
+    # Compilação
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _combined_regex(rules: List[dict], field: str) -> Tuple[Optional[re.Pattern], Dict[str, dict]]:
+        """Junta o campo regex de várias regras em um único padrão com grupos nomeados."""
+        groups = {}
+        parts = []
+        for index, rule in enumerate(rules):
+            if rule.get(field):
+                name = f"r{index}"
+                groups[name] = rule
+                parts.append(f"(?P<{name}>{rule[field]})")
+        if not parts:
+            return None, groups
+        return re.compile('|'.join(parts)), groups
+
+    def _compile(self, data: dict):
+        printer_rules = data.get('printer_rules', [])
+        self._printer_ports = {}
+        for rule in printer_rules:
+            for port in rule.get('ports', []):
+                self._printer_ports[port] = rule
+        self._printer_service_re, self._printer_service_groups = self._combined_regex(printer_rules, 'services')
+        self._printer_product_re, self._printer_product_groups = self._combined_regex(printer_rules, 'product_regex')
+        self._printer_snmp = [(oid, rule) for rule in printer_rules for oid in rule.get('snmp_oids', [])]
+
+        vendor_rules = data.get('vendor_rules', [])
+        self._vendor_product_re, self._vendor_product_groups = self._combined_regex(vendor_rules, 'product_regex')
+        # Nomes do registro IEEE: tabela própria, casada só no início do nome
+        self._vendor_org_re, self._vendor_org_groups = self._combined_regex(vendor_rules, 'organization_regex')
+        self._oui_vendors = {oui.upper(): rule['vendor'] for rule in vendor_rules for oui in rule.get('ouis', [])}
+        self._vendor_snmp = [(oid, rule) for rule in vendor_rules for oid in rule.get('snmp_oids', [])]
+
+        self._os_re, self._os_groups = self._combined_regex(data.get('os_rules', []), 'regex')
+
+        # Ordem do arquivo = prioridade entre serviços
+        self._service_rules = [(rule['port'], rule) for rule in data.get('service_rules', [])]
+
+    # ------------------------------------------------------------------ #
+    # Assinatura e memorização
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def signature(nmap_data: dict, web_info: dict = None, snmp_oid: str = '') -> tuple:
+        """
+        Reduz os dados do host ao que importa para a classificação.
+
+        Os textos comparados com as regras são convertidos para minúsculas
+        aqui, uma única vez por host. Produto e versão também vão como vieram,
+        porque formam o rótulo exibido.
+        """
+        ports = []
+        for port, info in nmap_data.get('tcp', {}).items():
+            product = info.get('product', '')
+            ports.append((port, info.get('state', ''), info.get('name', '').lower(),
+                          product.lower(), product, info.get('version', '')))
+        ports = tuple(ports)
+        os_info = nmap_data.get('osmatch', [])
+        os_name = os_info[0].get('name', '').lower() if os_info else ''
+        web = (bool(web_info.get('is_printer')), web_info.get('model', '')) if web_info else None
+        return ports, os_name, web, snmp_oid
+
+    def _memoized(self, memo: dict, key: tuple, compute):
+        result = memo.get(key)
+        if result is not None:
+            self.memo_hits += 1
+            return result
+        self.memo_misses += 1
+        result = compute(key)
+        with self._memo_lock:
+            if len(memo) >= MAX_MEMO_ENTRIES:
+                memo.clear()
+            memo[key] = result
+        return result
+
+    # ------------------------------------------------------------------ #
+    # Classificação
+    # ------------------------------------------------------------------ #
+    def classify(self, nmap_data: dict, web_info: dict = None, snmp_oid: str = '') -> Classification:
+        """
+        Classifica o dispositivo.
+
+        Args:
+            nmap_data (dict): Dados retornados pelo Nmap
+            web_info (dict): Dados do servidor web embutido (web_probe), opcional
+            snmp_oid (str): sysObjectID SNMP do host, se conhecido
+
+        Returns:
+            Classification: tipo, rótulo de exibição, confiança (0-1), id da regra e SO
+        """
+        return self._memoized(self._memo, self.signature(nmap_data, web_info, snmp_oid),
+                              self._classify_signature)
+
+    def _os_type(self, os_name: str) -> str:
+        if os_name and self._os_re:
+            # Vale a regra que vem primeiro no arquivo, não a que casa primeiro no texto
+            names = {match.lastgroup for match in self._os_re.finditer(os_name)}
+            if names:
+                return self._os_groups[min(names, key=lambda name: int(name[1:]))]['label']
+        return ''
+
+    def _classify_signature(self, signature: tuple) -> Classification:
+        ports, os_name, web, snmp_oid = signature
+        os_type = self._os_type(os_name)
+
+        # Impressoras: coleta todas as regras que casaram e a porta que deu o rótulo
+        matched = {}
+        label_port = None
+        for port, state, service, product_lower, product, version in ports:
+            if state != 'open':
+                continue
+            hits = []
+            rule = self._printer_ports.get(port)
+            if rule:
+                hits.append(rule)
+            if service and self._printer_service_re:
+                hits.extend(self._printer_service_groups[m.lastgroup]
+                            for m in self._printer_service_re.finditer(service))
+            if product_lower and self._printer_product_re:
+                hits.extend(self._printer_product_groups[m.lastgroup]
+                            for m in self._printer_product_re.finditer(product_lower))
+            for rule in hits:
+                matched.setdefault(rule['id'], rule)
+            if hits and label_port is None:
+                label_port = (product, version)
+
+        if snmp_oid:
+            for oid, rule in self._printer_snmp:
+                if snmp_oid == oid or snmp_oid.startswith(oid + '.'):
+                    matched.setdefault(rule['id'], rule)
+
+        if matched:
+            # Evidências independentes combinadas por "ou" probabilístico
+            miss = 1.0
+            for rule in matched.values():
+                miss *= 1.0 - rule.get('confidence', 0.5)
+            best = max(matched.values(), key=lambda r: r.get('confidence', 0.5))
+            product, version = label_port or ('', '')
+            if product:
+                label = f"{product} {version}" if version else product
+            elif web and web[1]:
+                label = web[1]
+            else:
+                label = 'Impressora de Rede'
+            return Classification('network_printer', label, round(1.0 - miss, 3), best['id'], os_type)
+
+        if web and web[0]:
+            return Classification('network_printer', web[1] or 'Impressora de Rede', 0.75,
+                                  'printer.web.embedded', os_type)
+
+        open_ports = {port for port, state, *_ in ports if state == 'open'}
+        for port, rule in self._service_rules:
+            if port in open_ports:
+                label = f"{rule['label']} ({os_type})" if os_type else rule['label']
+                return Classification('device', label, rule.get('confidence', 0.5), rule['id'], os_type)
+
+        if os_type:
+            return Classification('device', f'Dispositivo {os_type}', 0.3, 'device.os', os_type)
+        return Classification('device', 'Dispositivo Ativo', 0.1, 'device.default', os_type)
+
+    # ------------------------------------------------------------------ #
+    # Fabricante
+    # ------------------------------------------------------------------ #
+    def vendor_by_oui(self, mac_address: str) -> str:
+        """Retorna o fabricante das regras para o OUI do MAC, ou string vazia."""
+        oui = mac_address.replace(":", "").replace("-", "")[:6].upper()
+        return self._oui_vendors.get(oui, '')
+
+    def normalize_vendor(self, organization: str) -> str:
+        """
+        Converte o nome de uma organização do registro IEEE para o nome usado
+        nas regras ("HP Inc." -> "Hewlett-Packard"). Sem regra, mantém o original.
+
+        Usa o campo organization_regex das regras, ancorado no início do nome:
+        "Aruba, a Hewlett Packard Enterprise Company" e "HP Tuners LLC" ficam
+        com o nome do registro em vez de virar Hewlett-Packard.
+        """
+        if organization and self._vendor_org_re:
+            match = self._vendor_org_re.match(organization.strip().lower())
+            if match:
+                return self._vendor_org_groups[match.lastgroup]['vendor']
+        return organization
+
+    def vendor_from_products(self, nmap_data: dict, snmp_oid: str = '') -> Tuple[str, str]:
+        """
+        Identifica o fabricante pelos produtos detectados ou pelo sysObjectID.
+
+        Returns:
+            tuple[str, str]: (fabricante, id da regra) ou ('', '') se nada casou
+        """
+        # O fabricante não depende da caixa do texto: os produtos entram na chave em minúsculas
+        key = (tuple(info.get('product', '').lower() for info in nmap_data.get('tcp', {}).values()), snmp_oid)
+        return self._memoized(self._vendor_memo, key, self._vendor_for_key)
+
+    def _vendor_for_key(self, key: tuple) -> Tuple[str, str]:
+        products, snmp_oid = key
+        if snmp_oid:
+            for oid, rule in self._vendor_snmp:
+                if snmp_oid == oid or snmp_oid.startswith(oid + '.'):
+                    return rule['vendor'], rule['id']
+        if self._vendor_product_re:
+            for product in products:
+                if not product:
+                    continue
+                match = self._vendor_product_re.search(product)
+                if match:
+                    rule = self._vendor_product_groups[match.lastgroup]
+                    return rule['vendor'], rule['id']
+        return '', ''
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna os contadores de memorização."""
+        return {'hits': self.memo_hits, 'misses': self.memo_misses,
+                'entries': len(self._memo) + len(self._vendor_memo)}
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> FingerprintEngine:
+    """Retorna o motor compartilhado, carregando as regras no primeiro uso."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FingerprintEngine()
+    return _engine
+
+
+def _synthetic_hosts(count: int, seed: int = 42) -> List[dict]:
+    """Gera hosts no formato do python-nmap para o micro-benchmark."""
+    import random
+    rng = random.Random(seed)
+    services = [
+        (9100, 'jetdirect', 'HP LaserJet M402dn', ''), (631, 'ipp', 'CUPS', '2.3'),
+        (515, 'printer', '', ''), (80, 'http', 'HP HTTP Server', '2.0'),
+        (80, 'http', 'Apache httpd', '2.4.41'), (80, 'http', 'nginx', '1.18'),
+        (443, 'https', 'Microsoft IIS httpd', '10.0'), (22, 'ssh', 'OpenSSH', '8.2p1'),
+        (445, 'microsoft-ds', 'Microsoft Windows 10 microsoft-ds', ''),
+        (139, 'netbios-ssn', 'Microsoft Windows netbios-ssn', ''), (21, 'ftp', 'vsftpd', '3.0.3'),
+        (53, 'domain', 'dnsmasq', '2.80'), (25, 'smtp', 'Postfix smtpd', ''),
+        (80, 'http', 'Canon http server', '1.00'), (80, 'http', 'EPSON HTTP Server', ''),
+    ]
+    os_names = ['', 'Microsoft Windows 10', 'Linux 4.15', 'HP LaserJet printer', 'Microsoft Windows Server 2019']
+    hosts = []
+    for _ in range(count):
+        tcp = {}
+        for port, name, product, version in rng.sample(services, rng.randint(0, 4)):
+            tcp[port] = {'state': 'open', 'name': name, 'product': product, 'version': version}
+        os_name = rng.choice(os_names)
+        hosts.append({'tcp': tcp, 'osmatch': [{'name': os_name}] if os_name else []})
+    return hosts
+
+
+def run_benchmark(count: int = 100_000):
+    """Micro-benchmark: classifica `count` hosts sintéticos e mostra a vazão."""
+    import time
+
+    hosts = _synthetic_hosts(count)
+
+    start = time.perf_counter()
+    engine = FingerprintEngine()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for host in hosts:
+        engine.classify(host)
+        engine.vendor_from_products(host)
+    elapsed = time.perf_counter() - start
+
+    stats = engine.stats()
+    print(f"Regras v{engine.version} carregadas e compiladas em {load_ms:.1f} ms")
+    print(f"{count} hosts classificados em {elapsed:.3f} s "
+          f"({count / elapsed:,.0f} hosts/s, {elapsed / count * 1e6:.2f} µs/host)")
+    print(f"Memorização: {stats['hits']} acertos, {stats['misses']} faltas, {stats['entries']} assinaturas")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        run_benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+    else:
+        print("Uso: python fingerprint_engine.py --bench [quantidade]")
@@ -0,0 +1,498 @@
+# inventory_db.py
+"""
+Histórico dos scans em SQLite, com detecção de mudanças entre scans.
+
+Cada scan concluído grava seus hosts, portas e impressoras compartilhadas.
+As tabelas usam chave primária (scan_id, ip_num, ...) sem rowid, então os
+hosts de um scan já saem do disco ordenados por IP: a comparação entre dois
+scans é uma junção por intercalação (merge join) de dois cursores
+ordenados, sem laços aninhados nem carregar os scans inteiros na memória.
+
+Hosts com etapas puladas (DeviceRecord.skipped) são gravados com a lista
+das etapas; a comparação não olha campos, portas nem impressoras desses
+hosts, que só entram como novos ou desaparecidos.
+
+A tabela sightings guarda, por dispositivo e por compartilhamento, a
+primeira e a última vez em que foi visto, e responde "quando esta
+impressora foi vista pela última vez" por índice.
+
+Uso pela linha de comando:
+
+    python inventory_db.py scans
+    python inventory_db.py diff [SCAN_ANTIGO SCAN_NOVO]
+    python inventory_db.py last-seen IP|MAC|COMPARTILHAMENTO
+"""
+import hashlib
+import ipaddress
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from device_record import DeviceRecord
+from export_sinks import ExportSink
+
+
+DEFAULT_INVENTORY_FILE = "inventory.db"
+
+# Campos do host comparados entre scans (além de portas e impressoras)
+COMPARED_FIELDS = ('hostname', 'mac', 'vendor', 'type', 'model', 'domain')
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT NOT NULL,
+        finished_at TEXT,
+        status TEXT NOT NULL DEFAULT 'running',
+        target TEXT,
+        range_start INTEGER,
+        range_end INTEGER,
+        host_count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS hosts (
+        scan_id INTEGER NOT NULL,
+        ip_num INTEGER NOT NULL,
+        ip TEXT NOT NULL,
+        hostname TEXT, mac TEXT, vendor TEXT, type TEXT, status TEXT,
+        domain TEXT, model TEXT, rule TEXT, confidence REAL,
+        signature TEXT NOT NULL,
+        skipped TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (scan_id, ip_num)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS hosts_by_ip ON hosts (ip_num, scan_id);
+    CREATE TABLE IF NOT EXISTS ports (
+        scan_id INTEGER NOT NULL,
+        ip_num INTEGER NOT NULL,
+        port INTEGER NOT NULL,
+        state TEXT, name TEXT, product TEXT, version TEXT,
+        PRIMARY KEY (scan_id, ip_num, port)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS printers (
+        scan_id INTEGER NOT NULL,
+        ip_num INTEGER NOT NULL,
+        share_name TEXT NOT NULL,
+        name TEXT, driver TEXT, location TEXT, comment TEXT,
+        PRIMARY KEY (scan_id, ip_num, share_name)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS sightings (
+        key TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        ip TEXT, mac TEXT, name TEXT,
+        first_seen TEXT NOT NULL,
+        last_seen TEXT NOT NULL,
+        last_scan_id INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS sightings_by_ip ON sightings (ip);
+    CREATE INDEX IF NOT EXISTS sightings_by_mac ON sightings (mac);
+    CREATE INDEX IF NOT EXISTS sightings_by_name ON sightings (name COLLATE NOCASE);
+"""
+
+
+def ip_to_int(ip: str) -> int:
+    """Converte o IP para inteiro (ordem numérica nas chaves)."""
+    return int(ipaddress.ip_address(ip))
+
+
+def record_signature(record: DeviceRecord) -> str:
+    """
+    Assinatura estável de um host: muda quando nome, MAC, tipo, portas abertas
+    ou impressoras compartilhadas mudam (o texto de status não entra).
+    """
+    shares = sorted((printer.get('ShareName') or printer.get('Name') or '') for printer in record.shared_printers)
+    material = '|'.join((record.hostname, record.mac, record.vendor, record.type, record.model,
+                         ','.join(map(str, sorted(record.open_ports()))), ','.join(shares)))
+    return hashlib.sha1(material.encode('utf-8')).hexdigest()[:16]
+
+
+def merge_join(left: Iterator[tuple], right: Iterator[tuple], key) -> Iterator[Tuple[object, Optional[tuple], Optional[tuple]]]:
+    """
+    Intercala dois iteradores ordenados pela mesma chave.
+
+    Yields:
+        (chave, linha da esquerda ou None, linha da direita ou None)
+    """
+    sentinel = object()
+    left_row = next(left, sentinel)
+    right_row = next(right, sentinel)
+    while left_row is not sentinel or right_row is not sentinel:
+        if right_row is sentinel or (left_row is not sentinel and key(left_row) < key(right_row)):
+            yield key(left_row), left_row, None
+            left_row = next(left, sentinel)
+        elif left_row is sentinel or key(right_row) < key(left_row):
+            yield key(right_row), None, right_row
+            right_row = next(right, sentinel)
+        else:
+            yield key(left_row), left_row, right_row
+            left_row = next(left, sentinel)
+            right_row = next(right, sentinel)
+
+
+@dataclass
+class ScanDiff:
+    """Mudanças entre dois scans (só nos endereços cobertos pelos dois)."""
+    old_scan: int
+    new_scan: int
+    new_hosts: List[dict] = field(default_factory=list)
+    gone_hosts: List[dict] = field(default_factory=list)
+    changed_hosts: Dict[str, Dict[str, tuple]] = field(default_factory=dict)
+    new_printers: List[Tuple[str, str]] = field(default_factory=list)
+    gone_printers: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.new_hosts or self.gone_hosts or self.changed_hosts
+                    or self.new_printers or self.gone_printers)
+
+    def summary(self) -> str:
+        """Resumo em uma linha para a barra de status."""
+        if self.is_empty:
+            return f"Nenhuma mudança desde o scan #{self.old_scan}."
+        return (f"Desde o scan #{self.old_scan}: {len(self.new_hosts)} novos, "
+                f"{len(self.gone_hosts)} sumiram, {len(self.changed_hosts)} alterados, "
+                f"{len(self.new_printers)} impressoras novas, {len(self.gone_printers)} removidas.")
+
+
+class InventoryDB:
+    """Banco de inventário; seguro para uso pela thread de scan e pela interface."""
+
+    def __init__(self, path: str = DEFAULT_INVENTORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        # Inventários criados antes da coluna de etapas puladas
+        columns = {row['name'] for row in self._db.execute("PRAGMA table_info(hosts)")}
+        if 'skipped' not in columns:
+            self._db.execute("ALTER TABLE hosts ADD COLUMN skipped TEXT NOT NULL DEFAULT ''")
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ------------------------------------------------------------------ #
+    # Gravação
+    # ------------------------------------------------------------------ #
+    def begin_scan(self, target: str, ips: List[str]) -> int:
+        """
+        Registra o início de um scan.
+
+        Args:
+            target (str): Intervalo digitado pelo usuário
+            ips (list): IPs que serão escaneados (define a faixa coberta)
+
+        Returns:
+            int: Identificador do scan
+        """
+        numbers = [ip_to_int(ip) for ip in ips]
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO scans (started_at, target, range_start, range_end) VALUES (?, ?, ?, ?)",
+                (time.strftime('%Y-%m-%dT%H:%M:%S'), target, min(numbers, default=None), max(numbers, default=None))
+            )
+            return cursor.lastrowid
+
+    def add_hosts(self, scan_id: int, records: List[DeviceRecord]):
+        """Grava um lote de hosts de um scan em uma transação."""
+        now = time.strftime('%Y-%m-%dT%H:%M:%S')
+        hosts, ports, printers, sightings = [], [], [], []
+        for record in records:
+            ip_num = ip_to_int(record.ip)
+            hosts.append((scan_id, ip_num, record.ip, record.hostname, record.mac, record.vendor,
+                          record.type, record.simple_status, record.domain, record.model,
+                          record.rule, record.confidence, record_signature(record), ','.join(record.skipped)))
+            ports.extend((scan_id, ip_num) + port for port in record.iter_ports())
+            for printer in record.shared_printers:
+                share = printer.get('ShareName') or printer.get('Name') or ''
+                printers.append((scan_id, ip_num, share, printer.get('Name', ''), printer.get('DriverName', ''),
+                                 printer.get('Location', ''), printer.get('Comment', '')))
+                sightings.append((f"share:{record.ip}\\{share}".lower(), 'share', record.ip, record.mac,
+                                  share, now, now, scan_id))
+            kind = 'printer' if record.is_printer else 'host'
+            sightings.append((f"device:{(record.mac or record.ip).lower()}", kind, record.ip, record.mac,
+                              record.hostname, now, now, scan_id))
+
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO hosts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", hosts)
+            self._db.executemany("INSERT OR REPLACE INTO ports VALUES (?, ?, ?, ?, ?, ?, ?)", ports)
+            self._db.executemany("INSERT OR REPLACE INTO printers VALUES (?, ?, ?, ?, ?, ?, ?)", printers)
+            self._db.executemany(
+                "INSERT INTO sightings VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET kind = excluded.kind, ip = excluded.ip, mac = excluded.mac, "
+                "name = excluded.name, last_seen = excluded.last_seen, last_scan_id = excluded.last_scan_id",
+                sightings
+            )
+
+    def finish_scan(self, scan_id: int, status: str = 'complete'):
+        """Marca o scan como concluído ('complete'), interrompido ('cancelled') ou com hosts faltando ('partial')."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE scans SET finished_at = ?, status = ?, "
+                "host_count = (SELECT COUNT(*) FROM hosts WHERE scan_id = ?) WHERE id = ?",
+                (time.strftime('%Y-%m-%dT%H:%M:%S'), status, scan_id, scan_id)
+            )
+
+    # ------------------------------------------------------------------ #
+    # Consultas
+    # ------------------------------------------------------------------ #
+    def list_scans(self, limit: int = 20) -> List[dict]:
+        """Últimos scans, do mais recente para o mais antigo."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM scans ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_scan(self, scan_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM scans WHERE id = ?", (scan_id,)).fetchone()
+        return dict(row) if row else None
+
+    def previous_scan(self, scan_id: int) -> Optional[int]:
+        """Último scan concluído antes deste cuja faixa se sobrepõe à dele."""
+        scan = self.get_scan(scan_id)
+        if not scan or scan['range_start'] is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM scans WHERE id < ? AND status = 'complete' "
+                "AND range_start <= ? AND range_end >= ? ORDER BY id DESC LIMIT 1",
+                (scan_id, scan['range_end'], scan['range_start'])
+            ).fetchone()
+        return row['id'] if row else None
+
+    def baseline_scan(self, ips: List[str]) -> Optional[int]:
+        """Scan concluído mais recente cuja faixa se sobrepõe aos IPs (base do scan delta)."""
+        numbers = [ip_to_int(ip) for ip in ips]
+        if not numbers:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM scans WHERE status = 'complete' AND range_start <= ? AND range_end >= ? "
+                "ORDER BY id DESC LIMIT 1",
+                (max(numbers), min(numbers))
+            ).fetchone()
+        return row['id'] if row else None
+
+    def load_records(self, scan_id: int, ips: Optional[List[str]] = None) -> Dict[str, DeviceRecord]:
+        """
+        Reconstrói os registros de um scan gravado, limitados aos IPs informados.
+
+        Args:
+            scan_id (int): Scan de origem
+            ips (list): IPs de interesse (None: todos os hosts do scan)
+
+        Returns:
+            dict: IP -> DeviceRecord com portas, serviços e impressoras compartilhadas
+        """
+        if ips is None:
+            numbers = None
+            bounds = (scan_id,)
+            where = "WHERE scan_id = ? ORDER BY ip_num"
+        else:
+            numbers = {ip_to_int(ip) for ip in ips}
+            if not numbers:
+                return {}
+            bounds = (scan_id, min(numbers), max(numbers))
+            where = "WHERE scan_id = ? AND ip_num BETWEEN ? AND ? ORDER BY ip_num"
+        with self._lock:
+            hosts = self._db.execute("SELECT * FROM hosts " + where, bounds).fetchall()
+            ports = self._db.execute("SELECT ip_num, port, state, name, product, version FROM ports "
+                                     + where, bounds).fetchall()
+            printers = self._db.execute("SELECT ip_num, share_name, name, driver, location, comment FROM printers "
+                                        + where, bounds).fetchall()
+
+        tcp: Dict[int, dict] = {}
+        for ip_num, port, state, name, product, version in ports:
+            tcp.setdefault(ip_num, {})[port] = {'state': state, 'name': name, 'product': product, 'version': version}
+        shared: Dict[int, list] = {}
+        for ip_num, share, name, driver, location, comment in printers:
+            shared.setdefault(ip_num, []).append({'Name': name, 'ShareName': share, 'DriverName': driver,
+                                                  'Location': location, 'Comment': comment})
+
+        records = {}
+        for host in hosts:
+            if numbers is not None and host['ip_num'] not in numbers:
+                continue
+            record = DeviceRecord(host['ip'], host['hostname'], host['mac'], host['vendor'], host['type'],
+                                  host['status'], 'up', host['domain'])
+            record.model = host['model'] or ''
+            record.rule = host['rule'] or ''
+            record.confidence = host['confidence'] or 0.0
+            record.set_ports(tcp.get(host['ip_num'], {}))
+            record.shared_printers = shared.get(host['ip_num'], [])
+            if host['skipped']:
+                record.skipped = tuple(host['skipped'].split(','))
+            records[record.ip] = record
+        return records
+
+    def last_seen(self, query: str) -> List[dict]:
+        """
+        Quando um dispositivo ou compartilhamento foi visto pela última vez.
+
+        Args:
+            query (str): IP, MAC, nome do compartilhamento ou caminho \\\\ip\\compartilhamento
+
+        Returns:
+            list: Registros de sightings, do visto mais recentemente ao mais antigo
+        """
+        query = query.strip()
+        keys = [f"device:{query.lower()}", f"share:{query.lstrip(chr(92)).lower()}"]
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM sightings WHERE key IN (?, ?) OR ip = ? OR mac = ? OR name = ? COLLATE NOCASE "
+                "ORDER BY last_seen DESC",
+                (keys[0], keys[1], query, query.upper(), query)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _cursor(self, sql: str, scan_id: int) -> Iterator[tuple]:
+        # Conexão própria de leitura: os dois cursores avançam intercalados sem segurar o lock
+        connection = sqlite3.connect(self.path)
+        try:
+            yield from connection.execute(sql, (scan_id,))
+        finally:
+            connection.close()
+
+    def diff(self, old_scan: int, new_scan: int) -> ScanDiff:
+        """
+        Compara dois scans por merge join dos hosts, portas e impressoras ordenados por IP.
+
+        Só entram endereços cobertos pelos dois scans: um host fora da faixa do
+        scan novo não é contado como desaparecido. Um host com etapas puladas
+        em qualquer dos scans não tem campos, portas nem impressoras comparados
+        (o que faltou nele não é mudança).
+
+        Returns:
+            ScanDiff: Hosts novos, desaparecidos e alterados; impressoras novas e removidas
+        """
+        old_info, new_info = self.get_scan(old_scan), self.get_scan(new_scan)
+        if not old_info or not new_info:
+            raise ValueError(f"Scan inexistente: {old_scan if not old_info else new_scan}")
+
+        def covered(ip_num: int, scan: dict) -> bool:
+            return scan['range_start'] is None or scan['range_start'] <= ip_num <= scan['range_end']
+
+        result = ScanDiff(old_scan, new_scan)
+        changed: Dict[int, Dict[str, tuple]] = {}
+        partial = set()
+        host_sql = ("SELECT ip_num, ip, " + ", ".join(COMPARED_FIELDS) + ", signature, skipped "
+                    "FROM hosts WHERE scan_id = ? ORDER BY ip_num")
+        signature_index = len(COMPARED_FIELDS) + 2
+        skipped_index = signature_index + 1
+        for ip_num, old, new in merge_join(self._cursor(host_sql, old_scan), self._cursor(host_sql, new_scan),
+                                           key=lambda row: row[0]):
+            if (old is not None and old[skipped_index]) or (new is not None and new[skipped_index]):
+                partial.add(ip_num)
+            if new is None:
+                if covered(ip_num, new_info):
+                    result.gone_hosts.append(dict(zip(('ip_num', 'ip') + COMPARED_FIELDS, old)))
+            elif old is None:
+                if covered(ip_num, old_info):
+                    result.new_hosts.append(dict(zip(('ip_num', 'ip') + COMPARED_FIELDS, new)))
+            elif ip_num in partial:
+                continue
+            elif old[signature_index] != new[signature_index]:
+                changes = {name: (old[i + 2], new[i + 2]) for i, name in enumerate(COMPARED_FIELDS)
+                           if old[i + 2] != new[i + 2]}
+                result.changed_hosts[new[1]] = changed[ip_num] = changes
+
+        # Portas: só para hosts presentes nos dois scans cuja assinatura mudou
+        port_sql = "SELECT ip_num, port, state FROM ports WHERE scan_id = ? ORDER BY ip_num, port"
+        for (ip_num, port), old, new in merge_join(self._cursor(port_sql, old_scan), self._cursor(port_sql, new_scan),
+                                                   key=lambda row: (row[0], row[1])):
+            if ip_num not in changed:
+                continue
+            old_state = old[2] if old else ''
+            new_state = new[2] if new else ''
+            if (old_state == 'open') != (new_state == 'open'):
+                changed[ip_num][f"porta {port}"] = (old_state or '-', new_state or '-')
+
+        printer_sql = "SELECT ip_num, share_name FROM printers WHERE scan_id = ? ORDER BY ip_num, share_name"
+        for (ip_num, share), old, new in merge_join(self._cursor(printer_sql, old_scan),
+                                                    self._cursor(printer_sql, new_scan),
+                                                    key=lambda row: (row[0], row[1])):
+            if (old is not None and new is not None) or ip_num in partial:
+                continue
+            ip = str(ipaddress.ip_address(ip_num))
+            if new is None and covered(ip_num, new_info):
+                result.gone_printers.append((ip, share))
+            elif old is None and covered(ip_num, old_info):
+                result.new_printers.append((ip, share))
+            if ip_num in changed:
+                changed[ip_num][f"impressora {share}"] = ('-' if old is None else share, '-' if new is None else share)
+        return result
+
+    def diff_with_previous(self, scan_id: int) -> Optional[ScanDiff]:
+        """Compara o scan com o anterior que cobre a mesma faixa (None se não há anterior)."""
+        previous = self.previous_scan(scan_id)
+        return self.diff(previous, scan_id) if previous else None
+
+
+class InventorySink(ExportSink):
+    """Grava os resultados de um scan no inventário à medida que chegam."""
+
+    def __init__(self, inventory: InventoryDB, target: str, ips: List[str]):
+        super().__init__(inventory.path)
+        self.inventory = inventory
+        self.scan_id = inventory.begin_scan(target, ips)
+        self.status = 'complete'
+
+    def _write_batch(self, records: List[DeviceRecord]):
+        self.inventory.add_hosts(self.scan_id, records)
+
+    def _close(self):
+        self.inventory.finish_scan(self.scan_id, self.status)
+
+
+def open_inventory(path: str = DEFAULT_INVENTORY_FILE) -> Optional[InventoryDB]:
+    """Abre o inventário; retorna None (e o scan segue sem histórico) se não for possível."""
+    try:
+        return InventoryDB(path)
+    except sqlite3.Error as e:
+        print(f"Erro ao abrir o inventário {path}: {e}")
+        return None
+
+
+def _print_diff(diff: ScanDiff):
+    print(diff.summary())
+    for host in diff.new_hosts:
+        print(f"  + {host['ip']} {host['hostname'] or ''} ({host['type']})")
+    for host in diff.gone_hosts:
+        print(f"  - {host['ip']} {host['hostname'] or ''} ({host['type']})")
+    for ip, changes in diff.changed_hosts.items():
+        details = ", ".join(f"{name}: {old} -> {new}" for name, (old, new) in changes.items())
+        print(f"  ~ {ip}: {details}")
+    for ip, share in diff.new_printers:
+        print(f"  + \\\\{ip}\\{share}")
+    for ip, share in diff.gone_printers:
+        print(f"  - \\\\{ip}\\{share}")
+
+
+if __name__ == "__main__":
+    inventory = InventoryDB()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'scans'
+    if command == 'scans':
+        for scan in inventory.list_scans():
+            print(f"#{scan['id']}  {scan['started_at']}  {scan['status']:<9}  "
+                  f"{scan['host_count']:>6} hosts  {scan['target'] or ''}")
+    elif command == 'diff':
+        if len(sys.argv) > 3:
+            _print_diff(inventory.diff(int(sys.argv[2]), int(sys.argv[3])))
+        else:
+            scans = [scan for scan in inventory.list_scans() if scan['status'] == 'complete']
+            diff = inventory.diff_with_previous(scans[0]['id']) if scans else None
+            if diff is None:
+                print("Não há dois scans concluídos da mesma faixa para comparar.")
+            else:
+                _print_diff(diff)
+    elif command == 'last-seen' and len(sys.argv) > 2:
+        for row in inventory.last_seen(sys.argv[2]):
+            print(f"{row['kind']:<8} {row['ip']:<15} {row['mac'] or '':<17} {row['name'] or '':<25} "
+                  f"visto por último em {row['last_seen']} (scan #{row['last_scan_id']}), "
+                  f"primeira vez em {row['first_seen']}")
+    else:
+        print(__doc__)
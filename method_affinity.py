@@ -0,0 +1,170 @@
+# method_affinity.py
+import ipaddress
+import json
+import os
+import threading
+import time
+from typing import Dict, List
+
+
+# Ao lado do programa: o histórico é o mesmo qualquer que seja o diretório de trabalho
+DEFAULT_AFFINITY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "method_affinity.json")
+
+# Peso de cada nível: o histórico do próprio host vale mais que o da sub-rede ou do domínio
+SCOPE_WEIGHTS = {'host': 4, 'subnet': 2, 'domain': 1}
+
+# Hosts em que nenhum método funcionou recebem só uma tentativa durante este período
+# (por credencial: uma senha errada não marca o host para as demais)
+UNREACHABLE_TTL = 24 * 3600
+
+# Intervalo mínimo entre gravações do arquivo durante um scan
+SAVE_INTERVAL = 5.0
+
+
+def _subnet_of(ip: str) -> str:
+    try:
+        return str(ipaddress.ip_network(f"{ip}/24", strict=False))
+    except ValueError:
+        return ''
+
+
+class MethodAffinityStore:
+    """
+    Memória de quais métodos de enumeração funcionam em cada host, sub-rede e domínio.
+
+    Cada escopo guarda contadores de sucesso e falha por método. A ordem de
+    tentativa é dada pela soma ponderada desses contadores; empates mantêm a
+    ordem padrão dos métodos. O histórico é gravado em JSON na pasta do
+    programa (DEFAULT_AFFINITY_FILE).
+    """
+
+    def __init__(self, path: str = DEFAULT_AFFINITY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._unreachable: Dict[str, float] = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self.load()
+
+    def load(self):
+        """Carrega o histórico salvo, se existir."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            with self._lock:
+                self._scopes = data.get('scopes', {})
+                self._unreachable = data.get('unreachable', {})
+        except (OSError, ValueError) as e:
+            print(f"Erro ao carregar afinidade de métodos: {e}")
+
+    def save(self):
+        """Grava o histórico (arquivo temporário + substituição)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            data = {
+                'scopes': self._scopes,
+                'unreachable': {ip: until for ip, until in self._unreachable.items() if until > now},
+            }
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Erro ao salvar afinidade de métodos: {e}")
+
+    def _maybe_save(self):
+        if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            self.save()
+
+    @staticmethod
+    def _scope_keys(ip: str, domain: str = '') -> Dict[str, str]:
+        keys = {'host': f"host:{ip}"}
+        subnet = _subnet_of(ip)
+        if subnet:
+            keys['subnet'] = f"subnet:{subnet}"
+        if domain:
+            keys['domain'] = f"domain:{domain.lower()}"
+        return keys
+
+    def _score(self, keys: Dict[str, str], method: str) -> int:
+        score = 0
+        for scope, key in keys.items():
+            counters = self._scopes.get(key, {}).get(method)
+            if counters:
+                score += SCOPE_WEIGHTS[scope] * (counters.get('success', 0) - counters.get('failure', 0))
+        return score
+
+    def rank(self, ip: str, methods: List[str], domain: str = '') -> List[str]:
+        """
+        Ordena os métodos pela chance de sucesso neste host.
+
+        Args:
+            ip (str): Endereço IP do host
+            methods (list): Métodos disponíveis, na ordem padrão
+            domain (str): Domínio do host, se conhecido
+
+        Returns:
+            list: Métodos do mais para o menos provável
+        """
+        keys = self._scope_keys(ip, domain)
+        with self._lock:
+            scores = {method: self._score(keys, method) for method in methods}
+        return sorted(methods, key=lambda method: -scores[method])
+
+    def has_history(self, ip: str, domain: str = '') -> bool:
+        """Indica se algum método já funcionou no host, na sub-rede ou no domínio."""
+        with self._lock:
+            return any(
+                counters.get('success', 0) > 0
+                for key in self._scope_keys(ip, domain).values()
+                for counters in self._scopes.get(key, {}).values()
+            )
+
+    @staticmethod
+    def _unreachable_key(ip: str, credentials: str = 'anonymous') -> str:
+        return ip if credentials == 'anonymous' else f"{ip}|{credentials}"
+
+    def is_unreachable(self, ip: str, credentials: str = 'anonymous') -> bool:
+        """
+        Indica se todos os métodos falharam recentemente neste host com estas credenciais.
+
+        Args:
+            ip (str): Endereço IP do host
+            credentials (str): CredentialContext.fingerprint das credenciais usadas
+        """
+        with self._lock:
+            return self._unreachable.get(self._unreachable_key(ip, credentials), 0) > time.time()
+
+    def _record(self, ip: str, domain: str, method: str, field: str):
+        with self._lock:
+            for key in self._scope_keys(ip, domain).values():
+                counters = self._scopes.setdefault(key, {}).setdefault(method, {'success': 0, 'failure': 0})
+                counters[field] += 1
+            if field == 'success':
+                for key in [key for key in self._unreachable if key == ip or key.startswith(ip + '|')]:
+                    del self._unreachable[key]
+            self._dirty = True
+        self._maybe_save()
+
+    def record_success(self, ip: str, method: str, domain: str = ''):
+        """Registra que o método funcionou no host."""
+        self._record(ip, domain, method, 'success')
+
+    def record_failure(self, ip: str, method: str, domain: str = ''):
+        """Registra que o método falhou no host."""
+        self._record(ip, domain, method, 'failure')
+
+    def mark_unreachable(self, ip: str, credentials: str = 'anonymous'):
+        """Registra que nenhum método funcionou no host com estas credenciais."""
+        with self._lock:
+            self._unreachable[self._unreachable_key(ip, credentials)] = time.time() + UNREACHABLE_TTL
+            self._dirty = True
+        self._maybe_save()
@@ -0,0 +1,376 @@
+# monitor.py
+"""
+Monitoramento contínuo da rede, sem interface gráfica.
+
+Cada sub-rede configurada tem duas tarefas com intervalos próprios:
+
+    verificação de impressoras   conexão TCP às portas conhecidas de cada
+                                 impressora (a cada poucos minutos)
+    varredura                    scan da faixa pelo mesmo pipeline da
+                                 interface, gravado no inventário; com
+                                 "delta" ligado, o espaço sem hosts é só
+                                 amostrado (a cada algumas horas)
+
+Os horários recebem um desvio aleatório (jitter) para que sub-redes com o
+mesmo intervalo não disparem juntas. Cada tarefa vencida roda em uma thread
+própria (no máximo uma de cada tipo por sub-rede), então uma varredura longa
+não atrasa as verificações das outras sub-redes; as verificações usam um
+pool separado do das varreduras. As mudanças viram eventos
+(printer_appeared, printer_gone, printer_offline, printer_online,
+share_added, share_removed, device_changed) gravados em JSON Lines e/ou
+enviados a um webhook.
+
+A memória fica limitada: os resultados vão direto para o inventário, o
+monitor só guarda as portas de verificação das impressoras conhecidas, e
+cada tarefa mantém no máximo MAX_IN_FLIGHT hosts pendentes no pool.
+
+Uso:
+
+    python monitor.py [monitor.json]
+"""
+import heapq
+import json
+import random
+import signal
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from inventory_db import InventoryDB, InventorySink, open_inventory
+from printer_utils import WindowsPrinterManager
+from scan_cache import reset_scan_caches
+from scan_pipeline import parse_ip_range, scan_host
+from scan_policy import DeltaScanPolicy, ScanPolicy, VERIFY_MAX_PORTS, PREFERRED_VERIFY_PORTS, tcp_connect
+
+
+DEFAULT_CONFIG_FILE = "monitor.json"
+DEFAULT_EVENTS_FILE = "monitor_events.jsonl"
+
+PRINTER_CHECK_INTERVAL = 300
+SWEEP_INTERVAL = 6 * 3600
+JITTER = 0.2
+WORKERS = 10
+MAX_IN_FLIGHT = 40
+WEBHOOK_TIMEOUT = 5.0
+
+
+def jittered(interval: float, jitter: float) -> float:
+    """Intervalo com desvio aleatório de até ±jitter (fração do intervalo)."""
+    return max(1.0, interval * (1 + random.uniform(-jitter, jitter)))
+
+
+def run_bounded(executor: ThreadPoolExecutor, function: Callable, items: Iterable,
+                limit: int = MAX_IN_FLIGHT, stop: Optional[threading.Event] = None) -> Iterator:
+    """
+    Executa function(item) no pool com no máximo `limit` tarefas pendentes.
+
+    Yields:
+        Resultados na ordem em que ficam prontos (exceções são registradas e ignoradas)
+    """
+    pending = set()
+    items = iter(items)
+    sentinel = object()
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) < limit and not (stop and stop.is_set()):
+            item = next(items, sentinel)
+            if item is sentinel:
+                exhausted = True
+                break
+            pending.add(executor.submit(function, item))
+        if stop and stop.is_set():
+            exhausted = True
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"Erro no monitor: {e}")
+
+
+class EventSink:
+    """Grava eventos em JSON Lines e/ou os envia por POST a um webhook."""
+
+    def __init__(self, log_path: Optional[str] = DEFAULT_EVENTS_FILE, webhook: Optional[str] = None):
+        self.log_path = log_path
+        self.webhook = webhook
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **data):
+        """Registra um evento (ex: emit('printer_offline', ip='10.0.0.5', subnet='10.0.0.0/24'))."""
+        payload = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'event': event}
+        payload.update(data)
+        line = json.dumps(payload, ensure_ascii=False, default=str)
+        print(line)
+        if self.log_path:
+            with self._lock:
+                try:
+                    with open(self.log_path, 'a', encoding='utf-8') as f:
+                        f.write(line + '\n')
+                except OSError as e:
+                    print(f"Erro ao gravar evento em {self.log_path}: {e}")
+        if self.webhook:
+            request = urllib.request.Request(self.webhook, data=line.encode('utf-8'),
+                                             headers={'Content-Type': 'application/json'}, method='POST')
+            try:
+                urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT).close()
+            except OSError as e:
+                print(f"Erro ao enviar evento ao webhook: {e}")
+
+
+@dataclass
+class SubnetMonitor:
+    """Estado de uma sub-rede monitorada."""
+    target: str
+    ips: List[str]
+    printer_interval: float = PRINTER_CHECK_INTERVAL
+    sweep_interval: float = SWEEP_INTERVAL
+    delta: bool = True
+    # IP -> (portas de verificação, online na última verificação)
+    printers: Dict[str, Tuple[Tuple[int, ...], bool]] = field(default_factory=dict)
+
+
+class NetworkMonitor:
+    """Agenda as verificações e varreduras de cada sub-rede e emite os eventos de mudança."""
+
+    def __init__(self, subnets: List[SubnetMonitor], inventory: InventoryDB, events: EventSink,
+                 jitter: float = JITTER, workers: int = WORKERS):
+        self.subnets = subnets
+        self.inventory = inventory
+        self.events = events
+        self.jitter = jitter
+        self.workers = workers
+        self._stop = threading.Event()
+        # Varreduras em andamento: os caches de scan são compartilhados entre elas
+        self._sweeps_lock = threading.Lock()
+        self._active_sweeps = 0
+        for subnet in subnets:
+            self._load_printers(subnet)
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def _verify_ports(record) -> Tuple[int, ...]:
+        open_ports = record.open_ports()
+        preferred = [port for port in PREFERRED_VERIFY_PORTS if port in open_ports]
+        others = [port for port in open_ports if port not in preferred]
+        return tuple((preferred + others)[:VERIFY_MAX_PORTS])
+
+    def _load_printers(self, subnet: SubnetMonitor):
+        baseline = self.inventory.baseline_scan(subnet.ips)
+        if baseline is None:
+            return
+        records = self.inventory.load_records(baseline, subnet.ips)
+        subnet.printers = {ip: (self._verify_ports(record), True)
+                           for ip, record in records.items() if record.is_printer}
+
+    # ------------------------------------------------------------------ #
+    # Tarefas
+    # ------------------------------------------------------------------ #
+    def check_printers(self, subnet: SubnetMonitor, executor: ThreadPoolExecutor):
+        """Confirma cada impressora conhecida com uma conexão TCP às suas portas."""
+        def probe(item):
+            ip, (ports, _) = item
+            return ip, any(tcp_connect(ip, port) for port in ports)
+
+        for ip, online in run_bounded(executor, probe, list(subnet.printers.items()), stop=self._stop):
+            # Uma varredura da mesma sub-rede pode ter trocado a lista durante a verificação
+            if ip not in subnet.printers:
+                continue
+            ports, was_online = subnet.printers[ip]
+            if online != was_online:
+                self.events.emit('printer_online' if online else 'printer_offline', ip=ip, subnet=subnet.target)
+            subnet.printers[ip] = (ports, online)
+
+    def sweep(self, subnet: SubnetMonitor, executor: ThreadPoolExecutor):
+        """Escaneia a faixa pelo pipeline da interface, grava no inventário e emite as mudanças."""
+        with self._sweeps_lock:
+            # Como em ScanJobManager.submit: só limpa os caches se nenhuma outra varredura os usa
+            if self._active_sweeps == 0:
+                reset_scan_caches()
+            self._active_sweeps += 1
+        try:
+            self._sweep(subnet, executor)
+        finally:
+            with self._sweeps_lock:
+                self._active_sweeps -= 1
+
+    def _sweep(self, subnet: SubnetMonitor, executor: ThreadPoolExecutor):
+        policy = DeltaScanPolicy(self.inventory) if subnet.delta else ScanPolicy()
+        sink = InventorySink(self.inventory, subnet.target, subnet.ips)
+        printers = {}
+
+        def scan(ip):
+            return policy.scan(ip, scan_host)
+
+        for result in run_bounded(executor, scan, policy.plan(subnet.ips), stop=self._stop):
+            if result:
+                record = result['data']
+                sink.write(record)
+                if record.is_printer:
+                    printers[record.ip] = self._verify_ports(record)
+
+        if self._stop.is_set():
+            sink.status = 'cancelled'
+        elif policy.partial:
+            sink.status = 'partial'
+        sink.close()
+        WindowsPrinterManager.flush_method_affinity()
+        if self._stop.is_set():
+            return
+        print(f"Varredura de {subnet.target}: {sink.written} hosts. {policy.summary()}".rstrip())
+
+        # Hosts com etapas puladas ficam fora da comparação (inventory_db.diff); a varredura
+        # só deixa de ser comparada se a política não cobriu a faixa toda
+        if sink.status == 'partial':
+            print(f"Varredura de {subnet.target} parcial (faixa não coberta); mudanças não comparadas.")
+            # Sem comparação, as impressoras que não apareceram continuam monitoradas
+            printers = dict({ip: ports for ip, (ports, _) in subnet.printers.items()}, **printers)
+        else:
+            diff = self.inventory.diff_with_previous(sink.scan_id)
+            if diff is not None:
+                self._emit_diff(subnet, diff)
+        for ip in printers:
+            if ip in subnet.printers and not subnet.printers[ip][1]:
+                self.events.emit('printer_online', ip=ip, subnet=subnet.target)
+        subnet.printers = {ip: (ports, True) for ip, ports in printers.items()}
+
+    def _emit_diff(self, subnet: SubnetMonitor, diff):
+        for host in diff.new_hosts:
+            if host['type'] in ('network_printer', 'shared_printer'):
+                self.events.emit('printer_appeared', ip=host['ip'], hostname=host['hostname'],
+                                 vendor=host['vendor'], subnet=subnet.target)
+        for host in diff.gone_hosts:
+            if host['type'] in ('network_printer', 'shared_printer'):
+                self.events.emit('printer_gone', ip=host['ip'], hostname=host['hostname'], subnet=subnet.target)
+        for ip, share in diff.new_printers:
+            self.events.emit('share_added', ip=ip, share=share, subnet=subnet.target)
+        for ip, share in diff.gone_printers:
+            self.events.emit('share_removed', ip=ip, share=share, subnet=subnet.target)
+        for ip, changes in diff.changed_hosts.items():
+            # Compartilhamentos já saem como share_added/share_removed
+            changes = {name: list(values) for name, values in changes.items() if not name.startswith('impressora ')}
+            if ip in subnet.printers and changes:
+                self.events.emit('device_changed', ip=ip, subnet=subnet.target, changes=changes)
+
+    # ------------------------------------------------------------------ #
+    # Agenda
+    # ------------------------------------------------------------------ #
+    def run(self):
+        """Executa até stop() (ou SIGINT/SIGTERM quando chamado por main())."""
+        now = time.monotonic()
+        schedule = []
+        for index, subnet in enumerate(self.subnets):
+            # Primeira execução espalhada no início; sem impressoras conhecidas a varredura vem primeiro
+            sweep_delay = random.uniform(0, 30) if not subnet.printers else jittered(subnet.sweep_interval, self.jitter)
+            heapq.heappush(schedule, (now + sweep_delay, index, 'sweep'))
+            heapq.heappush(schedule, (now + random.uniform(0, subnet.printer_interval * self.jitter), index, 'printers'))
+
+        changed = threading.Condition()
+        threads = []
+
+        def run_task(index: int, task: str, executor: ThreadPoolExecutor):
+            subnet = self.subnets[index]
+            try:
+                if task == 'sweep':
+                    self.sweep(subnet, executor)
+                else:
+                    self.check_printers(subnet, executor)
+            except Exception as e:
+                print(f"Erro na tarefa {task} de {subnet.target}: {e}")
+            # Só volta à agenda depois de terminar: nunca duas da mesma tarefa na mesma sub-rede
+            interval = subnet.sweep_interval if task == 'sweep' else subnet.printer_interval
+            with changed:
+                heapq.heappush(schedule, (time.monotonic() + jittered(interval, self.jitter), index, task))
+                changed.notify()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as sweep_executor, \
+                ThreadPoolExecutor(max_workers=self.workers) as check_executor:
+            while not self._stop.is_set():
+                with changed:
+                    delay = schedule[0][0] - time.monotonic() if schedule else 1.0
+                    if delay > 0:
+                        # Acorda quando uma tarefa volta à agenda; o limite de 1 s atende o stop()
+                        changed.wait(min(delay, 1.0))
+                        continue
+                    _, index, task = heapq.heappop(schedule)
+                executor = sweep_executor if task == 'sweep' else check_executor
+                thread = threading.Thread(target=run_task, args=(index, task, executor),
+                                          name=f"monitor-{task}-{index}", daemon=True)
+                thread.start()
+                threads = [other for other in threads if other.is_alive()] + [thread]
+
+            # As tarefas em andamento param pelo evento de stop antes de os pools fecharem
+            for thread in threads:
+                thread.join()
+
+
+def load_config(path: str = DEFAULT_CONFIG_FILE) -> dict:
+    """
+    Lê a configuração do monitor.
+
+    Exemplo:
+        {
+          "subnets": [{"range": "192.168.0.0/24", "printer_interval": 300,
+                       "sweep_interval": 21600, "delta": true}],
+          "jitter": 0.2,
+          "workers": 10,
+          "events": {"log": "monitor_events.jsonl", "webhook": "http://127.0.0.1:9000/hook"}
+        }
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_monitor(config: dict, inventory: InventoryDB) -> NetworkMonitor:
+    """Cria o monitor a partir da configuração."""
+    subnets = []
+    for entry in config.get('subnets', []):
+        subnets.append(SubnetMonitor(
+            target=entry['range'],
+            ips=parse_ip_range(entry['range']),
+            printer_interval=entry.get('printer_interval', PRINTER_CHECK_INTERVAL),
+            sweep_interval=entry.get('sweep_interval', SWEEP_INTERVAL),
+            delta=entry.get('delta', True),
+        ))
+    if not subnets:
+        raise ValueError("Nenhuma sub-rede configurada")
+    events_config = config.get('events', {})
+    events = EventSink(events_config.get('log', DEFAULT_EVENTS_FILE), events_config.get('webhook'))
+    return NetworkMonitor(subnets, inventory, events,
+                          jitter=config.get('jitter', JITTER), workers=config.get('workers', WORKERS))
+
+
+def main(argv: List[str]) -> int:
+    config_path = argv[1] if len(argv) > 1 else DEFAULT_CONFIG_FILE
+    try:
+        config = load_config(config_path)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao ler {config_path}: {e}")
+        return 1
+    inventory = open_inventory()
+    if inventory is None:
+        return 1
+    try:
+        monitor = build_monitor(config, inventory)
+    except (KeyError, ValueError) as e:
+        print(f"Configuração inválida: {e}")
+        return 1
+
+    signal.signal(signal.SIGINT, lambda *_: monitor.stop())
+    signal.signal(signal.SIGTERM, lambda *_: monitor.stop())
+    print(f"Monitorando {len(monitor.subnets)} sub-rede(s). Ctrl+C para encerrar.")
+    monitor.run()
+    inventory.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -4,6 +4,15 @@ import socket
 import subprocess
 import platform
 from printer_utils import get_windows_shared_printers
+from fingerprint_engine import get_engine, Classification
+from oui_registry import lookup_vendor
+
+
+NMAP_ARGUMENTS = '-sV -sS -O --osscan-guess -T4 -p 9100,631,515,139,445,80,443,9443,21,22,23,25,53,110,143,993,995'
+# Folga além do --host-timeout antes de o processo do Nmap ser encerrado à força
+NMAP_KILL_GRACE = 5.0
+# Titulares de OUI que não são o fabricante do equipamento
+NON_VENDOR_ORGANIZATIONS = ('Private', 'IEEE Registration Authority')
 
 
 def get_nmap_scan_data(ip: str) -> dict | None:
@@ -16,27 +25,76 @@ def get_nmap_scan_data(ip: str) -> dict | None:
     Returns:
         dict | None: Dados do scan ou None se o host não estiver ativo
     """
-    try:
-        nm = nmap.PortScanner() 
-        # Scanning mais abrangente para melhor detecção
-        nm.scan(ip, arguments='-sV -sS -O --osscan-guess -T4 -p 9100,631,515,139,445,80,443,21,22,23,25,53,110,143,993,995')
-        
-        if ip in nm.all_hosts() and nm[ip].state() == 'up':
-            return nm[ip]
-        return None
+    return get_nmap_scan_detail(ip)[0]
+
+
+def get_nmap_scan_detail(ip: str, host_timeout: float = None) -> tuple[dict | None, str]:
+    """
+    Como get_nmap_scan_data, mas retorna também o trecho XML do host na saída do Nmap.
+    
+    Args:
+        ip (str): Endereço IP para escanear
+        host_timeout (float): Tempo máximo do Nmap para o host em segundos (None = sem limite)
         
+    Returns:
+        tuple: (dados do scan ou None, XML do elemento <host> ou '')
+    """
+    try:
+        return run_nmap_scan(ip, host_timeout)
     except Exception as e:
         print(f"Erro no Nmap para o IP {ip}: {e}")
-        return None
+        return None, ''
+
+
+def run_nmap_scan(ip: str, host_timeout: float = None) -> tuple[dict | None, str]:
+    """
+    Executa o Nmap para um IP, repassando os erros (para quem quer tentar de novo).
+    
+    Com host_timeout, o Nmap recebe --host-timeout e o processo é encerrado se
+    passar NMAP_KILL_GRACE segundos além disso.
+    
+    Raises:
+        nmap.PortScannerTimeout: Se o processo do Nmap foi encerrado por tempo
+        nmap.PortScannerError: Se o Nmap não pôde ser executado
+    """
+    arguments = NMAP_ARGUMENTS
+    timeout = 0
+    if host_timeout:
+        arguments += f' --host-timeout {max(1, int(host_timeout))}s'
+        timeout = int(host_timeout + NMAP_KILL_GRACE)
+    nm = nmap.PortScanner()
+    # Scanning mais abrangente para melhor detecção
+    nm.scan(ip, arguments=arguments, timeout=timeout)
+    
+    if ip in nm.all_hosts() and nm[ip].state() == 'up':
+        return nm[ip], _host_xml(nm.get_nmap_last_output())
+    return None, ''
+
+
+def nmap_host_timed_out(host_xml: str) -> bool:
+    """Indica se o Nmap abandonou o host pelo --host-timeout (dados incompletos)."""
+    return 'timedout="true"' in host_xml
+
 
+def _host_xml(output) -> str:
+    """Extrai o elemento <host> da saída XML do Nmap (um host por execução)."""
+    if isinstance(output, bytes):
+        output = output.decode('utf-8', errors='replace')
+    start = (output or '').find('<host ')
+    end = output.find('</host>', start) if start >= 0 else -1
+    return output[start:end + len('</host>')] if end >= 0 else ''
 
-def get_hostname_advanced(ip: str, nmap_data: dict = None) -> str:
+
+def get_hostname_advanced(ip: str, nmap_data: dict = None, cert_info: dict = None,
+                          smb_info: dict = None) -> str:
     """
     Obtém o hostname usando múltiplos métodos para maior precisão.
     
     Args:
         ip (str): Endereço IP
         nmap_data (dict): Dados do Nmap (opcional)
+        cert_info (dict): Resumo do certificado TLS do host (opcional, ver tls_probe)
+        smb_info (dict): Nomes obtidos do desafio NTLM via SMB (opcional, ver smb_probe)
         
     Returns:
         str: Hostname encontrado ou string vazia
@@ -50,14 +108,18 @@ def get_hostname_advanced(ip: str, nmap_data: dict = None) -> str:
                 hostname = host_info['name']
                 break
     
-    # Método 2: Resolução DNS reversa nativa do Python
+    # Método 2: Nome informado pelo próprio host no desafio NTLM do SMB
+    if not hostname:
+        hostname = hostname_from_probes(smb_info)
+    
+    # Método 3: Resolução DNS reversa nativa do Python
     if not hostname:
         try:
             hostname = socket.gethostbyaddr(ip)[0]
         except (socket.herror, socket.gaierror, OSError):
             pass
     
-    # Método 3: nslookup do sistema
+    # Método 4: nslookup do sistema
     if not hostname:
         try:
             if platform.system() == "Windows":
@@ -73,7 +135,7 @@ def get_hostname_advanced(ip: str, nmap_data: dict = None) -> str:
         except Exception:
             pass
     
-    # Método 4: ping com resolução de nome (Windows)
+    # Método 5: ping com resolução de nome (Windows)
     if not hostname and platform.system() == "Windows":
         try:
             result = subprocess.run(['ping', '-a', '-n', '1', ip], 
@@ -94,7 +156,7 @@ def get_hostname_advanced(ip: str, nmap_data: dict = None) -> str:
         except Exception:
             pass
     
-    # Método 5: NetBIOS name query (Windows)
+    # Método 6: NetBIOS name query (Windows)
     if not hostname and platform.system() == "Windows":
         try:
             result = subprocess.run(['nbtstat', '-A', ip], 
@@ -115,60 +177,61 @@ def get_hostname_advanced(ip: str, nmap_data: dict = None) -> str:
         except Exception:
             pass
     
+    # Método 7: Nome presente no certificado TLS (CN/SAN)
+    if not hostname:
+        hostname = hostname_from_probes(None, cert_info)
+    
     return hostname
 
 
-def detect_device_type(nmap_data: dict, ip: str) -> tuple[str, str]:
+def hostname_from_probes(smb_info: dict = None, cert_info: dict = None) -> str:
+    """
+    Nome do host a partir das sondas já feitas, sem consultas adicionais.
+    
+    É o que o scan usa por host: as consultas de get_hostname_advanced
+    (nslookup, ping -a, nbtstat) abrem processos e ficam fora do scan.
+    
+    Args:
+        smb_info (dict): Nomes obtidos do desafio NTLM via SMB (opcional, ver smb_probe)
+        cert_info (dict): Resumo do certificado TLS do host (opcional, ver tls_probe)
+        
+    Returns:
+        str: Hostname DNS ou NetBIOS do SMB, senão o nome do certificado, ou string vazia
+    """
+    if smb_info:
+        hostname = smb_info.get('dns_hostname') or smb_info.get('netbios_name', '')
+        if hostname:
+            return hostname
+    if cert_info:
+        return cert_info.get('hostname', '') or ''
+    return ''
+
+
+def detect_device_type(nmap_data: dict, ip: str, web_info: dict = None, domain: str = '') -> tuple[str, str]:
     """
     Detecta o tipo de dispositivo baseado nos dados do Nmap com análise melhorada.
     
+    A classificação estática (portas, serviços, produtos, SO) vem das regras de
+    data/fingerprints.json (ver fingerprint_engine); aqui só fica a verificação
+    dinâmica de impressoras compartilhadas em hosts Windows.
+    
     Args:
         nmap_data (dict): Dados retornados pelo Nmap
         ip (str): Endereço IP do dispositivo
+        web_info (dict): Dados do servidor web embutido (web_probe), opcional
+        domain (str): Domínio do host (desafio SMB), usado na escolha do método de enumeração
         
     Returns:
         tuple[str, str]: (tipo_dispositivo, status_display)
     """
-    tcp_ports = nmap_data.get('tcp', {})
-    os_info = nmap_data.get('osmatch', [])
-    
-    # Análise de OS para melhor categorização
-    os_type = ""
-    if os_info:
-        os_name = os_info[0].get('name', '').lower()
-        if 'windows' in os_name:
-            os_type = "Windows"
-        elif 'linux' in os_name:
-            os_type = "Linux"
-        elif 'printer' in os_name or 'hp' in os_name or 'canon' in os_name:
-            os_type = "Printer"
-    
-    # Verifica se é impressora de rede direta
-    for port, info in tcp_ports.items():
-        service_name = info.get('name', '').lower()
-        product = info.get('product', '').lower()
-        
-        # Portas e serviços típicos de impressoras
-        if (port in [9100, 631, 515] or 
-            'jetdirect' in service_name or 
-            'ipp' in service_name or
-            'printer' in product or
-            'hp' in product or
-            'canon' in product or
-            'epson' in product):
-            
-            # Tenta obter nome mais descritivo
-            if info.get('product'):
-                product_name = info['product']
-                if info.get('version'):
-                    product_name += f" {info['version']}"
-                return 'network_printer', product_name
-            else:
-                return 'network_printer', 'Impressora de Rede'
+    classification = classify_device(nmap_data, web_info)
+    if classification.device_type == 'network_printer':
+        return classification.device_type, classification.label
     
     # Verifica se é host Windows com compartilhamentos
+    tcp_ports = nmap_data.get('tcp', {})
     if 139 in tcp_ports or 445 in tcp_ports:
-        shared_printers = get_windows_shared_printers(ip)
+        shared_printers = get_windows_shared_printers(ip, domain)
         if shared_printers:
             # Usa informações mais detalhadas da primeira impressora
             printer_info = shared_printers[0]
@@ -177,32 +240,21 @@ def detect_device_type(nmap_data: dict, ip: str) -> tuple[str, str]:
                           'Impressora Compartilhada')
             return 'shared_printer', f"Compartilhando: {printer_name}"
     
-    # Análise de outros tipos de dispositivos
-    device_indicators = {
-        80: "Servidor Web",
-        443: "Servidor Web (HTTPS)",
-        21: "Servidor FTP",
-        22: "Servidor SSH",
-        23: "Servidor Telnet",
-        25: "Servidor SMTP",
-        53: "Servidor DNS",
-        110: "Servidor POP3",
-        143: "Servidor IMAP"
-    }
-    
-    # Identifica tipo baseado em serviços principais
-    for port, service_type in device_indicators.items():
-        if port in tcp_ports and tcp_ports[port].get('state') == 'open':
-            if os_type:
-                return 'device', f"{service_type} ({os_type})"
-            else:
-                return 'device', service_type
+    return classification.device_type, classification.label
+
+
+def classify_device(nmap_data: dict, web_info: dict = None) -> Classification:
+    """
+    Classifica o dispositivo pelas regras de fingerprint, sem consultas de rede.
     
-    # Dispositivo ativo padrão com informação de OS se disponível
-    if os_type:
-        return 'device', f'Dispositivo {os_type}'
-    else:
-        return 'device', 'Dispositivo Ativo'
+    Args:
+        nmap_data (dict): Dados retornados pelo Nmap
+        web_info (dict): Dados do servidor web embutido (web_probe), opcional
+        
+    Returns:
+        Classification: tipo, rótulo, confiança e regra que decidiu
+    """
+    return get_engine().classify(nmap_data, web_info)
 
 
 def get_device_vendor_info(nmap_data: dict) -> dict:
@@ -226,26 +278,9 @@ def get_device_vendor_info(nmap_data: dict) -> dict:
     if not vendor and mac_address:
         vendor = identify_vendor_by_oui(mac_address)
     
-    # Análise adicional baseada em serviços para dispositivos sem MAC
+    # Análise adicional baseada nos produtos detectados para dispositivos sem MAC
     if not vendor:
-        tcp_ports = nmap_data.get('tcp', {})
-        for port, info in tcp_ports.items():
-            product = info.get('product', '').lower()
-            if 'hp' in product:
-                vendor = "Hewlett-Packard"
-                break
-            elif 'canon' in product:
-                vendor = "Canon"
-                break
-            elif 'epson' in product:
-                vendor = "Epson"
-                break
-            elif 'brother' in product:
-                vendor = "Brother"
-                break
-            elif 'microsoft' in product:
-                vendor = "Microsoft"
-                break
+        vendor, _ = get_engine().vendor_from_products(nmap_data)
     
     return {
         'mac': mac_address,
@@ -266,45 +301,14 @@ def identify_vendor_by_oui(mac_address: str) -> str:
     if not mac_address or len(mac_address) < 8:
         return ""
     
-    # Extrai os primeiros 6 caracteres (3 bytes) do MAC
-    oui = mac_address.replace(":", "").replace("-", "")[:6].upper()
-    
-    # Alguns OUIs comuns (você pode expandir esta lista)
-    oui_database = {
-        "001B63": "Hewlett-Packard",
-        "0004AC": "Hewlett-Packard", 
-        "0019BB": "Hewlett-Packard",
-        "0023AE": "Hewlett-Packard",
-        "002264": "Hewlett-Packard",
-        "F4CE46": "Hewlett-Packard",
-        "3C52F5": "Hewlett-Packard",
-        "00A0D1": "Canon",
-        "002115": "Canon",
-        "8C2DAA": "Canon",
-        "00908F": "Epson",
-        "008094": "Epson",
-        "00C048": "Brother",
-        "002586": "Brother",
-        "00E052": "Brother",
-        "000D93": "Apple",
-        "001EC9": "Apple",
-        "ACFDEC": "Apple",
-        "002522": "Apple",
-        "0C7438": "Apple",
-        "000C29": "VMware",
-        "005056": "VMware",
-        "000569": "VMware",
-        "00155D": "Microsoft",
-        "000BAB": "Microsoft",
-        "0017FA": "Microsoft",
-        "0050F2": "Microsoft",
-        "3863BB": "Microsoft",
-        "00E04C": "Realtek",
-        "525400": "QEMU/KVM",
-        "080027": "VirtualBox"
-    }
+    # Registro IEEE completo; o nome é ajustado ao padrão das regras. Sub-blocos ainda
+    # não atribuídos aparecem como "IEEE Registration Authority" e seguem para as regras
+    organization = lookup_vendor(mac_address)
+    if organization and organization not in NON_VENDOR_ORGANIZATIONS:
+        return get_engine().normalize_vendor(organization)
     
-    return oui_database.get(oui, "")
+    # OUIs fora do registro (ex.: endereços locais de VMs) ficam nas regras
+    return get_engine().vendor_by_oui(mac_address)
 
 
 def ping_host(ip: str) -> bool:
@@ -0,0 +1,274 @@
+# oui_registry.py
+import csv
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'oui_registry.bin')
+
+REGISTRY_MAGIC = b'OUIR'
+REGISTRY_VERSION = 1
+
+# Tamanhos de prefixo (em bits) dos blocos IEEE: MA-S/IAB, MA-M e MA-L.
+# A busca começa pelo mais específico.
+PREFIX_LENGTHS = (36, 28, 24)
+
+# Bits iniciais do OUI usados para indexar faixas da tabela MA-L (4096 baldes)
+_BUCKET_BITS = 12
+
+# magic, versão, quantidade de entradas por tamanho de prefixo, quantidade de nomes
+_HEADER = struct.Struct('<4sHHIIII')
+
+_REGISTRY_TO_BITS = {'MA-L': 24, 'MA-M': 28, 'MA-S': 36, 'IAB': 36}
+_TXT_HEX_RE = re.compile(r'^\s*([0-9A-Fa-f]{2}(?:-[0-9A-Fa-f]{2}){2})\s+\(hex\)')
+_TXT_BASE16_RE = re.compile(r'^\s*([0-9A-Fa-f]{6})(?:-([0-9A-Fa-f]{6}))?\s+\(base 16\)\s+(.+?)\s*$')
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class OUIRegistry:
+    """
+    Índice compacto do registro IEEE (MA-L, MA-M, MA-S) mapeado em memória.
+
+    O arquivo guarda, para cada tamanho de prefixo, um vetor ordenado de
+    prefixos (uint64) e um vetor paralelo com o índice do nome do fabricante
+    (uint32), seguidos de uma tabela de nomes sem repetição. A busca é binária
+    sobre o vetor mapeado, sem carregar o arquivo inteiro na memória.
+    """
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+
+        magic, version, _, n36, n28, n24, name_count = _HEADER.unpack_from(self._map)
+        if magic != REGISTRY_MAGIC or version != REGISTRY_VERSION:
+            raise ValueError(f"Arquivo de OUI inválido ou de versão não suportada: {path}")
+
+        offset = _align(_HEADER.size)
+        tables = []
+        for bits, count in zip(PREFIX_LENGTHS, (n36, n28, n24)):
+            keys = view[offset:offset + count * 8].cast('Q')
+            offset = _align(offset + count * 8)
+            values = view[offset:offset + count * 4].cast('I')
+            offset = _align(offset + count * 4)
+            tables.append((48 - bits, keys, values))
+        self._sub_tables = tables[:-1]
+        _, self._oui_keys, self._oui_values = tables[-1]
+
+        # Início de cada balde na tabela MA-L: a busca binária fica restrita a
+        # uma dezena de entradas em vez das ~35 mil
+        shift = 24 - _BUCKET_BITS
+        self._buckets = array('I', [0]) * ((1 << _BUCKET_BITS) + 1)
+        for key in self._oui_keys:
+            self._buckets[(key >> shift) + 1] += 1
+        for index in range(1, len(self._buckets)):
+            self._buckets[index] += self._buckets[index - 1]
+
+        # Blocos MA-M/MA-S ficam dentro de poucos OUIs da própria IEEE; só para
+        # eles vale a pena consultar as tabelas de prefixo mais longo
+        self._split_ouis = frozenset(
+            key >> (24 - shift) for shift, keys, _ in self._sub_tables for key in keys
+        )
+
+        self._name_offsets = view[offset:offset + (name_count + 1) * 4].cast('I')
+        self._names_base = _align(offset + (name_count + 1) * 4)
+        self._name_cache: Dict[int, str] = {}
+        self.entry_count = n36 + n28 + n24
+
+    def _name(self, index: int) -> str:
+        name = self._name_cache.get(index)
+        if name is None:
+            start = self._names_base + self._name_offsets[index]
+            end = self._names_base + self._name_offsets[index + 1]
+            name = self._name_cache[index] = self._map[start:end].decode('utf-8')
+        return name
+
+    def lookup(self, mac_address: str) -> str:
+        """
+        Retorna o fabricante registrado para o MAC, ou string vazia.
+
+        Args:
+            mac_address (str): MAC em qualquer formato comum (AA:BB:.., AA-BB-.., AABB..)
+
+        Returns:
+            str: Nome da organização no registro IEEE
+        """
+        head = mac_address[:8].replace(':', '').replace('-', '').replace('.', '')
+        if len(head) < 6:
+            return ""
+        try:
+            oui = int(head[:6], 16)
+        except ValueError:
+            return ""
+
+        if oui in self._split_ouis:
+            digits = mac_address.replace(':', '').replace('-', '').replace('.', '')
+            try:
+                value = int(digits[:12].ljust(12, '0'), 16)
+            except ValueError:
+                return ""
+            for shift, keys, values in self._sub_tables:
+                key = value >> shift
+                index = bisect_left(keys, key)
+                if index < len(keys) and keys[index] == key:
+                    return self._name(values[index])
+
+        keys = self._oui_keys
+        bucket = oui >> (24 - _BUCKET_BITS)
+        end = self._buckets[bucket + 1]
+        index = bisect_left(keys, oui, self._buckets[bucket], end)
+        if index < end and keys[index] == oui:
+            return self._name(self._oui_values[index])
+        return ""
+
+
+_registry: Optional[OUIRegistry] = None
+_registry_loaded = False
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> Optional[OUIRegistry]:
+    """Carrega o registro no primeiro uso. Retorna None se o arquivo não existir."""
+    global _registry, _registry_loaded
+    if not _registry_loaded:
+        with _registry_lock:
+            if not _registry_loaded:
+                try:
+                    _registry = OUIRegistry()
+                except (OSError, ValueError) as e:
+                    print(f"Registro de OUI indisponível: {e}")
+                    _registry = None
+                _registry_loaded = True
+    return _registry
+
+
+def lookup_vendor(mac_address: str) -> str:
+    """
+    Consulta o fabricante de um MAC no registro IEEE.
+
+    Args:
+        mac_address (str): Endereço MAC
+
+    Returns:
+        str: Nome do fabricante ou string vazia
+    """
+    registry = get_registry()
+    return registry.lookup(mac_address) if registry else ""
+
+
+def read_ieee_file(path: str) -> Iterable[Tuple[int, int, str]]:
+    """
+    Lê um arquivo do registro IEEE (oui.csv, mam.csv, oui36.csv, iab.csv ou oui.txt).
+
+    Returns:
+        Iterable[tuple]: (bits do prefixo, valor do prefixo, nome da organização)
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        if path.lower().endswith('.txt'):
+            # Formato texto: linha "(hex)" com os 24 bits iniciais, seguida da
+            # linha "(base 16)" com a faixa atribuída (blocos MA-M/MA-S/IAB)
+            oui = None
+            for line in f:
+                match = _TXT_HEX_RE.match(line)
+                if match:
+                    oui = int(match.group(1).replace('-', ''), 16)
+                    continue
+                match = _TXT_BASE16_RE.match(line)
+                if not match or oui is None:
+                    continue
+                start, end, name = match.groups()
+                if end is None:
+                    yield 24, oui, name
+                else:
+                    suffix_bits = (int(end, 16) - int(start, 16) + 1).bit_length() - 1
+                    if 48 - suffix_bits in PREFIX_LENGTHS:
+                        yield 48 - suffix_bits, ((oui << 24) | int(start, 16)) >> suffix_bits, name
+                oui = None
+            return
+
+        for row in csv.DictReader(f):
+            assignment = (row.get('Assignment') or '').strip()
+            name = (row.get('Organization Name') or '').strip()
+            bits = _REGISTRY_TO_BITS.get((row.get('Registry') or '').strip().upper(), len(assignment) * 4)
+            if assignment and name and bits in PREFIX_LENGTHS:
+                yield bits, int(assignment, 16), name
+
+
+def build_registry(sources: List[str], output_path: str = DEFAULT_REGISTRY_PATH) -> Dict[int, int]:
+    """
+    Gera o arquivo binário do registro a partir dos arquivos baixados do IEEE.
+
+    Args:
+        sources (list): Caminhos dos arquivos CSV/TXT do IEEE
+        output_path (str): Arquivo binário de saída
+
+    Returns:
+        dict: Quantidade de entradas por tamanho de prefixo
+    """
+    entries: Dict[int, Dict[int, str]] = {bits: {} for bits in PREFIX_LENGTHS}
+    for source in sources:
+        for bits, prefix, name in read_ieee_file(source):
+            entries[bits][prefix] = name
+
+    names: List[str] = []
+    name_index: Dict[str, int] = {}
+    tables = []
+    for bits in PREFIX_LENGTHS:
+        keys = sorted(entries[bits])
+        values = []
+        for key in keys:
+            name = entries[bits][key]
+            if name not in name_index:
+                name_index[name] = len(names)
+                names.append(name)
+            values.append(name_index[name])
+        tables.append((keys, values))
+
+    encoded = [name.encode('utf-8') for name in names]
+    name_offsets = [0]
+    for blob in encoded:
+        name_offsets.append(name_offsets[-1] + len(blob))
+
+    def pad(data: bytearray):
+        data.extend(b'\x00' * (_align(len(data)) - len(data)))
+
+    data = bytearray(_HEADER.pack(REGISTRY_MAGIC, REGISTRY_VERSION, 0,
+                                  *(len(keys) for keys, _ in tables), len(names)))
+    pad(data)
+    for keys, values in tables:
+        data.extend(struct.pack(f'<{len(keys)}Q', *keys))
+        pad(data)
+        data.extend(struct.pack(f'<{len(values)}I', *values))
+        pad(data)
+    data.extend(struct.pack(f'<{len(name_offsets)}I', *name_offsets))
+    pad(data)
+    data.extend(b''.join(encoded))
+
+    # Grava em arquivo temporário e substitui, para não corromper o registro em uso
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, output_path)
+
+    return {bits: len(entries[bits]) for bits in PREFIX_LENGTHS}
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 2 and sys.argv[1] == '--refresh':
+        counts = build_registry(sys.argv[2:])
+        print(f"Registro gravado em {DEFAULT_REGISTRY_PATH}: "
+              f"{counts[24]} MA-L, {counts[28]} MA-M, {counts[36]} MA-S/IAB")
+    else:
+        print("Uso: python oui_registry.py --refresh oui.csv [mam.csv oui36.csv iab.csv]\n"
+              "Baixe os arquivos em https://standards-oui.ieee.org/")
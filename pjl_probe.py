@@ -0,0 +1,169 @@
+# pjl_probe.py
+import asyncio
+import re
+from typing import Dict, Optional
+
+from probe_runtime import ProbeLimiter, run_probe
+from scan_cache import AsyncScanCache
+
+
+PJL_PORT = 9100
+
+# Universal Exit Language: delimita o job PJL antes e depois das consultas
+UEL = b"\x1b%-12345X"
+PJL_QUERY = UEL + b"@PJL INFO ID\r\n@PJL INFO STATUS\r\n" + UEL
+
+CONNECT_TIMEOUT = 2.0
+READ_TIMEOUT = 3.0
+MAX_RESPONSE_BYTES = 8192
+
+# Cada resposta PJL termina com form feed; esperamos uma por consulta
+_EXPECTED_RESPONSES = 2
+
+# Códigos de status PJL mais comuns (usados quando não há DISPLAY)
+PJL_STATUS_CODES = {
+    10001: "Pronta",
+    10002: "Pronta (offline)",
+    10003: "Aquecendo",
+    10004: "Autoteste",
+    10005: "Reiniciando",
+    10006: "Toner baixo",
+    10023: "Imprimindo",
+    10024: "Alimentando papel",
+    35078: "Modo de economia",
+}
+
+_KEY_VALUE_RE = re.compile(r'^([A-Z]+)\s*=\s*"?(.*?)"?\s*$')
+
+_limiter = ProbeLimiter(global_limit=32, per_host_limit=1)
+_cache = AsyncScanCache("pjl")
+
+
+def parse_pjl_response(raw: bytes) -> Dict[str, object]:
+    """
+    Interpreta as respostas de @PJL INFO ID e @PJL INFO STATUS.
+
+    Args:
+        raw (bytes): Bytes recebidos da impressora
+
+    Returns:
+        dict: Campos 'model', 'status_code', 'display', 'online' e 'status'
+              (ausentes quando a impressora não os informou)
+    """
+    info = {}
+    text = raw.replace(UEL, b"").decode('latin-1')
+
+    for section in text.split('@PJL INFO ')[1:]:
+        lines = [line.strip() for line in section.replace('\x0c', '\n').splitlines()]
+        kind = lines[0].split()[0].upper() if lines and lines[0] else ''
+        body = [line for line in lines[1:] if line and not line.startswith('@PJL')]
+
+        if kind == 'ID' and body:
+            model = body[0].strip('"').strip()
+            if model:
+                info['model'] = model
+        elif kind == 'STATUS':
+            for line in body:
+                match = _KEY_VALUE_RE.match(line)
+                if not match:
+                    continue
+                key, value = match.groups()
+                if key == 'CODE' and value.isdigit():
+                    info['status_code'] = int(value)
+                elif key == 'DISPLAY' and value:
+                    info['display'] = value
+                elif key == 'ONLINE':
+                    info['online'] = value.upper() == 'TRUE'
+
+    status = info.get('display') or PJL_STATUS_CODES.get(info.get('status_code'), '')
+    if status:
+        info['status'] = status
+    return info
+
+
+async def _read_responses(reader: asyncio.StreamReader, read_timeout: float) -> bytes:
+    """Lê até receber todas as respostas, o limite de bytes ou o prazo final."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + read_timeout
+    data = b""
+
+    while data.count(b"\x0c") < _EXPECTED_RESPONSES and len(data) < MAX_RESPONSE_BYTES:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            chunk = await asyncio.wait_for(reader.read(1024), remaining)
+        except asyncio.TimeoutError:
+            break
+        if not chunk:
+            break
+        data += chunk
+
+    return data[:MAX_RESPONSE_BYTES]
+
+
+async def _query_pjl_uncached(ip: str, port: int, connect_timeout: float,
+                              read_timeout: float) -> Optional[Dict[str, object]]:
+    """Abre a conexão RAW, envia as consultas PJL e interpreta a resposta."""
+    async with _limiter.slot(ip):
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port), connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return None
+
+        try:
+            writer.write(PJL_QUERY)
+            await asyncio.wait_for(writer.drain(), connect_timeout)
+            raw = await _read_responses(reader, read_timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            writer.close()
+            try:
+                await asyncio.wait_for(writer.wait_closed(), 1.0)
+            except (OSError, asyncio.TimeoutError):
+                pass
+
+    info = parse_pjl_response(raw)
+    return info or None
+
+
+async def query_pjl(ip: str, port: int = PJL_PORT,
+                    connect_timeout: float = CONNECT_TIMEOUT,
+                    read_timeout: float = READ_TIMEOUT) -> Optional[Dict[str, object]]:
+    """
+    Consulta modelo e status de uma impressora via PJL na porta RAW (JetDirect).
+
+    O resultado fica em cache até o próximo scan, e consultas simultâneas ao
+    mesmo host compartilham a mesma conexão.
+
+    Args:
+        ip (str): Endereço IP da impressora
+        port (int): Porta RAW (padrão 9100)
+        connect_timeout (float): Prazo para abrir a conexão
+        read_timeout (float): Prazo total para receber as respostas
+
+    Returns:
+        dict | None: Informações PJL ou None se a impressora não respondeu
+    """
+    return await _cache.get_or_fetch(
+        (ip, port),
+        lambda: _query_pjl_uncached(ip, port, connect_timeout, read_timeout)
+    )
+
+
+def get_pjl_info(ip: str, port: int = PJL_PORT) -> Optional[Dict[str, object]]:
+    """
+    Versão síncrona de query_pjl para uso nas threads de scan.
+
+    Args:
+        ip (str): Endereço IP da impressora
+        port (int): Porta RAW (padrão 9100)
+
+    Returns:
+        dict | None: Informações PJL ou None se a impressora não respondeu
+    """
+    # Margem além dos prazos da sonda para a espera na fila dos limitadores
+    return run_probe(query_pjl(ip, port), timeout=CONNECT_TIMEOUT + READ_TIMEOUT + 10)
@@ -4,105 +4,335 @@ import platform
 import socket
 import re
 import os
-from typing import List, Dict, Optional
+import queue
+import threading
+import time
+import atexit
+import shutil
+from typing import Callable, List, Dict, Optional
+
+from auth_cache import get_auth_cache
+from credential_context import CredentialContext, ANONYMOUS
+from enum_worker import EnumWorkerPool, WorkerError, parse_printer_csv, powershell_command
+from method_affinity import MethodAffinityStore
+from scan_cache import SingleFlightCache
+from srvsvc_enum import get_print_shares, check_credentials
+
+
+# Enumeração de compartilhamentos por host, válida durante um scan
+_shares_cache = SingleFlightCache("windows_shares")
+
+# Histórico persistido de qual método funciona em cada host/sub-rede/domínio (carregado no primeiro uso)
+_affinity: Optional[MethodAffinityStore] = None
+_affinity_lock = threading.Lock()
+
+# Métodos que deduzem as impressoras de texto livre: uma lista vazia deles não prova nada
+HEURISTIC_METHODS = ('net_view', 'registry')
+
+# Quantos dos métodos mais prováveis são disparados em paralelo
+RACE_CANDIDATES = 2
+
+# Processos worker de enumeração mantidos abertos durante a execução
+WORKER_POOL_SIZE = 2
+
+COMMAND_POLL_INTERVAL = 0.2
+CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+
+class CommandCancelled(Exception):
+    """Comando encerrado porque outro método de enumeração venceu."""
+
+
+def _get_affinity() -> MethodAffinityStore:
+    global _affinity
+    with _affinity_lock:
+        if _affinity is None:
+            _affinity = MethodAffinityStore()
+        return _affinity
 
 
 class WindowsPrinterManager:
     """Classe para gerenciar operações relacionadas a impressoras Windows."""
     
-    # Variáveis de classe para credenciais globais
-    _global_username = None
-    _global_password = None
-    _use_credentials = False
+    # Credenciais padrão, usadas quando a chamada não informa um contexto.
+    # O contexto é imutável: trocar as credenciais troca a referência inteira.
+    _default_credentials = ANONYMOUS
+    
+    # Workers de enumeração com sessão do PowerShell aberta (criados no primeiro uso)
+    _worker_pool = None
+    _worker_pool_lock = threading.Lock()
     
     @classmethod
     def set_credentials(cls, username: str = None, password: str = None):
-        """Define credenciais globais para acesso WMI."""
-        cls._global_username = username
-        cls._global_password = password
-        cls._use_credentials = bool(username and password)
+        """Define as credenciais padrão usadas pelo scan."""
+        cls._default_credentials = CredentialContext.from_input(username, password)
     
     @classmethod
     def get_credentials(cls):
-        """Retorna as credenciais configuradas."""
-        return cls._global_username, cls._global_password
+        """Retorna (usuário, senha) das credenciais padrão."""
+        context = cls._default_credentials
+        return context.qualified_username or None, context.password or None
+    
+    @classmethod
+    def get_credential_context(cls) -> CredentialContext:
+        """Retorna o contexto de credenciais padrão (imutável)."""
+        return cls._default_credentials
     
     @staticmethod
-    def get_shared_printers(ip: str) -> Optional[List[Dict[str, str]]]:
+    def get_shared_printers(ip: str, domain: str = '',
+                            credentials: CredentialContext = None) -> Optional[List[Dict[str, str]]]:
         """
         Obtém a lista de impressoras compartilhadas de um host Windows.
-        Tenta diferentes métodos em ordem de prioridade.
+        O resultado fica em cache durante o scan: chamadas repetidas ou
+        simultâneas para o mesmo host compartilham uma única enumeração.
+        Antes de enumerar com credenciais, elas são validadas por um
+        SESSION_SETUP autenticado e o resultado vai para o cache de
+        autenticação (por host e domínio). Credenciais recusadas pelo host ou
+        pelo domínio não são tentadas de novo; a enumeração segue sem elas.
+        
+        Fora do Windows só o método SRVSVC (SMB2 + DCE/RPC em Python) está disponível.
         
         Args:
             ip (str): Endereço IP do host Windows
+            domain (str): Domínio do host, se conhecido (melhora a escolha do método)
+            credentials (CredentialContext): Credenciais desta chamada (padrão: as configuradas)
             
         Returns:
-            List[Dict[str, str]] | None: Lista de impressoras ou None se erro/não Windows
+            List[Dict[str, str]] | None: Lista de impressoras ou None se erro
+        """
+        if credentials is None:
+            credentials = WindowsPrinterManager._default_credentials
+        if credentials.is_set and not WindowsPrinterManager._credentials_accepted(ip, credentials, domain):
+            credentials = ANONYMOUS
+        return _shares_cache.get_or_compute(
+            (ip, credentials.fingerprint),
+            lambda: WindowsPrinterManager._enumerate_shared_printers(ip, domain, credentials)
+        )
+    
+    @staticmethod
+    def _credentials_accepted(ip: str, credentials: CredentialContext, domain: str = '') -> bool:
+        """
+        Consulta o cache de autenticação e, sem resultado válido, testa a credencial no host.
+
+        Só a resposta do SESSION_SETUP entra no cache; se o teste não for
+        conclusivo (SMB fechado ou sem resposta), a credencial é usada.
         """
+        auth_cache = get_auth_cache()
+        known = auth_cache.lookup(ip, credentials.fingerprint, domain)
+        if known is not None:
+            return known
+        try:
+            accepted = check_credentials(ip, credentials.username, credentials.password, credentials.domain)
+        except Exception as e:
+            print(f"Erro ao verificar credenciais em {ip}: {e}")
+            accepted = None
+        if accepted is None:
+            return True
+        auth_cache.record(ip, credentials.fingerprint, accepted, domain)
+        return accepted
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, int]:
+        """Retorna os contadores de acertos e faltas do cache de enumeração."""
+        return _shares_cache.stats()
+    
+    @classmethod
+    def _available_methods(cls, credentials: CredentialContext) -> Dict[str, Callable]:
+        """Métodos de enumeração na ordem padrão de prioridade."""
         if platform.system() != "Windows":
-            return None
+            return {'srvsvc': cls._try_srvsvc}
         
-        # Método 1: Tentar com credenciais se configuradas
-        if WindowsPrinterManager._use_credentials:
-            printers = WindowsPrinterManager._try_wmi_with_credentials(ip)
-            if printers:
-                return printers
+        methods = {}
+        if credentials.is_set:
+            methods['wmi_credentials'] = cls._try_wmi_with_credentials
+        methods['wmi'] = cls._try_wmi_without_credentials
+        methods['net_view'] = cls._try_net_view
+        methods['powershell'] = cls._try_powershell_remote
+        methods['registry'] = cls._try_registry_query
+        methods['srvsvc'] = cls._try_srvsvc
+        return methods
+    
+    @staticmethod
+    def _enumerate_shared_printers(ip: str, domain: str = '',
+                                   credentials: CredentialContext = ANONYMOUS) -> Optional[List[Dict[str, str]]]:
+        """
+        Tenta os métodos de enumeração na ordem aprendida para o host.
         
-        # Método 2: Tentar WMI sem credenciais
-        printers = WindowsPrinterManager._try_wmi_without_credentials(ip)
-        if printers:
-            return printers
+        Sem histórico, segue a ordem padrão. Com histórico, dispara em paralelo
+        os métodos mais prováveis e cancela os demais assim que um responde.
+        Hosts em que nada funcionou recentemente (com estas credenciais) recebem
+        uma única tentativa.
         
-        # Método 3: Usar NET VIEW para listar compartilhamentos
-        printers = WindowsPrinterManager._try_net_view(ip)
-        if printers:
-            return printers
+        Um método que alcança o host e não encontra impressoras retorna [] e
+        conta como sucesso; só None é falha. A exceção são os métodos de
+        HEURISTIC_METHODS: o [] deles não encerra a busca nem entra no
+        histórico, e só é o resultado se nenhum outro método responder. Com
+        credenciais, as falhas não entram no histórico (uma senha errada não
+        diz nada sobre o método).
+        """
+        affinity = _get_affinity()
+        methods = WindowsPrinterManager._available_methods(credentials)
+        order = affinity.rank(ip, list(methods), domain)
+        answered_empty = False
         
-        # Método 4: Tentar PowerShell remoto
-        printers = WindowsPrinterManager._try_powershell_remote(ip)
-        if printers:
-            return printers
+        if affinity.is_unreachable(ip, credentials.fingerprint):
+            order = order[:1]
+        elif affinity.has_history(ip, domain):
+            winner, printers = WindowsPrinterManager._race_methods(ip, domain, credentials,
+                                                                   order[:RACE_CANDIDATES], methods)
+            if winner:
+                return printers
+            answered_empty = printers is not None
+            order = order[RACE_CANDIDATES:]
         
-        # Método 5: Tentar reg query para registro remoto
-        printers = WindowsPrinterManager._try_registry_query(ip)
-        if printers:
-            return printers
+        for name in order:
+            printers = methods[name](ip, credentials)
+            if printers == [] and name in HEURISTIC_METHODS:
+                answered_empty = True
+                continue
+            if printers is not None:
+                affinity.record_success(ip, name, domain)
+                return printers
+            if not credentials.is_set:
+                affinity.record_failure(ip, name, domain)
         
+        if answered_empty:
+            # O host respondeu, mas só a heurística olhou: sem impressoras, sem histórico
+            return []
+        affinity.mark_unreachable(ip, credentials.fingerprint)
         return None
     
     @staticmethod
-    def _try_wmi_with_credentials(ip: str) -> Optional[List[Dict[str, str]]]:
-        """Tenta usar WMI com credenciais configuradas."""
+    def _race_methods(ip: str, domain: str, credentials: CredentialContext,
+                      names: List[str], methods: Dict[str, Callable]):
+        """
+        Executa vários métodos ao mesmo tempo; o primeiro que alcançar o host
+        (com ou sem impressoras) vence e os processos dos outros são encerrados.
+        Uma lista vazia de um método de HEURISTIC_METHODS não vence.
+        
+        Returns:
+            tuple: (nome do método vencedor, impressoras), (None, []) se só a
+            heurística respondeu (sem impressoras), ou (None, None)
+        """
+        affinity = _get_affinity()
+        cancel = threading.Event()
+        results = queue.Queue()
+        
+        def attempt(name):
+            try:
+                printers = methods[name](ip, credentials, cancel)
+            except Exception as e:
+                print(f"Método {name} falhou para {ip}: {e}")
+                printers = None
+            results.put((name, printers))
+        
+        for name in names:
+            threading.Thread(target=attempt, args=(name,), daemon=True).start()
+        
+        winner, winner_printers = None, None
+        for _ in names:
+            name, printers = results.get()
+            if printers == [] and name in HEURISTIC_METHODS:
+                winner_printers = []
+                continue
+            if printers is not None:
+                winner, winner_printers = name, printers
+                affinity.record_success(ip, name, domain)
+                break
+            if not cancel.is_set() and not credentials.is_set:
+                affinity.record_failure(ip, name, domain)
+        
+        cancel.set()
+        return winner, winner_printers
+    
+    @classmethod
+    def get_worker_pool(cls) -> Optional[EnumWorkerPool]:
+        """Retorna o pool de workers de enumeração, ou None se o PowerShell não existir."""
+        with cls._worker_pool_lock:
+            if cls._worker_pool is None and shutil.which('powershell'):
+                cls._worker_pool = EnumWorkerPool(size=WORKER_POOL_SIZE)
+                atexit.register(cls._worker_pool.close)
+            return cls._worker_pool
+    
+    @staticmethod
+    def flush_method_affinity():
+        """Grava o histórico de métodos e o cache de autenticação pendentes (chamado ao fim do scan)."""
+        if _affinity is not None:
+            _affinity.save()
+        get_auth_cache().save()
+    
+    @staticmethod
+    def _run_command(command, timeout: float, cancel: threading.Event = None,
+                     shell: bool = False) -> subprocess.CompletedProcess:
+        """
+        Executa um comando como subprocess.run, mas encerra o processo se o
+        evento de cancelamento for sinalizado.
+        
+        Raises:
+            subprocess.TimeoutExpired: Se o comando exceder o tempo limite
+            CommandCancelled: Se o cancelamento for solicitado
+        """
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            shell=shell,
+            creationflags=CREATE_NO_WINDOW
+        )
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=COMMAND_POLL_INTERVAL)
+                return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+            except subprocess.TimeoutExpired:
+                cancelled = cancel is not None and cancel.is_set()
+                if not cancelled and time.monotonic() < deadline:
+                    continue
+                # Não lê o restante da saída: um processo neto pode manter o pipe aberto
+                process.kill()
+                process.wait()
+                process.stdout.close()
+                process.stderr.close()
+                if cancelled:
+                    raise CommandCancelled(command)
+                raise subprocess.TimeoutExpired(command, timeout)
+    
+    @staticmethod
+    def _try_srvsvc(ip: str, credentials: CredentialContext, cancel: threading.Event = None) -> Optional[List[Dict[str, str]]]:
+        """Lista as filas de impressão via NetrShareEnum, sem depender de ferramentas do Windows."""
+        if not credentials.is_set:
+            credentials = ANONYMOUS
+        return get_print_shares(ip, credentials.username, credentials.password, credentials.domain)
+    
+    @staticmethod
+    def _try_wmi_with_credentials(ip: str, credentials: CredentialContext, cancel: threading.Event = None) -> Optional[List[Dict[str, str]]]:
+        """Tenta usar WMI com as credenciais do contexto."""
         try:
-            username, password = WindowsPrinterManager.get_credentials()
-            if not username or not password:
+            if not credentials.is_set:
                 return None
                 
             command = [
-                'wmic', f'/node:{ip}', f'/user:{username}', f'/password:{password}',
+                'wmic', f'/node:{ip}', f'/user:{credentials.qualified_username}', f'/password:{credentials.password}',
                 'printer', 'get', 
                 'Name,ShareName,Default,Status,DriverName,Location,Comment',
                 '/format:csv'
             ]
             
-            result = subprocess.run(
-                command, 
-                capture_output=True, 
-                text=True, 
-                timeout=15, 
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = WindowsPrinterManager._run_command(command, timeout=15, cancel=cancel)
             
             if result.returncode == 0 and result.stdout.strip():
                 return WindowsPrinterManager._parse_wmic_output(result.stdout)
                 
+        except CommandCancelled:
+            pass
         except Exception as e:
             print(f"WMI com credenciais falhou para {ip}: {e}")
         
         return None
     
     @staticmethod
-    def _try_wmi_without_credentials(ip: str) -> Optional[List[Dict[str, str]]]:
+    def _try_wmi_without_credentials(ip: str, credentials: CredentialContext, cancel: threading.Event = None) -> Optional[List[Dict[str, str]]]:
         """Tenta usar WMI sem credenciais explícitas."""
         try:
             command = [
@@ -111,148 +341,124 @@ class WindowsPrinterManager:
                 '/format:csv'
             ]
             
-            result = subprocess.run(
-                command, 
-                capture_output=True, 
-                text=True, 
-                timeout=10, 
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = WindowsPrinterManager._run_command(command, timeout=10, cancel=cancel)
             
             if result.returncode == 0 and result.stdout.strip():
                 return WindowsPrinterManager._parse_wmic_output(result.stdout)
                 
+        except CommandCancelled:
+            pass
         except Exception as e:
             print(f"WMI sem credenciais falhou para {ip}: {e}")
         
         return None
     
     @staticmethod
-    def _try_net_view(ip: str) -> Optional[List[Dict[str, str]]]:
+    def _try_net_view(ip: str, credentials: CredentialContext, cancel: threading.Event = None) -> Optional[List[Dict[str, str]]]:
         """Usa o comando NET VIEW para listar compartilhamentos."""
+        run = WindowsPrinterManager._run_command
         try:
             # Primeiro tenta sem credenciais
             command = ['net', 'view', f'\\\\{ip}']
-            result = subprocess.run(
-                command, 
-                capture_output=True, 
-                text=True, 
-                timeout=10,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = run(command, timeout=10, cancel=cancel)
             
             if result.returncode == 0:
                 return WindowsPrinterManager._parse_net_view_output(result.stdout, ip)
             
             # Se falhou e tem credenciais, tenta com credenciais
-            if WindowsPrinterManager._use_credentials:
-                username, password = WindowsPrinterManager.get_credentials()
-                if username and password:
-                    # Mapeia temporariamente um drive para autenticar
-                    map_cmd = ['net', 'use', f'\\\\{ip}\\IPC$', password, f'/user:{username}']
-                    map_result = subprocess.run(map_cmd, capture_output=True, text=True, timeout=10, creationflags=subprocess.CREATE_NO_WINDOW)
-                    
-                    if map_result.returncode == 0:
+            if credentials.is_set:
+                # Mapeia temporariamente um drive para autenticar
+                map_cmd = ['net', 'use', f'\\\\{ip}\\IPC$', credentials.password,
+                           f'/user:{credentials.qualified_username}']
+                map_result = run(map_cmd, timeout=10, cancel=cancel)
+                
+                if map_result.returncode == 0:
+                    try:
                         # Tenta o NET VIEW novamente
-                        result = subprocess.run(command, capture_output=True, text=True, timeout=10, creationflags=subprocess.CREATE_NO_WINDOW)
+                        result = run(command, timeout=10, cancel=cancel)
                         if result.returncode == 0:
-                            printers = WindowsPrinterManager._parse_net_view_output(result.stdout, ip)
-                            # Limpa a conexão
-                            subprocess.run(['net', 'use', f'\\\\{ip}\\IPC$', '/delete'], capture_output=True, creationflags=subprocess.CREATE_NO_WINDOW)
-                            return printers
-                
+                            return WindowsPrinterManager._parse_net_view_output(result.stdout, ip)
+                    finally:
+                        # Limpa a conexão, mesmo se a tentativa foi cancelada
+                        run(['net', 'use', f'\\\\{ip}\\IPC$', '/delete'], timeout=10)
+            
+        except CommandCancelled:
+            pass
         except Exception as e:
             print(f"NET VIEW falhou para {ip}: {e}")
         
         return None
     
     @staticmethod
-    def _try_powershell_remote(ip: str) -> Optional[List[Dict[str, str]]]:
+    def _try_powershell_remote(ip: str, credentials: CredentialContext, cancel: threading.Event = None) -> Optional[List[Dict[str, str]]]:
         """Tenta usar PowerShell para acessar impressoras remotas."""
+        # Preferência: sessão persistente no worker, sem iniciar um PowerShell por host
+        pool = WindowsPrinterManager.get_worker_pool()
+        if pool is not None:
+            username, password = ('', '')
+            if credentials.is_set:
+                username, password = credentials.qualified_username, credentials.password
+            try:
+                return pool.enumerate(ip, username, password, timeout=30, cancel=cancel)
+            except TimeoutError:
+                return None
+            except WorkerError as e:
+                print(f"Worker de enumeração falhou para {ip}: {e}")
+        
+        def quote(value: str) -> str:
+            return "'" + value.replace("'", "''") + "'"
+        
         try:
-            if WindowsPrinterManager._use_credentials:
-                username, password = WindowsPrinterManager.get_credentials()
-                if username and password:
-                    # PowerShell com credenciais
-                    ps_command = f'''
-                    $secpass = ConvertTo-SecureString "{password}" -AsPlainText -Force
-                    $cred = New-Object PSCredential("{username}", $secpass)
-                    try {{
-                        Get-WmiObject -Class Win32_Printer -ComputerName {ip} -Credential $cred | 
-                        Where-Object {{$_.Shared -eq $true}} | 
-                        Select-Object Name,ShareName,DriverName,Location,Comment | 
-                        ConvertTo-Csv -NoTypeInformation
-                    }} catch {{
-                        Write-Output "ERROR: $_"
-                    }}
-                    '''
-                else:
+            credential = ''
+            if credentials.is_set:
+                username, password = credentials.qualified_username, credentials.password
+                if not (username and password):
                     return None
-            else:
-                # PowerShell sem credenciais
-                ps_command = f'''
-                try {{
-                    Get-WmiObject -Class Win32_Printer -ComputerName {ip} | 
-                    Where-Object {{$_.Shared -eq $true}} | 
-                    Select-Object Name,ShareName,DriverName,Location,Comment | 
-                    ConvertTo-Csv -NoTypeInformation
-                }} catch {{
-                    Write-Output "ERROR: $_"
-                }}
-                '''
+                # PowerShell com credenciais
+                credential = (f"$secpass = ConvertTo-SecureString {quote(password)} -AsPlainText -Force\n"
+                              f"$cred = New-Object PSCredential({quote(username)}, $secpass)\n")
+            ps_command = credential + f'''
+            try {{
+                Get-WmiObject -Class Win32_Printer -ComputerName {quote(ip)} {'-Credential $cred ' if credential else ''}-ErrorAction Stop |
+                Where-Object {{$_.Shared -eq $true}} |
+                Select-Object Name,ShareName,DriverName,Location,Comment |
+                ConvertTo-Csv -NoTypeInformation
+            }} catch {{
+                Write-Output "ERROR: $_"
+            }}
+            '''
             
-            result = subprocess.run(
-                ['powershell', '-Command', ps_command],
-                capture_output=True,
-                text=True,
-                timeout=20,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            # -EncodedCommand: o script de várias linhas chega inteiro, sem depender de aspas na linha de comando
+            result = WindowsPrinterManager._run_command(powershell_command(ps_command), timeout=20, cancel=cancel)
             
             if result.returncode == 0 and not result.stdout.startswith("ERROR"):
                 return WindowsPrinterManager._parse_powershell_output(result.stdout)
                 
+        except CommandCancelled:
+            pass
         except Exception as e:
             print(f"PowerShell remoto falhou para {ip}: {e}")
         
         return None
     
     @staticmethod
-    def _try_registry_query(ip: str) -> Optional[List[Dict[str, str]]]:
+    def _try_registry_query(ip: str, credentials: CredentialContext, cancel: threading.Event = None) -> Optional[List[Dict[str, str]]]:
         """Tenta acessar o registro remoto para encontrar impressoras."""
         try:
-            if WindowsPrinterManager._use_credentials:
-                username, password = WindowsPrinterManager.get_credentials()
-                if username and password:
-                    # Conecta ao registro remoto com credenciais
-                    connect_cmd = ['reg', 'query', f'\\\\{ip}\\HKLM\\SYSTEM\\CurrentControlSet\\Control\\Print\\Printers', '/s']
-                    # Não há opção direta de usuário/senha no reg query, então usamos runas
-                    runas_cmd = f'runas /user:{username} /savecred "reg query \\\\\\\\{ip}\\\\HKLM\\\\SYSTEM\\\\CurrentControlSet\\\\Control\\\\Print\\\\Printers /s"'
-                    
-                    result = subprocess.run(
-                        runas_cmd,
-                        shell=True,
-                        capture_output=True,
-                        text=True,
-                        timeout=15,
-                        creationflags=subprocess.CREATE_NO_WINDOW
-                    )
-                else:
-                    return None
+            if credentials.is_set:
+                # Não há opção direta de usuário/senha no reg query, então usamos runas
+                runas_cmd = f'runas /user:{credentials.qualified_username} /savecred "reg query \\\\\\\\{ip}\\\\HKLM\\\\SYSTEM\\\\CurrentControlSet\\\\Control\\\\Print\\\\Printers /s"'
+                result = WindowsPrinterManager._run_command(runas_cmd, timeout=15, cancel=cancel, shell=True)
             else:
                 # Tenta sem credenciais
                 command = ['reg', 'query', f'\\\\{ip}\\HKLM\\SYSTEM\\CurrentControlSet\\Control\\Print\\Printers', '/s']
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    timeout=15,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
+                result = WindowsPrinterManager._run_command(command, timeout=15, cancel=cancel)
             
             if result.returncode == 0:
                 return WindowsPrinterManager._parse_registry_output(result.stdout, ip)
                 
+        except CommandCancelled:
+            pass
         except Exception as e:
             print(f"Registry query falhou para {ip}: {e}")
         
@@ -328,33 +534,8 @@ class WindowsPrinterManager:
     
     @staticmethod
     def _parse_powershell_output(output: str) -> List[Dict[str, str]]:
-        """Analisa a saída do PowerShell."""
-        printers = []
-        lines = output.strip().split('\n')
-        
-        if len(lines) < 2:  # Precisa ter pelo menos header + 1 linha
-            return printers
-        
-        # Primeira linha é o header
-        headers = [h.strip('"') for h in lines[0].split(',')]
-        
-        for line in lines[1:]:
-            if not line.strip():
-                continue
-                
-            values = [v.strip('"') for v in line.split(',')]
-            if len(values) >= len(headers):
-                printer_info = {}
-                for i, header in enumerate(headers):
-                    printer_info[header] = values[i] if i < len(values) else ''
-                
-                # Só adiciona se tem ShareName
-                if printer_info.get('ShareName'):
-                    printer_info['Status'] = 'Compartilhada'
-                    printer_info['IsDefault'] = 'FALSE'
-                    printers.append(printer_info)
-        
-        return printers
+        """Analisa a saída do PowerShell (o formato é compartilhado com o worker de enumeração)."""
+        return parse_printer_csv(output)
     
     @staticmethod
     def _parse_wmic_output(output: str) -> List[Dict[str, str]]:
@@ -465,14 +646,17 @@ class WindowsPrinterManager:
 
 
 # Função de compatibilidade com o código existente
-def get_windows_shared_printers(ip: str) -> Optional[List[Dict[str, str]]]:
+def get_windows_shared_printers(ip: str, domain: str = '',
+                                credentials: CredentialContext = None) -> Optional[List[Dict[str, str]]]:
     """
     Função de compatibilidade para manter a interface existente.
     
     Args:
         ip (str): Endereço IP do host
+        domain (str): Domínio do host, se conhecido
+        credentials (CredentialContext): Credenciais desta chamada (padrão: as configuradas)
         
     Returns:
         List[Dict[str, str]] | None: Lista de impressoras compartilhadas
     """
-    return WindowsPrinterManager.get_shared_printers(ip)
\ No newline at end of file
+    return WindowsPrinterManager.get_shared_printers(ip, domain, credentials)
\ No newline at end of file
@@ -0,0 +1,109 @@
+# probe_runtime.py
+import asyncio
+import concurrent.futures
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+
+
+class ProbeLoop:
+    """
+    Loop asyncio compartilhado pelas sondas de rede.
+
+    As threads de scan são síncronas; em vez de cada uma criar seu próprio loop,
+    todas submetem corrotinas a este loop único, executado em uma thread de fundo.
+    Assim os limites de concorrência e os caches das sondas valem para o scan inteiro.
+    """
+
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        """Retorna o loop compartilhado, iniciando-o no primeiro uso."""
+        with cls._lock:
+            if cls._loop is None or cls._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="probe-loop", daemon=True)
+                thread.start()
+                cls._loop, cls._thread = loop, thread
+            return cls._loop
+
+    @classmethod
+    def run(cls, coro, timeout: float = None):
+        """
+        Executa uma corrotina no loop compartilhado e aguarda o resultado.
+
+        Args:
+            coro: Corrotina a executar
+            timeout (float): Tempo máximo de espera em segundos (None = sem limite)
+
+        Returns:
+            O resultado da corrotina
+
+        Raises:
+            concurrent.futures.TimeoutError: Se o tempo máximo for excedido
+        """
+        loop = cls.get_loop()
+        if threading.current_thread() is cls._thread:
+            coro.close()
+            raise RuntimeError("ProbeLoop.run não pode ser chamado de dentro do próprio loop")
+
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+
+def run_probe(coro, timeout: float = None):
+    """
+    Executa uma sonda assíncrona a partir de uma thread síncrona de scan.
+
+    Args:
+        coro: Corrotina da sonda
+        timeout (float): Tempo máximo de espera em segundos
+
+    Returns:
+        O resultado da sonda ou None se o tempo máximo for excedido
+    """
+    try:
+        return ProbeLoop.run(coro, timeout)
+    except concurrent.futures.TimeoutError:
+        return None
+
+
+class ProbeLimiter:
+    """
+    Limita a concorrência de uma sonda globalmente e por host.
+
+    Deve ser usado apenas a partir do loop compartilhado (ProbeLoop); os semáforos
+    por host são criados sob demanda e descartados quando ficam ociosos.
+    """
+
+    def __init__(self, global_limit: int = 64, per_host_limit: int = 1):
+        self.global_limit = global_limit
+        self.per_host_limit = per_host_limit
+        self._global = None
+        self._hosts = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """Reserva uma vaga para o host, respeitando os dois limites."""
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.global_limit)
+
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.per_host_limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._global:
+                    yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and self._hosts.get(host) is entry:
+                del self._hosts[host]
@@ -0,0 +1,353 @@
+# result_store.py
+"""
+Armazenamento indexado dos resultados do scan.
+
+Cada host recebe um número de linha; os índices secundários (fabricante,
+tipo, sub-rede, domínio e portas abertas) guardam um bitset de linhas por
+valor, e o prefixo do hostname usa uma lista ordenada. As consultas combinam
+os bitsets como inteiros do Python, então uma expressão como
+
+    port 9100 AND vendor=HP AND NOT 445
+
+custa algumas operações sobre inteiros de n bits, mesmo com 100 mil hosts.
+
+Sintaxe das consultas (sem diferenciar maiúsculas):
+
+    9100, port 9100, port:9100    porta TCP aberta
+    vendor=HP, type=printer       fabricante/tipo que contém o texto
+    domain=corp                   domínio que contém o texto
+    subnet=10.0.1.0/24, ip=10.0.1.5
+    host=prn-                     hostname que começa com o texto
+    "texto livre"                 procura em IP, hostname, fabricante e status
+    AND (ou implícito), OR, NOT, parênteses
+"""
+import bisect
+import ipaddress
+import re
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from device_record import DeviceRecord
+
+
+INDEXED_FIELDS = ('vendor', 'type', 'subnet', 'domain')
+
+# Campos de texto da consulta que procuram por trecho nas chaves do índice
+SUBSTRING_FIELDS = ('vendor', 'type', 'domain')
+
+FIELD_ALIASES = {
+    'fabricante': 'vendor',
+    'tipo': 'type',
+    'hostname': 'host',
+    'dominio': 'domain',
+    'domínio': 'domain',
+    'porta': 'port',
+}
+
+_TOKEN_RE = re.compile(r'\(|\)|[^\s()"=:]+\s*[=:]\s*(?:"[^"]*"|[^\s()]+)|"[^"]*"|[^\s()]+')
+_FIELD_RE = re.compile(r'([^\s()"=:]+)\s*[=:]\s*(.+)', re.S)
+
+
+class QueryError(ValueError):
+    """Consulta com sintaxe ou valor inválido."""
+
+
+class Bitset:
+    """Conjunto de números de linha em um bytearray (inserção e remoção em O(1))."""
+
+    __slots__ = ('_bytes',)
+
+    def __init__(self):
+        self._bytes = bytearray()
+
+    def add(self, index: int):
+        byte = index >> 3
+        if byte >= len(self._bytes):
+            self._bytes.extend(bytes(byte - len(self._bytes) + 1))
+        self._bytes[byte] |= 1 << (index & 7)
+
+    def discard(self, index: int):
+        byte = index >> 3
+        if byte < len(self._bytes):
+            self._bytes[byte] &= ~(1 << (index & 7)) & 0xFF
+
+    def to_int(self) -> int:
+        """Converte para um inteiro em que o bit i indica a linha i."""
+        return int.from_bytes(self._bytes, 'little')
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Percorre os bits ligados de um inteiro, do menor para o maior."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield (byte_index << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+def _subnet_of(ip: str) -> str:
+    # Caminho rápido para IPv4 em notação decimal; o resto passa pelo ipaddress
+    head, _, last = ip.rpartition('.')
+    if head.count('.') == 2 and last.isdigit():
+        return f"{head}.0/24"
+    try:
+        return str(ipaddress.ip_network(f"{ip}/24", strict=False))
+    except ValueError:
+        return ''
+
+
+class ResultStore:
+    """
+    Resultados do scan indexados para filtragem rápida.
+
+    Os registros são os próprios DeviceRecord de device_details (sem cópia).
+    Reenviar um IP já presente substitui o registro e atualiza os índices.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Descarta todos os resultados e índices."""
+        with self._lock:
+            self._records: List[DeviceRecord] = []
+            self._rows: Dict[str, int] = {}
+            self._indexes: Dict[str, Dict[str, Bitset]] = {field: {} for field in INDEXED_FIELDS}
+            self._ports: Dict[int, Bitset] = {}
+            self._hostnames: List[tuple] = []
+            self._keys: List[dict] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, ip: str) -> Optional[DeviceRecord]:
+        """Retorna o registro de um IP, se existir."""
+        row = self._rows.get(ip)
+        return self._records[row] if row is not None else None
+
+    @staticmethod
+    def _index_keys(record: DeviceRecord) -> dict:
+        return {
+            'vendor': record.vendor.lower(),
+            'type': record.type.lower(),
+            'subnet': _subnet_of(record.ip),
+            'domain': record.domain.lower(),
+            'hostname': record.hostname.lower(),
+            'ports': record.open_ports(),
+        }
+
+    def add(self, record: DeviceRecord):
+        """
+        Adiciona ou substitui o registro de um host.
+
+        Args:
+            record (DeviceRecord): Dados do dispositivo (como em device_details)
+        """
+        keys = self._index_keys(record)
+        with self._lock:
+            row = self._rows.get(record.ip)
+            if row is None:
+                row = len(self._records)
+                self._rows[record.ip] = row
+                self._records.append(record)
+                self._keys.append(keys)
+            else:
+                self._unindex(row, self._keys[row])
+                self._records[row] = record
+                self._keys[row] = keys
+            self._index(row, keys)
+
+    def add_many(self, records: List[DeviceRecord]):
+        """Adiciona vários registros."""
+        for record in records:
+            self.add(record)
+
+    @staticmethod
+    def _bitset(index: dict, key) -> Bitset:
+        bitset = index.get(key)
+        if bitset is None:
+            bitset = index[key] = Bitset()
+        return bitset
+
+    def _index(self, row: int, keys: dict):
+        for field in INDEXED_FIELDS:
+            if keys[field]:
+                self._bitset(self._indexes[field], keys[field]).add(row)
+        for port in keys['ports']:
+            self._bitset(self._ports, port).add(row)
+        if keys['hostname']:
+            bisect.insort(self._hostnames, (keys['hostname'], row))
+
+    def _unindex(self, row: int, keys: dict):
+        for field in INDEXED_FIELDS:
+            if keys[field] in self._indexes[field]:
+                self._indexes[field][keys[field]].discard(row)
+        for port in keys['ports']:
+            self._ports[port].discard(row)
+        if keys['hostname']:
+            position = bisect.bisect_left(self._hostnames, (keys['hostname'], row))
+            if position < len(self._hostnames) and self._hostnames[position] == (keys['hostname'], row):
+                del self._hostnames[position]
+
+    # ------------------------------------------------------------------ #
+    # Consultas
+    # ------------------------------------------------------------------ #
+    def query(self, text: str) -> List[str]:
+        """
+        Retorna os IPs que satisfazem a consulta, na ordem em que foram adicionados.
+
+        Args:
+            text (str): Consulta (ver o cabeçalho do módulo); vazia seleciona tudo
+
+        Returns:
+            list: IPs encontrados
+
+        Raises:
+            QueryError: Se a consulta for inválida
+        """
+        with self._lock:
+            bits = self._evaluate(text)
+            return [self._records[row].ip for row in iter_bits(bits)]
+
+    def count(self, text: str) -> int:
+        """Quantidade de hosts que satisfazem a consulta."""
+        with self._lock:
+            return bin(self._evaluate(text)).count('1')
+
+    def _evaluate(self, text: str) -> int:
+        tokens = _TOKEN_RE.findall(text or '')
+        if not tokens:
+            return self._all_bits()
+        parser = _QueryParser(tokens, self)
+        bits = parser.parse()
+        return bits & self._all_bits()
+
+    def _all_bits(self) -> int:
+        return (1 << len(self._records)) - 1
+
+    def _field_bits(self, field: str, value: str) -> int:
+        field = FIELD_ALIASES.get(field, field)
+        value = value.lower()
+        if field == 'port':
+            try:
+                bitset = self._ports.get(int(value))
+            except ValueError:
+                raise QueryError(f"Porta inválida: {value}")
+            return bitset.to_int() if bitset else 0
+        if field in SUBSTRING_FIELDS:
+            bits = 0
+            for key, bitset in self._indexes[field].items():
+                if value in key:
+                    bits |= bitset.to_int()
+            return bits
+        if field in ('subnet', 'ip'):
+            return self._network_bits(value)
+        if field == 'host':
+            return self._hostname_bits(value.rstrip('*'))
+        raise QueryError(f"Campo desconhecido: {field}")
+
+    def _network_bits(self, value: str) -> int:
+        try:
+            network = ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            raise QueryError(f"Rede inválida: {value}")
+        if network.prefixlen >= 24:
+            candidates = self._indexes['subnet'].get(_subnet_of(str(network.network_address)))
+            if not candidates:
+                return 0
+            if network.prefixlen == 24:
+                return candidates.to_int()
+            # Redes menores que /24: confere o IP de cada linha da /24
+            bits = 0
+            for row in iter_bits(candidates.to_int()):
+                if ipaddress.ip_address(self._records[row].ip) in network:
+                    bits |= 1 << row
+            return bits
+        bits = 0
+        for key, bitset in self._indexes['subnet'].items():
+            if ipaddress.ip_network(key).subnet_of(network):
+                bits |= bitset.to_int()
+        return bits
+
+    def _hostname_bits(self, prefix: str) -> int:
+        matches = Bitset()
+        position = bisect.bisect_left(self._hostnames, (prefix,))
+        while position < len(self._hostnames) and self._hostnames[position][0].startswith(prefix):
+            matches.add(self._hostnames[position][1])
+            position += 1
+        return matches.to_int()
+
+    def _text_bits(self, text: str) -> int:
+        text = text.lower()
+        bits = Bitset()
+        for row, record in enumerate(self._records):
+            haystack = ' '.join((record.ip, record.hostname, record.vendor, record.simple_status))
+            if text in haystack.lower():
+                bits.add(row)
+        return bits.to_int()
+
+
+class _QueryParser:
+    """Analisador descendente: OR < AND (explícito ou implícito) < NOT < átomo."""
+
+    def __init__(self, tokens: List[str], store: ResultStore):
+        self.tokens = tokens
+        self.position = 0
+        self.store = store
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise QueryError("Consulta incompleta")
+        self.position += 1
+        return token
+
+    def parse(self) -> int:
+        bits = self._or()
+        if self._peek() is not None:
+            raise QueryError(f"Trecho inesperado: {self._peek()}")
+        return bits
+
+    def _or(self) -> int:
+        bits = self._and()
+        while (self._peek() or '').upper() == 'OR':
+            self._next()
+            bits |= self._and()
+        return bits
+
+    def _and(self) -> int:
+        bits = self._not()
+        while self._peek() is not None and self._peek() != ')' and self._peek().upper() != 'OR':
+            if self._peek().upper() == 'AND':
+                self._next()
+            bits &= self._not()
+        return bits
+
+    def _not(self) -> int:
+        if (self._peek() or '').upper() == 'NOT':
+            self._next()
+            return self.store._all_bits() & ~self._not()
+        return self._atom()
+
+    def _atom(self) -> int:
+        token = self._next()
+        if token == '(':
+            bits = self._or()
+            if self._next() != ')':
+                raise QueryError("Parêntese não fechado")
+            return bits
+        if token == ')' or token.upper() in ('AND', 'OR'):
+            raise QueryError(f"Trecho inesperado: {token}")
+        if token.isdigit():
+            return self.store._field_bits('port', token)
+        if token.lower() in ('port', 'porta') and (self._peek() or '').isdigit():
+            return self.store._field_bits('port', self._next())
+        match = _FIELD_RE.fullmatch(token)
+        if match:
+            return self.store._field_bits(match.group(1).lower(), match.group(2).strip().strip('"'))
+        return self.store._text_bits(token.strip('"'))
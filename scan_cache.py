@@ -0,0 +1,217 @@
+# scan_cache.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+# Caches registrados aqui são esvaziados a cada novo scan
+_scan_caches = []
+_registry_lock = threading.Lock()
+
+
+def register_scan_cache(cache):
+    """Registra um cache para ser limpo por reset_scan_caches()."""
+    with _registry_lock:
+        _scan_caches.append(cache)
+    return cache
+
+
+def reset_scan_caches():
+    """Limpa todos os caches com escopo de scan. Chamado no início de cada scan."""
+    with _registry_lock:
+        caches = list(_scan_caches)
+    for cache in caches:
+        cache.clear()
+
+
+class AsyncScanCache:
+    """
+    Cache de resultados de sondas assíncronas válido durante um scan.
+
+    Chamadas simultâneas para a mesma chave compartilham a mesma consulta em
+    andamento, de modo que um host nunca é consultado duas vezes no mesmo scan.
+    Deve ser usado a partir do loop compartilhado (ProbeLoop); clear() pode vir
+    de qualquer thread e é repassado ao loop.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._results: Dict[Hashable, Any] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        # Loop dono do estado, conhecido no primeiro uso
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        register_scan_cache(self)
+
+    async def get_or_fetch(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Retorna o resultado em cache para a chave ou executa a consulta uma única vez.
+
+        Args:
+            key: Chave do resultado (ex: (ip, porta))
+            factory: Função que cria a corrotina de consulta
+
+        Returns:
+            O resultado da consulta (inclusive None, que também é armazenado)
+        """
+        self._loop = asyncio.get_running_loop()
+        if key in self._results:
+            self.hits += 1
+            return self._results[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            generation = self._generation
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._store(key, t, generation))
+        else:
+            self.hits += 1
+
+        # shield: cancelar um dos interessados não cancela a consulta dos demais
+        return await asyncio.shield(task)
+
+    def _store(self, key, task, generation):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if generation != self._generation or task.cancelled() or task.exception() is not None:
+            return
+        self._results[key] = task.result()
+
+    def clear(self):
+        """
+        Descarta os resultados do scan anterior.
+
+        Chamado de outra thread, a limpeza é agendada no loop dono do cache e roda
+        antes das consultas submetidas depois dela.
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                try:
+                    loop.call_soon_threadsafe(self._clear)
+                    return
+                except RuntimeError:
+                    # Loop fechado entre a verificação e o agendamento: ninguém mais usa o estado
+                    pass
+        self._clear()
+
+    def _clear(self):
+        self._generation += 1
+        self._results = {}
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna os contadores de acertos e faltas do cache."""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._results)}
+
+
+class _Flight:
+    """Consulta síncrona em andamento, aguardada pelas demais threads."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """
+    Equivalente de AsyncScanCache para consultas bloqueantes feitas nas threads de scan.
+
+    A primeira thread que pede uma chave executa a consulta; as que chegam enquanto
+    ela está em andamento esperam e recebem o mesmo resultado.
+
+    Com ttl, um resultado vale por ttl segundos; com max_entries, os menos usados
+    são descartados. scoped=False deixa o cache fora de reset_scan_caches()
+    (caches que atravessam vários scans, como o do modo servidor).
+    """
+
+    def __init__(self, name: str, ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 scoped: bool = True):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        if scoped:
+            register_scan_cache(self)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Retorna o resultado em cache para a chave ou executa a consulta uma única vez.
+
+        Args:
+            key: Chave do resultado (ex: ip)
+            compute: Função bloqueante que faz a consulta
+
+        Returns:
+            O resultado da consulta (inclusive None, que também é armazenado)
+        """
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                if self.ttl is None or time.monotonic() - entry[0] < self.ttl:
+                    self.hits += 1
+                    self._results.move_to_end(key)
+                    return entry[1]
+                del self._results[key]
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                generation = self._generation
+            else:
+                self.hits += 1
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                if flight.error is None and generation == self._generation:
+                    self._results[key] = (time.monotonic(), flight.result)
+                    if self.max_entries is not None and len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+            flight.done.set()
+        return flight.result
+
+    def clear(self):
+        """Descarta os resultados do scan anterior."""
+        with self._lock:
+            self._generation += 1
+            self._results = OrderedDict()
+            self._inflight = {}
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna os contadores de acertos e faltas do cache."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._results)}
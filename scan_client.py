@@ -0,0 +1,83 @@
+# scan_client.py
+"""
+Cliente do modo servidor (server.py).
+
+Usado pela interface quando a variável PRINTER_FINDER_SERVER aponta para um
+servidor (ex: http://127.0.0.1:8765): o scan é enviado como job e os
+resultados chegam pelo fluxo de eventos, em vez de serem escaneados
+localmente.
+"""
+import json
+import os
+import urllib.request
+from typing import Iterator, Optional, Tuple
+
+
+SERVER_ENV = "PRINTER_FINDER_SERVER"
+# Token compartilhado exigido pelo servidor quando ele atende outras máquinas
+TOKEN_ENV = "PRINTER_FINDER_TOKEN"
+REQUEST_TIMEOUT = 10.0
+# Maior que o intervalo de "progress" do servidor: um silêncio maior indica conexão perdida
+STREAM_TIMEOUT = 30.0
+
+
+def server_url_from_env() -> Optional[str]:
+    """URL do servidor configurada no ambiente, ou None para scan local."""
+    url = os.environ.get(SERVER_ENV, '').strip()
+    return url.rstrip('/') or None
+
+
+class ScanClient:
+    """Chamadas à API de jobs do servidor."""
+
+    def __init__(self, base_url: str, token: Optional[str] = None):
+        self.base_url = base_url.rstrip('/')
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV, '').strip()
+
+    def _headers(self, **headers) -> dict:
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        return headers
+
+    def _request(self, method: str, path: str, payload: Optional[dict] = None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers=self._headers(**{'Content-Type': 'application/json'}))
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            return json.loads(response.read())
+
+    def submit(self, target: str, delta: bool = False, deadline: Optional[float] = None) -> dict:
+        """Envia um job; retorna o estado inicial ({'id', 'total', ...})."""
+        payload = {'range': target, 'delta': delta}
+        if deadline:
+            payload['deadline'] = deadline
+        return self._request('POST', '/scans', payload)
+
+    def cancel(self, job_id: int) -> dict:
+        return self._request('DELETE', f'/scans/{job_id}')
+
+    def job(self, job_id: int, include_results: bool = False) -> dict:
+        return self._request('GET', f'/scans/{job_id}' + ('?results=1' if include_results else ''))
+
+    def events(self, job_id: int, start: int = 0) -> Iterator[Tuple[str, dict]]:
+        """
+        Acompanha o fluxo de eventos de um job.
+
+        Yields:
+            (evento, dados): 'host' (com 'host', 'completed', 'total'), 'progress' e, por último, 'done'
+        """
+        request = urllib.request.Request(f"{self.base_url}/scans/{job_id}/events?from={start}",
+                                         headers=self._headers(Accept='text/event-stream'))
+        with urllib.request.urlopen(request, timeout=STREAM_TIMEOUT) as response:
+            event, data = 'message', []
+            for raw in response:
+                line = raw.decode('utf-8').rstrip('\r\n')
+                if line.startswith('event:'):
+                    event = line[6:].strip()
+                elif line.startswith('data:'):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    yield event, json.loads('\n'.join(data))
+                    if event == 'done':
+                        return
+                    event, data = 'message', []
@@ -0,0 +1,372 @@
+# scan_jobs.py
+"""
+Fila de jobs de scan com pool de workers e cache de resultados compartilhados.
+
+Vários clientes (o modo servidor, ou vários scans simultâneos na interface)
+enviam jobs com seus próprios intervalos. Todos usam o mesmo pool de
+workers (FairPool), que atende os jobs em rodízio: com N jobs ativos, cada
+um recebe cerca de 1/N dos workers, e um job grande não atrasa um pequeno
+que chegou depois. O resultado de cada IP passa por um cache com TTL e
+consulta única: se dois jobs pedem o mesmo IP ao mesmo tempo, um scan
+atende os dois, e um pedido repetido dentro de RESULT_TTL segundos sai do
+cache (inclusive "host não respondeu").
+"""
+import itertools
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from device_record import DeviceRecord
+from inventory_db import InventoryDB, InventorySink
+from printer_utils import WindowsPrinterManager
+from scan_cache import SingleFlightCache, reset_scan_caches
+from scan_pipeline import scan_host
+from scan_policy import ScanPolicy
+
+
+JOB_WORKERS = 20
+RESULT_TTL = 300
+MAX_CACHED_RESULTS = 20000
+MAX_FINISHED_JOBS = 50
+
+_END = object()
+
+
+class _Lane:
+    """Fila de um job dentro do FairPool."""
+
+    __slots__ = ('items', 'function', 'on_result', 'cancelled', 'in_flight', 'exhausted', 'done')
+
+    def __init__(self, items: Iterable, function: Callable, on_result: Callable, cancelled: Callable[[], bool]):
+        self.items = iter(items)
+        self.function = function
+        self.on_result = on_result
+        self.cancelled = cancelled
+        self.in_flight = 0
+        self.exhausted = False
+        self.done = threading.Event()
+
+
+class FairPool:
+    """
+    Workers fixos que atendem várias filas em rodízio.
+
+    Um worker livre pega o próximo item da fila seguinte à última atendida;
+    só um item por vez sai de cada fila, então nenhuma fila ocupa o pool
+    inteiro e não há tarefas acumuladas além das que estão em execução.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self._lanes = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        for index in range(workers):
+            threading.Thread(target=self._worker, name=f"scan-worker-{index}", daemon=True).start()
+
+    def add(self, items: Iterable, function: Callable, on_result: Callable,
+            cancelled: Callable[[], bool] = lambda: False) -> threading.Event:
+        """
+        Adiciona uma fila de itens.
+
+        Args:
+            items: Itens a processar (consumidos sob demanda)
+            function: function(item) executada por um worker
+            on_result: on_result(resultado) chamada no worker após cada item
+            cancelled: Quando retorna True, os itens restantes são descartados
+
+        Returns:
+            threading.Event: Sinalizado quando todos os itens iniciados terminaram
+        """
+        lane = _Lane(items, function, on_result, cancelled)
+        with self._cond:
+            self._lanes.append(lane)
+            self._cond.notify_all()
+        return lane.done
+
+    def _take(self):
+        with self._cond:
+            while not self._stopping:
+                for _ in range(len(self._lanes)):
+                    lane = self._lanes.popleft()
+                    item = _END if lane.cancelled() else next(lane.items, _END)
+                    if item is not _END:
+                        lane.in_flight += 1
+                        self._lanes.append(lane)
+                        return lane, item
+                    # Fila esgotada (ou cancelada): sai do rodízio e termina com o último item em execução
+                    lane.exhausted = True
+                    if lane.in_flight == 0:
+                        lane.done.set()
+                self._cond.wait()
+            return None
+
+    def _worker(self):
+        while True:
+            task = self._take()
+            if task is None:
+                return
+            lane, item = task
+            try:
+                lane.on_result(lane.function(item))
+            except Exception as e:
+                print(f"Erro no worker de scan: {e}")
+            finally:
+                with self._cond:
+                    lane.in_flight -= 1
+                    if lane.exhausted and lane.in_flight == 0:
+                        lane.done.set()
+
+    def shutdown(self):
+        """Encerra os workers depois dos itens em execução."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+
+class ScanJob:
+    """Um scan enviado à fila: alvos, progresso e resultados na ordem em que chegaram."""
+
+    def __init__(self, job_id: int, target: str, ips: List[str], policy: ScanPolicy):
+        self.id = job_id
+        self.target = target
+        self.ips = ips
+        self.policy = policy
+        self.status = 'queued'
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.completed = 0
+        self.total = len(ips)
+        self.results: List[DeviceRecord] = []
+        self.message = ''
+        self._cancel = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ('queued', 'running')
+
+    def cancel(self):
+        """Cancela o job; os hosts já em scan terminam, os demais não são iniciados."""
+        self._cancel.set()
+        self._notify()
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _count(self):
+        with self._changed:
+            self.completed += 1
+
+    def _add_result(self, record: DeviceRecord):
+        with self._changed:
+            self.results.append(record)
+            self._changed.notify_all()
+
+    def follow(self, start: int = 0, timeout: float = 15.0) -> Iterator[Optional[DeviceRecord]]:
+        """
+        Percorre os resultados a partir de `start`, esperando pelos novos até o job terminar.
+
+        Yields:
+            DeviceRecord, ou None quando passa `timeout` segundos sem novidade (para
+            o chamador poder mandar um keep-alive)
+        """
+        position = start
+        while True:
+            with self._changed:
+                if position >= len(self.results) and self.active:
+                    self._changed.wait(timeout)
+                batch = self.results[position:]
+                finished = not self.active
+            position += len(batch)
+            yield from batch
+            if finished and position >= len(self.results):
+                return
+            if not batch:
+                yield None
+
+    def to_dict(self, include_results: bool = False) -> dict:
+        """Estado do job para a API."""
+        data = {
+            'id': self.id,
+            'target': self.target,
+            'status': self.status,
+            'completed': self.completed,
+            'total': self.total,
+            'found': len(self.results),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.created)),
+            'finished': (time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.finished))
+                         if self.finished else None),
+            'message': self.message,
+        }
+        if include_results:
+            data['results'] = [record.to_dict() for record in self.results]
+        return data
+
+
+class ScanJobManager:
+    """Executa jobs de scan em um pool compartilhado, com cache de resultados entre jobs."""
+
+    def __init__(self, inventory: Optional[InventoryDB] = None, workers: int = JOB_WORKERS,
+                 scan_function: Callable[[str], Optional[dict]] = scan_host,
+                 result_ttl: float = RESULT_TTL, keep_results: bool = True):
+        self.inventory = inventory
+        # keep_results=False: um job iniciado sem outros ativos não reaproveita resultados anteriores
+        self.keep_results = keep_results
+        self.scan_function = scan_function
+        self.cache = SingleFlightCache("scan_results", ttl=result_ttl, max_entries=MAX_CACHED_RESULTS,
+                                       scoped=False)
+        self._pool = FairPool(workers)
+        self._jobs: Dict[int, ScanJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, target: str, ips: List[str], policy: Optional[ScanPolicy] = None,
+               listener: Optional[Callable[[ScanJob, dict], None]] = None,
+               on_done: Optional[Callable[[ScanJob], None]] = None) -> ScanJob:
+        """
+        Enfileira um job e o inicia em uma thread própria.
+
+        Args:
+            target (str): Intervalo como digitado (vai para o inventário)
+            ips (list): IPs do intervalo
+            policy (ScanPolicy): Política de agendamento (padrão: scan completo)
+            listener (callable): listener(job, resultado) a cada host encontrado (na thread do worker)
+            on_done (callable): on_done(job) quando o job termina ou é cancelado
+
+        Returns:
+            ScanJob: Job criado
+        """
+        with self._lock:
+            # Sem outros jobs ativos, um novo job começa com os caches de scan limpos
+            if not any(job.active for job in self._jobs.values()):
+                reset_scan_caches()
+                if not self.keep_results:
+                    self.cache.clear()
+            job = ScanJob(next(self._ids), target, ips, policy or ScanPolicy())
+            self._jobs[job.id] = job
+            self._prune()
+        threading.Thread(target=self._run, args=(job, listener, on_done), daemon=True).start()
+        return job
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if not job.active]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: int) -> Optional[ScanJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[ScanJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active_jobs(self) -> List[ScanJob]:
+        return [job for job in self.jobs() if job.active]
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancela um job; retorna False se ele não existe."""
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def scan_cached(self, ip: str, deadline: Optional[float] = None) -> Optional[dict]:
+        """
+        Scan de um IP pelo cache compartilhado (pedidos simultâneos viram um só scan).
+
+        Com prazo o resultado pode ser parcial; ele não passa pelo cache, para não
+        ser entregue a um job sem prazo.
+        """
+        if deadline is not None:
+            return self.scan_function(ip, deadline=deadline)
+        return self.cache.get_or_compute(ip, lambda: self.scan_function(ip))
+
+    def _scan_for_job(self, job: ScanJob, ip: str) -> Optional[dict]:
+        if job.cancelled:
+            return None
+        return job.policy.scan(ip, self.scan_cached)
+
+    def _run(self, job: ScanJob, listener: Optional[Callable], on_done: Optional[Callable]):
+        job.status = 'running'
+        job._notify()
+        sink = None
+        failed = False
+        try:
+            if self.inventory is not None:
+                try:
+                    sink = InventorySink(self.inventory, job.target, job.ips)
+                except sqlite3.Error as e:
+                    print(f"Erro ao registrar o job {job.id} no inventário: {e}")
+
+            planned = job.policy.plan(job.ips)
+            job.total = len(planned)
+
+            def handle(result):
+                job._count()
+                if result:
+                    if sink is not None:
+                        sink.write(result['data'])
+                    job._add_result(result['data'])
+                    if listener is not None:
+                        listener(job, result)
+
+            self._pool.add(planned, lambda ip: self._scan_for_job(job, ip), handle,
+                           lambda: job.cancelled).wait()
+
+            WindowsPrinterManager.flush_method_affinity()
+            messages = [job.policy.summary()]
+            if sink is not None:
+                if job.cancelled:
+                    sink.status = 'cancelled'
+                elif job.policy.partial:
+                    sink.status = 'partial'
+                sink.close()
+                if sink.status == 'complete':
+                    messages.append(self._diff_summary(sink.scan_id))
+            job.message = ' '.join(message for message in messages if message)
+        except Exception as e:
+            # Ex.: inventário bloqueado pelo monitor; o job termina com a falha na mensagem
+            print(f"Erro no job de scan {job.id}: {e}")
+            failed = True
+            job.message = f"Falha no scan: {e}"
+            if sink is not None and not sink.closed:
+                sink.status = 'cancelled'
+                try:
+                    sink.close()
+                except sqlite3.Error as close_error:
+                    print(f"Erro ao encerrar o job {job.id} no inventário: {close_error}")
+        finally:
+            job.finished = time.time()
+            job.status = 'failed' if failed else 'cancelled' if job.cancelled else 'done'
+            job._notify()
+            if on_done is not None:
+                on_done(job)
+
+    def _diff_summary(self, scan_id: int) -> str:
+        try:
+            diff = self.inventory.diff_with_previous(scan_id)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Erro ao comparar com o scan anterior: {e}")
+            return ""
+        return diff.summary() if diff is not None else ""
+
+    def stats(self) -> dict:
+        """Jobs ativos e contadores do cache compartilhado."""
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.active)
+        return {'active_jobs': active, 'cache': self.cache.stats()}
+
+    def shutdown(self):
+        """Cancela os jobs ativos e encerra o pool."""
+        for job in self.jobs():
+            job.cancel()
+        self._pool.shutdown()
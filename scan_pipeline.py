@@ -0,0 +1,381 @@
+# scan_pipeline.py
+"""
+Pipeline de scan de um host, compartilhado pela interface e pelo monitor.
+
+Nmap, sondas web/SMB/TLS/PJL, classificação e enumeração de impressoras
+compartilhadas, na mesma ordem para qualquer chamador.
+
+Cada host tem um orçamento de tempo (HostBudget, HOST_BUDGET segundos, ou
+menos se o scan tiver prazo) dividido entre as etapas: cada uma só começa
+se ainda houver o tempo reservado para ela em STAGE_RESERVE e roda por no
+máximo STAGE_SHARE do orçamento. O Nmap recebe a sua parte como
+--host-timeout e é repetido com espera exponencial em falhas transitórias;
+as demais etapas que estouram a sua parte são abandonadas. Uma etapa
+abandonada continua ocupando uma das MAX_STAGE_THREADS vagas até terminar
+sozinha; sem vaga livre, as etapas seguintes são puladas. As etapas que
+ficam de fora são anotadas no registro (DeviceRecord.skipped, status
+"parcial") e o host sai classificado com o que se conseguiu até ali, sem
+prender o worker.
+"""
+import ipaddress
+import random
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+import nmap
+
+from network_utils import (run_nmap_scan, nmap_host_timed_out, detect_device_type, get_device_vendor_info,
+                           hostname_from_probes, classify_device, NMAP_KILL_GRACE)
+from printer_utils import get_windows_shared_printers, WindowsPrinterManager
+from pjl_probe import get_pjl_info, PJL_PORT
+from web_probe import get_web_info
+from tls_probe import get_certificate_info
+from smb_probe import get_smb_info, domain_of
+from device_record import DeviceRecord, intern_text
+from blob_store import BlobStore
+
+
+# Tempo restante (s) que cada etapa precisa para começar antes do prazo
+STAGE_RESERVE = {
+    'nmap': 15.0,
+    'web': 4.0,
+    'smb': 3.0,
+    'shares': 8.0,
+    'tls': 3.0,
+    'pjl': 3.0,
+}
+
+# Orçamento de tempo por host e a fração máxima dele que cada etapa pode usar
+HOST_BUDGET = 45.0
+STAGE_SHARE = {
+    'nmap': 0.5,
+    'web': 0.1,
+    'smb': 0.1,
+    'shares': 0.3,
+    'tls': 0.1,
+    'pjl': 0.1,
+}
+
+# Novas tentativas do Nmap em falhas transitórias: espera de RETRY_BASE_DELAY, depois o dobro...
+# O Nmap encerrado por tempo (PortScannerTimeout) é o próprio host lento: não é repetido
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+NMAP_TRANSIENT_ERRORS = (OSError,)
+
+# Threads auxiliares de etapa (em execução ou abandonadas) somando todos os workers
+MAX_STAGE_THREADS = 64
+_stage_slots = threading.BoundedSemaphore(MAX_STAGE_THREADS)
+
+PARTIAL_SUFFIX = " (parcial)"
+
+# Confirmação por conexões TCP de um host cujo Nmap foi encerrado por tempo
+LIVENESS_CHECK_TIME = 2.0
+
+
+class HostBudget:
+    """
+    Orçamento de tempo de um host, compartilhado pelas etapas do scan.
+
+    Anota as etapas que não couberam (não começaram ou foram abandonadas).
+    """
+
+    def __init__(self, total: float = HOST_BUDGET, deadline: Optional[float] = None):
+        """
+        Args:
+            total (float): Orçamento do host em segundos
+            deadline (float): Prazo do scan em time.monotonic(); o orçamento nunca passa dele
+        """
+        self.total = total
+        self.end = time.monotonic() + total
+        if deadline is not None:
+            self.end = min(self.end, deadline)
+        self.skipped: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.end - time.monotonic())
+
+    def timeout(self, stage: str) -> float:
+        """Tempo máximo da etapa: a sua parte do orçamento, limitada ao que resta."""
+        return min(self.total * STAGE_SHARE[stage], self.remaining())
+
+    def allows(self, stage: str) -> bool:
+        """Indica se ainda há tempo para começar a etapa; senão, ela é anotada como pulada."""
+        if self.remaining() >= STAGE_RESERVE[stage]:
+            return True
+        self.skip(stage)
+        return False
+
+    def skip(self, stage: str):
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+
+    def retry(self, stage: str, function: Callable, transient: tuple = NMAP_TRANSIENT_ERRORS):
+        """
+        Executa a etapa no thread atual, tentando de novo em erros transitórios.
+
+        A espera entre tentativas dobra a cada vez (com variação aleatória) e
+        nenhuma tentativa começa sem o tempo reservado para a etapa.
+
+        Returns:
+            O resultado de function(), ou None se a etapa não coube no orçamento
+        """
+        delay = RETRY_BASE_DELAY
+        for attempt in range(RETRY_ATTEMPTS):
+            if not self.allows(stage):
+                return None
+            try:
+                return function()
+            except transient as e:
+                if attempt == RETRY_ATTEMPTS - 1:
+                    print(f"Etapa {stage} falhou após {RETRY_ATTEMPTS} tentativas: {e}")
+                    self.skip(stage)
+                    return None
+            time.sleep(min(delay * random.uniform(0.8, 1.2), self.remaining()))
+            delay *= 2
+        return None
+
+    def call(self, stage: str, function: Callable, *args):
+        """
+        Executa a etapa com a sua parte do orçamento.
+
+        A etapa roda em uma thread auxiliar; se não terminar a tempo, é
+        abandonada (termina sozinha pelos próprios limites) e anotada. A
+        thread ocupa uma vaga de MAX_STAGE_THREADS até terminar, então as
+        etapas abandonadas nunca se acumulam além desse limite.
+
+        Returns:
+            O resultado de function(*args), ou None se não coube no orçamento, não havia vaga ou falhou
+        """
+        if not self.allows(stage):
+            return None
+        # Com as vagas tomadas por etapas abandonadas, esta espera no máximo a sua parte do orçamento
+        if not _stage_slots.acquire(timeout=self.timeout(stage)):
+            self.skip(stage)
+            return None
+        outcome = {}
+
+        def run():
+            try:
+                outcome['result'] = function(*args)
+            except Exception as e:
+                print(f"Etapa {stage} falhou: {e}")
+            finally:
+                _stage_slots.release()
+
+        thread = threading.Thread(target=run, name=f"stage-{stage}", daemon=True)
+        try:
+            thread.start()
+        except RuntimeError:
+            _stage_slots.release()
+            raise
+        thread.join(self.timeout(stage))
+        if thread.is_alive():
+            self.skip(stage)
+            return None
+        return outcome.get('result')
+
+
+def parse_ip_range(ip_range_str: str, max_hosts: Optional[int] = None) -> List[str]:
+    """
+    Converte string de IP/range em lista de IPs.
+
+    Aceita '192.168.0.1', '192.168.0.1-255', '192.168.0.1-192.168.1.10' e '192.168.0.0/24'.
+
+    Args:
+        ip_range_str (str): Intervalo como digitado
+        max_hosts (int): Tamanho máximo do intervalo, verificado antes de gerar a lista
+
+    Raises:
+        ValueError: Se o formato for inválido ou o intervalo passar de max_hosts
+    """
+    def check_size(count: int):
+        if max_hosts is not None and count > max_hosts:
+            raise ValueError(f"Intervalo com {count} endereços (máximo {max_hosts}).")
+
+    ip_range_str = ip_range_str.strip()
+    if "/" in ip_range_str:
+        network = ipaddress.IPv4Network(ip_range_str, strict=False)
+        check_size(network.num_addresses)
+        return [str(ip) for ip in network.hosts()] or [str(network.network_address)]
+    if "-" in ip_range_str:
+        parts = ip_range_str.split("-")
+        if len(parts) != 2:
+            raise ValueError("Formato de intervalo incorreto.")
+        
+        start_ip_str = parts[0].strip()
+        end_ip_str = parts[1].strip()
+
+        start_ip = ipaddress.IPv4Address(start_ip_str)
+        
+        # Se o IP final for apenas o último octeto
+        if len(end_ip_str.split('.')) == 1:
+            end_ip_str = ".".join(start_ip_str.split('.')[:-1] + [end_ip_str])
+        
+        end_ip = ipaddress.IPv4Address(end_ip_str)
+
+        if end_ip < start_ip:
+            raise ValueError("O IP final do intervalo deve ser maior que o IP inicial.")
+        check_size(int(end_ip) - int(start_ip) + 1)
+            
+        return [str(ipaddress.IPv4Address(ip)) for ip in range(int(start_ip), int(end_ip) + 1)]
+    return [str(ipaddress.IPv4Address(ip_range_str))]
+
+
+def scan_host(ip: str, details_store: Optional[BlobStore] = None,
+              deadline: Optional[float] = None) -> Optional[dict]:
+    """
+    Escaneia um único IP.
+
+    Args:
+        ip (str): Endereço
+        details_store (BlobStore): Arquivo que recebe o detalhe completo do host; sem ele,
+            os dados das sondas ficam no próprio registro
+        deadline (float): Prazo do scan em time.monotonic(); o orçamento do host não passa dele
+
+    Returns:
+        dict | None: {"is_printer": bool, "data": DeviceRecord} ou None se o host não respondeu
+            (ou se não havia tempo nem para o Nmap)
+    """
+    budget = HostBudget(deadline=deadline)
+    # A folga até o processo ser encerrado também sai da parte do Nmap
+    nmap_timeout = lambda: max(1.0, budget.timeout('nmap') - NMAP_KILL_GRACE)
+    try:
+        scanned = budget.retry('nmap', lambda: run_nmap_scan(ip, nmap_timeout()))
+    except nmap.PortScannerTimeout:
+        # Nmap encerrado por tempo: o host só sai (parcial, sem dados do Nmap) se uma porta
+        # aberta ou recusada mostrar que ele está ativo
+        print(f"Nmap excedeu o orçamento de tempo para o IP {ip}")
+        return confirm_alive(ip)
+    except Exception as e:
+        print(f"Erro no Nmap para o IP {ip}: {e}")
+        return None
+    nmap_data, nmap_xml = scanned or (None, '')
+    if not nmap_data:
+        return None
+    if nmap_host_timed_out(nmap_xml):
+        budget.skip('nmap')
+
+    # Obtém informações básicas do dispositivo
+    vendor_info = get_device_vendor_info(nmap_data)
+    tcp_ports = nmap_data.get('tcp', {})
+    web_info = budget.call('web', get_web_info, ip, tcp_ports)
+
+    # Desafio NTLM do SMB: nome e domínio do host em uma única conexão
+    smb_info = budget.call('smb', get_smb_info, ip, tcp_ports)
+    domain = domain_of(smb_info)
+
+    classification = classify_device(nmap_data, web_info)
+    # detect_device_type só acrescenta às regras a enumeração de compartilhamentos (139/445)
+    detected = None
+    if classification.device_type != 'network_printer' and (139 in tcp_ports or 445 in tcp_ports):
+        detected = budget.call('shares', detect_device_type, nmap_data, ip, web_info, domain)
+    device_type, status_display = detected or (classification.device_type, classification.label)
+    if web_info and not vendor_info['vendor']:
+        vendor_info['vendor'] = web_info.get('vendor', '')
+
+    # Certificado TLS: só é lido quando faltam nome ou fabricante
+    hostname = nmap_data.get('hostnames', [{}])[0].get('name', '')
+    cert_info = None
+    if not vendor_info['vendor'] or not (hostname or smb_info):
+        cert_info = budget.call('tls', get_certificate_info, ip, tcp_ports)
+    if not hostname:
+        # Sem o DNS reverso do Nmap, vale o nome que o host informou ao SMB ou no certificado
+        hostname = hostname_from_probes(smb_info, cert_info)
+    if cert_info and not vendor_info['vendor']:
+        vendor_info['vendor'] = cert_info.get('vendor', '')
+    
+    # Registro compacto: o dicionário do Nmap não é mantido após o scan do host
+    record = DeviceRecord(ip, hostname, vendor_info['mac'], vendor_info['vendor'], device_type,
+                          status_display, nmap_data.get('status', {}).get('state', ''), domain)
+    record.set_ports(nmap_data.get('tcp', {}))
+    record.rule = classification.rule_id
+    record.confidence = classification.confidence
+
+    if web_info and web_info.get('is_printer') and web_info.get('model'):
+        record.model = intern_text(web_info['model'])
+
+    # Impressoras RAW/JetDirect: consulta modelo e status via PJL
+    pjl_info = None
+    if device_type == 'network_printer' and record.port_state(PJL_PORT) == 'open':
+        pjl_info = budget.call('pjl', get_pjl_info, ip)
+        if pjl_info:
+            if pjl_info.get('model'):
+                record.model = intern_text(pjl_info['model'])
+                record.simple_status = record.model
+            if pjl_info.get('status'):
+                record.simple_status = intern_text(f"{record.simple_status} - {pjl_info['status']}")
+
+    # Se for impressora compartilhada, obtém detalhes das impressoras
+    if device_type == 'shared_printer':
+        shared_printers = get_windows_shared_printers(ip, domain)
+        if shared_printers:
+            record.shared_printers = shared_printers
+            # Atualiza o status com nome mais descritivo da primeira impressora
+            printer_display = WindowsPrinterManager.get_printer_display_name(shared_printers[0])
+            record.simple_status = intern_text(f"Compartilhando: {printer_display}")
+
+    # Detalhe completo (XML do Nmap, sondas, enumeração) vai para o arquivo de blobs;
+    # só fica na memória se o arquivo não estiver disponível
+    detail = {
+        'nmap': nmap_data,
+        'nmap_xml': nmap_xml,
+        'web': web_info,
+        'pjl': pjl_info,
+        'smb': smb_info,
+        'certificate': cert_info,
+        'shared_printers': record.shared_printers,
+        'skipped': budget.skipped,
+    }
+    if details_store is None or not details_store.put(ip, detail):
+        record.web, record.pjl, record.smb, record.certificate = web_info, pjl_info, smb_info, cert_info
+    if budget.skipped:
+        _mark_partial(record, budget.skipped)
+
+    return {"is_printer": record.is_printer, "data": record}
+
+
+def _mark_partial(record: DeviceRecord, skipped: Iterable[str]):
+    record.skipped = tuple(skipped)
+    record.simple_status = intern_text(record.simple_status + PARTIAL_SUFFIX)
+
+
+def confirm_alive(ip: str) -> Optional[dict]:
+    """
+    Testa as portas da descoberta em um host sem dados do Nmap.
+
+    Returns:
+        dict | None: discovery_result com as portas abertas, ou None se nenhuma porta aceitou
+            nem recusou a conexão
+    """
+    from scan_policy import discover_hosts
+    found, _ = discover_hosts([ip], LIVENESS_CHECK_TIME)
+    if ip not in found:
+        return None
+    return discovery_result(ip, sorted(found[ip]))
+
+
+def discovery_result(ip: str, open_ports: Iterable[int]) -> dict:
+    """
+    Resultado de um host visto só pela descoberta (conexões TCP), sem Nmap nem sondas.
+
+    A classificação usa as mesmas regras de fingerprint, só com as portas abertas.
+
+    Args:
+        ip (str): Endereço
+        open_ports: Portas que aceitaram conexão
+
+    Returns:
+        dict: {"is_printer": bool, "data": DeviceRecord} com todas as etapas marcadas como puladas
+    """
+    nmap_data = {'tcp': {port: {'state': 'open', 'name': '', 'product': '', 'version': ''}
+                         for port in open_ports},
+                 'status': {'state': 'up'}}
+    classification = classify_device(nmap_data)
+    record = DeviceRecord(ip, type=classification.device_type, simple_status=classification.label,
+                          state='up')
+    record.set_ports(nmap_data['tcp'])
+    record.rule = classification.rule_id
+    record.confidence = classification.confidence
+    _mark_partial(record, STAGE_RESERVE)
+    return {"is_printer": record.is_printer, "data": record}
@@ -0,0 +1,294 @@
+# scan_policy.py
+"""
+Políticas de agendamento do scan.
+
+Scanner.run_scan_in_parallel pergunta à política quais IPs agendar (plan) e
+como escanear cada um (scan). A política padrão faz o scan completo de todo
+o intervalo; o scan delta usa o inventário (inventory_db) para evitar
+repetir o fingerprint de hosts que não mudaram:
+
+    host conhecido      conexão TCP às portas que estavam abertas no scan base
+                        (até VERIFY_MAX_PORTS, parando na primeira que falhar).
+                        Todas responderam: o registro do scan base é mantido.
+                        Alguma falhou: scan completo (mudou ou saiu da rede).
+    host sem portas     scan completo (não há sonda barata que confirme)
+    endereço sem host   só uma fração é escaneada (DELTA_SAMPLE_RATE), em
+                        rodízio: a cada scan delta entra outra fatia do
+                        intervalo, então todo endereço é visitado em
+                        1/DELTA_SAMPLE_RATE scans.
+
+A sonda barata não percebe troca de nome, MAC ou compartilhamentos de um
+host que mantém as mesmas portas; um scan completo periódico continua
+necessário para isso.
+
+O scan com prazo (DeadlineScanPolicy) entrega o melhor resultado possível em
+N segundos, na ordem de valor:
+
+    descoberta          conexões TCP às DISCOVERY_PORTS de todo o intervalo,
+                        com até DISCOVERY_SHARE do prazo; porta aberta ou
+                        recusada indica host ativo
+    impressoras         hosts com porta de impressora (9100/631/515) entram
+                        primeiro na fila, depois os demais ativos; endereços
+                        sem resposta não são agendados
+    enriquecimento      Nmap e sondas só começam se ainda couberem no prazo
+                        (scan_pipeline.STAGE_RESERVE); sem tempo, o host sai
+                        classificado pelas portas da descoberta
+
+Cada registro anota as etapas puladas (DeviceRecord.skipped) e o resumo
+conta o que ficou de fora.
+"""
+import asyncio
+import socket
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from device_record import DeviceRecord
+from inventory_db import InventoryDB, ip_to_int
+from probe_runtime import run_probe
+from scan_pipeline import STAGE_RESERVE, discovery_result
+
+
+DELTA_SAMPLE_RATE = 0.1
+VERIFY_TIMEOUT = 1.0
+VERIFY_MAX_PORTS = 3
+
+# Portas preferidas para a verificação (as mais estáveis em impressoras e servidores)
+PREFERRED_VERIFY_PORTS = (9100, 631, 445, 80, 443, 515)
+
+# Descoberta do scan com prazo: portas de impressora primeiro
+DISCOVERY_PORTS = (9100, 631, 515, 80, 443, 445, 139, 22, 3389)
+PRINTER_DISCOVERY_PORTS = (9100, 631, 515)
+DISCOVERY_TIMEOUT = 0.5
+DISCOVERY_CONCURRENCY = 512
+DISCOVERY_SHARE = 0.3
+
+
+def tcp_connect(ip: str, port: int, timeout: float = VERIFY_TIMEOUT) -> bool:
+    """Retorna True se a porta aceita conexão TCP."""
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class ScanPolicy:
+    """Política padrão: todo IP do intervalo passa pelo scan completo."""
+
+    name = "completo"
+    # True quando parte da faixa não foi coberta (o inventário não usa o scan como base);
+    # hosts com etapas puladas não contam, eles são excluídos um a um das comparações
+    partial = False
+
+    def plan(self, ips: List[str]) -> List[str]:
+        """
+        Escolhe os IPs que serão agendados.
+
+        Args:
+            ips (list): IPs do intervalo digitado
+
+        Returns:
+            list: IPs a escanear
+        """
+        return list(ips)
+
+    def scan(self, ip: str, full_scan: Callable[[str], Optional[dict]]) -> Optional[dict]:
+        """
+        Escaneia um IP agendado.
+
+        Args:
+            ip (str): Endereço
+            full_scan (callable): Scan completo do Scanner, full_scan(ip, deadline=None)
+
+        Returns:
+            dict | None: Resultado no formato de scan_single_ip, ou None se o host não respondeu
+        """
+        return full_scan(ip)
+
+    def summary(self) -> str:
+        """Resumo da política para a mensagem de conclusão ('' se não há o que dizer)."""
+        return ""
+
+
+class DeltaScanPolicy(ScanPolicy):
+    """Scan delta: confirma hosts conhecidos com uma conexão TCP e amostra o resto do intervalo."""
+
+    name = "delta"
+
+    def __init__(self, inventory: InventoryDB, sample_rate: float = DELTA_SAMPLE_RATE,
+                 timeout: float = VERIFY_TIMEOUT):
+        self.inventory = inventory
+        self.sample_rate = sample_rate
+        self.timeout = timeout
+        self.baseline: Optional[int] = None
+        self.known: Dict[str, DeviceRecord] = {}
+        self._lock = threading.Lock()
+        self.counts = {'verified': 0, 'rescanned': 0, 'sampled': 0, 'skipped': 0}
+
+    def plan(self, ips: List[str]) -> List[str]:
+        self.baseline = self.inventory.baseline_scan(ips)
+        if self.baseline is None:
+            print("Scan delta: nenhum scan anterior desta faixa no inventário; fazendo scan completo.")
+            return list(ips)
+        self.known = self.inventory.load_records(self.baseline, ips)
+
+        # Rodízio da amostra: a fatia muda a cada scan base
+        period = max(1, round(1 / self.sample_rate)) if self.sample_rate > 0 else 0
+        phase = self.baseline % period if period else 0
+        planned = []
+        for ip in ips:
+            if ip in self.known or (period and ip_to_int(ip) % period == phase):
+                planned.append(ip)
+        self.counts['skipped'] = len(ips) - len(planned)
+        return planned
+
+    def _verify_ports(self, record: DeviceRecord) -> List[int]:
+        open_ports = record.open_ports()
+        preferred = [port for port in PREFERRED_VERIFY_PORTS if port in open_ports]
+        others = [port for port in open_ports if port not in preferred]
+        return (preferred + others)[:VERIFY_MAX_PORTS]
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def scan(self, ip: str, full_scan: Callable[[str], Optional[dict]]) -> Optional[dict]:
+        record = self.known.get(ip)
+        if record is None:
+            if self.baseline is not None:
+                self._count('sampled')
+            return full_scan(ip)
+        # Host com etapas puladas no scan base: o registro não é mantido, faz o scan completo
+        if record.partial:
+            self._count('rescanned')
+            return full_scan(ip)
+
+        ports = self._verify_ports(record)
+        if ports and all(tcp_connect(ip, port, self.timeout) for port in ports):
+            self._count('verified')
+            return {"is_printer": record.is_printer, "data": record}
+
+        self._count('rescanned')
+        return full_scan(ip)
+
+    def summary(self) -> str:
+        if self.baseline is None:
+            return ""
+        counts = self.counts
+        return (f"Delta (base #{self.baseline}): {counts['verified']} confirmados, "
+                f"{counts['rescanned']} re-escaneados, {counts['sampled']} endereços amostrados, "
+                f"{counts['skipped']} pulados.")
+
+
+async def _discover(ips: List[str], ports: Iterable[int], timeout: float, budget: float,
+                    found: Dict[str, Set[int]], probed: Counter):
+    semaphore = asyncio.Semaphore(DISCOVERY_CONCURRENCY)
+
+    async def probe(ip: str, port: int):
+        async with semaphore:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+            except ConnectionRefusedError:
+                # Recusa (RST) também prova que o host está ativo
+                found.setdefault(ip, set())
+            except (OSError, asyncio.TimeoutError):
+                pass
+            else:
+                writer.close()
+                found.setdefault(ip, set()).add(port)
+            probed[ip] += 1
+
+    # Uma porta por vez em todo o intervalo: sem tempo, as portas de impressora já foram testadas
+    tasks = [asyncio.ensure_future(probe(ip, port)) for port in ports for ip in ips]
+    _, pending = await asyncio.wait(tasks, timeout=budget)
+    for task in pending:
+        task.cancel()
+
+
+def discover_hosts(ips: List[str], budget: float, ports: Iterable[int] = DISCOVERY_PORTS,
+                   timeout: float = DISCOVERY_TIMEOUT):
+    """
+    Descoberta rápida por conexões TCP simultâneas no loop compartilhado das sondas.
+
+    Args:
+        ips (list): Endereços
+        budget (float): Tempo máximo da descoberta em segundos
+        ports: Portas testadas, em ordem de prioridade
+        timeout (float): Espera por conexão
+
+    Returns:
+        tuple: ({ip: portas abertas} dos hosts que responderam, IPs cuja descoberta não terminou)
+    """
+    ports = tuple(ports)
+    found: Dict[str, Set[int]] = {}
+    probed: Counter = Counter()
+    run_probe(_discover(ips, ports, timeout, budget, found, probed), timeout=budget + timeout + 1)
+    unfinished = [ip for ip in ips if ip not in found and probed[ip] < len(ports)]
+    return found, unfinished
+
+
+class DeadlineScanPolicy(ScanPolicy):
+    """Scan com prazo: descoberta, impressoras primeiro e enriquecimento só enquanto houver tempo."""
+
+    name = "prazo"
+
+    def __init__(self, seconds: float, discovery_share: float = DISCOVERY_SHARE):
+        self.seconds = seconds
+        self.discovery_share = discovery_share
+        self.deadline: Optional[float] = None
+        self.discovered: Dict[str, Set[int]] = {}
+        self.silent = 0
+        self.unfinished = 0
+        # Etapa -> IPs (com Nmap) em que ela foi pulada
+        self.skipped: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.counts = {'full': 0, 'partial': 0, 'discovery': 0}
+
+    def plan(self, ips: List[str]) -> List[str]:
+        self.deadline = time.monotonic() + self.seconds
+        self.discovered, unfinished = discover_hosts(ips, self.seconds * self.discovery_share)
+        self.unfinished = len(unfinished)
+        self.silent = len(ips) - len(self.discovered) - self.unfinished
+        # Endereços que a descoberta não terminou de testar podem ser hosts perdidos
+        self.partial = self.unfinished > 0
+
+        printers = [ip for ip in ips if self.discovered.get(ip, set()) & set(PRINTER_DISCOVERY_PORTS)]
+        likely = set(printers)
+        others = [ip for ip in ips if ip in self.discovered and ip not in likely]
+        return printers + others
+
+    def scan(self, ip: str, full_scan: Callable[..., Optional[dict]]) -> Optional[dict]:
+        result = None
+        if time.monotonic() + STAGE_RESERVE['nmap'] <= self.deadline:
+            result = full_scan(ip, deadline=self.deadline)
+        # Sem tempo para o Nmap (ou o Nmap não viu o host): fica o que a descoberta encontrou
+        if result is None:
+            result = discovery_result(ip, sorted(self.discovered.get(ip, ())))
+            key = 'discovery'
+        else:
+            key = 'partial' if result['data'].partial else 'full'
+        with self._lock:
+            self.counts[key] += 1
+            # Os hosts só com a descoberta pularam tudo; aqui ficam as etapas dos demais
+            for stage in result['data'].skipped if key == 'partial' else ():
+                self.skipped.setdefault(stage, []).append(ip)
+        return result
+
+    def summary(self) -> str:
+        counts = self.counts
+        found = len(self.discovered)
+        printers = sum(1 for ports in self.discovered.values() if ports & set(PRINTER_DISCOVERY_PORTS))
+        text = (f"Prazo de {self.seconds:g}s: {found} hosts na descoberta ({printers} com porta de impressora); "
+                f"{counts['full']} completos, {counts['partial']} com etapas puladas, "
+                f"{counts['discovery']} só com a descoberta.")
+        if self.skipped:
+            stages = ", ".join(f"{stage} em {len(ips)}" for stage, ips in self.skipped.items())
+            text += f" Etapas puladas: {stages}."
+        if self.silent or self.unfinished:
+            text += f" Não escaneados: {self.silent} endereços sem resposta"
+            if self.unfinished:
+                text += f" e {self.unfinished} com a descoberta interrompida pelo prazo"
+            text += "."
+        return text
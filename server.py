@@ -0,0 +1,335 @@
+# server.py
+"""
+Modo servidor: API REST/JSON local para jobs de scan e consulta ao inventário.
+
+Todos os clientes compartilham o mesmo pool de workers e o mesmo cache de
+resultados (scan_jobs.ScanJobManager): pedidos que se sobrepõem não
+reescaneiam os mesmos hosts.
+
+    POST   /scans                   {"range": "10.0.0.0/24", "delta": false} -> job
+                                    ("deadline": 30 faz o scan com prazo de 30 s)
+    GET    /scans                   jobs recentes
+    GET    /scans/<id>              estado do job (?results=1 inclui os hosts)
+    GET    /scans/<id>/events       Server-Sent Events: "host" a cada resultado,
+                                    "progress" periódico e "done" no fim
+                                    (Last-Event-ID ou ?from=N retomam a partir do N-ésimo host)
+    DELETE /scans/<id>              cancela o job
+    GET    /inventory/scans         scans registrados
+    GET    /inventory/hosts         hosts do último scan (?range=... limita a faixa)
+    GET    /inventory/diff          mudanças (?old=&new=, padrão: último x anterior)
+    GET    /inventory/last-seen?q=  última vez que um IP, MAC ou compartilhamento foi visto
+    GET    /stats                   jobs ativos e cache compartilhado
+
+Uso:
+
+    python server.py [--host 127.0.0.1] [--port 8765] [--token SEGREDO]
+
+A API não tem usuários: fora do endereço local (127.0.0.1) o servidor só
+inicia com um token compartilhado (--token ou PRINTER_FINDER_TOKEN), que os
+clientes enviam em "Authorization: Bearer <token>".
+"""
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+import re
+import sqlite3
+import sys
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from inventory_db import InventoryDB, open_inventory
+from scan_jobs import ScanJobManager
+from scan_client import TOKEN_ENV
+from scan_pipeline import parse_ip_range
+from scan_policy import DeadlineScanPolicy, DeltaScanPolicy, ScanPolicy
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+PROGRESS_INTERVAL = 1.0
+MAX_BODY = 64 * 1024
+# Maior intervalo aceito em um pedido (um /16)
+MAX_SCAN_HOSTS = 65536
+
+_JOB_PATH = re.compile(r'^/scans/(\d+)(/events)?$')
+
+
+class ApiError(Exception):
+    """Erro devolvido ao cliente com o status HTTP correspondente."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ScanRequestHandler(BaseHTTPRequestHandler):
+    """Rotas da API; o gerenciador de jobs e o inventário ficam no servidor."""
+
+    server_version = "PrinterFinder/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def jobs(self) -> ScanJobManager:
+        return self.server.jobs
+
+    @property
+    def inventory(self) -> Optional[InventoryDB]:
+        return self.server.inventory
+
+    def log_message(self, format, *args):
+        # Só os erros vão para a saída; o acesso normal não interessa
+        pass
+
+    # ------------------------------------------------------------------ #
+    # Respostas
+    # ------------------------------------------------------------------ #
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            raise ApiError(413, "Corpo da requisição muito grande")
+        try:
+            data = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise ApiError(400, "JSON inválido")
+        if not isinstance(data, dict):
+            raise ApiError(400, "Esperado um objeto JSON")
+        return data
+
+    def _route(self) -> Tuple[str, dict]:
+        url = urlparse(self.path)
+        return url.path.rstrip('/') or '/', {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+    def _check_token(self):
+        token = self.server.token
+        if not token:
+            return
+        header = self.headers.get('Authorization', '')
+        if not hmac.compare_digest(header.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+            raise ApiError(401, "Token ausente ou inválido")
+
+    def _dispatch(self, handler):
+        try:
+            self._check_token()
+            handler()
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            print(f"Erro ao atender {self.command} {self.path}: {e}")
+            self._send_json(500, {'error': str(e)})
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def do_DELETE(self):
+        self._dispatch(self._delete)
+
+    # ------------------------------------------------------------------ #
+    # Rotas
+    # ------------------------------------------------------------------ #
+    def _job(self, job_id: str):
+        job = self.jobs.get(int(job_id))
+        if job is None:
+            raise ApiError(404, f"Job {job_id} não encontrado")
+        return job
+
+    def _post(self):
+        path, _ = self._route()
+        if path != '/scans':
+            raise ApiError(404, "Rota não encontrada")
+        data = self._read_json()
+        target = str(data.get('range', '')).strip()
+        try:
+            ips = parse_ip_range(target, max_hosts=MAX_SCAN_HOSTS)
+        except ValueError as e:
+            raise ApiError(400, f"Intervalo inválido: {e}")
+        if data.get('delta') and self.inventory is None:
+            raise ApiError(400, "Scan delta requer o inventário")
+        if data.get('deadline') is not None:
+            if data.get('delta'):
+                raise ApiError(400, "Scan delta e prazo não podem ser combinados")
+            try:
+                seconds = float(data['deadline'])
+            except (TypeError, ValueError):
+                seconds = 0
+            if seconds <= 0:
+                raise ApiError(400, "Prazo inválido (segundos > 0)")
+            policy = DeadlineScanPolicy(seconds)
+        else:
+            policy = DeltaScanPolicy(self.inventory) if data.get('delta') else ScanPolicy()
+        job = self.jobs.submit(target, ips, policy)
+        self._send_json(202, job.to_dict())
+
+    def _delete(self):
+        path, _ = self._route()
+        match = _JOB_PATH.match(path)
+        if not match or match.group(2):
+            raise ApiError(404, "Rota não encontrada")
+        job = self._job(match.group(1))
+        job.cancel()
+        self._send_json(200, job.to_dict())
+
+    def _get(self):
+        path, query = self._route()
+        match = _JOB_PATH.match(path)
+        if match and match.group(2):
+            self._stream_events(self._job(match.group(1)), query)
+        elif match:
+            self._send_json(200, self._job(match.group(1)).to_dict(include_results=query.get('results') == '1'))
+        elif path == '/scans':
+            self._send_json(200, [job.to_dict() for job in self.jobs.jobs()])
+        elif path == '/stats':
+            self._send_json(200, self.jobs.stats())
+        elif path.startswith('/inventory/'):
+            self._inventory_route(path, query)
+        else:
+            raise ApiError(404, "Rota não encontrada")
+
+    def _inventory_route(self, path: str, query: dict):
+        if self.inventory is None:
+            raise ApiError(503, "Inventário indisponível")
+        try:
+            if path == '/inventory/scans':
+                self._send_json(200, self.inventory.list_scans(int(query.get('limit', 20))))
+            elif path == '/inventory/hosts':
+                self._send_json(200, self._inventory_hosts(query.get('range')))
+            elif path == '/inventory/diff':
+                self._send_json(200, self._inventory_diff(query))
+            elif path == '/inventory/last-seen':
+                if not query.get('q'):
+                    raise ApiError(400, "Parâmetro q obrigatório")
+                self._send_json(200, self.inventory.last_seen(query['q']))
+            else:
+                raise ApiError(404, "Rota não encontrada")
+        except sqlite3.Error as e:
+            raise ApiError(500, f"Erro no inventário: {e}")
+
+    def _inventory_hosts(self, target: Optional[str]) -> dict:
+        if target:
+            try:
+                ips = parse_ip_range(target, max_hosts=MAX_SCAN_HOSTS)
+            except ValueError as e:
+                raise ApiError(400, f"Intervalo inválido: {e}")
+            scan_id = self.inventory.baseline_scan(ips)
+        else:
+            scans = [scan for scan in self.inventory.list_scans() if scan['status'] == 'complete']
+            scan_id = scans[0]['id'] if scans else None
+            ips = None
+        if scan_id is None:
+            return {'scan': None, 'hosts': []}
+        records = self.inventory.load_records(scan_id, ips)
+        return {'scan': self.inventory.get_scan(scan_id), 'hosts': [record.to_dict() for record in records.values()]}
+
+    def _inventory_diff(self, query: dict) -> dict:
+        try:
+            if 'old' in query and 'new' in query:
+                diff = self.inventory.diff(int(query['old']), int(query['new']))
+            else:
+                scans = [scan for scan in self.inventory.list_scans() if scan['status'] == 'complete']
+                diff = self.inventory.diff_with_previous(scans[0]['id']) if scans else None
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        if diff is None:
+            raise ApiError(404, "Não há dois scans concluídos da mesma faixa para comparar")
+        data = asdict(diff)
+        data['summary'] = diff.summary()
+        return data
+
+    def _stream_events(self, job, query: dict):
+        start = query.get('from') or self.headers.get('Last-Event-ID') or 0
+        try:
+            position = int(start)
+        except ValueError:
+            raise ApiError(400, "Posição inválida")
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def send(event: str, data: dict, event_id: Optional[int] = None):
+            lines = f"event: {event}\n"
+            if event_id is not None:
+                lines += f"id: {event_id}\n"
+            lines += f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+            self.wfile.write(lines.encode('utf-8'))
+            self.wfile.flush()
+
+        for record in job.follow(position, timeout=PROGRESS_INTERVAL):
+            progress = {'completed': job.completed, 'total': job.total}
+            if record is None:
+                send('progress', progress)
+            else:
+                position += 1
+                send('host', dict(progress, host=record.to_dict()), position)
+        send('done', job.to_dict())
+
+
+class ScanServer(ThreadingHTTPServer):
+    """Servidor HTTP com o gerenciador de jobs e o inventário compartilhados."""
+
+    daemon_threads = True
+
+    def __init__(self, address, jobs: ScanJobManager, inventory: Optional[InventoryDB], token: str = ''):
+        super().__init__(address, ScanRequestHandler)
+        self.jobs = jobs
+        self.inventory = inventory
+        self.token = token
+
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == 'localhost'
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="API local de scan do Printer Finder")
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help="Endereço de escuta (fora de 127.0.0.1 exige --token)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--token', default=os.environ.get(TOKEN_ENV, ''),
+                        help=f"Token compartilhado exigido dos clientes (padrão: ${TOKEN_ENV})")
+    args = parser.parse_args(argv[1:])
+    if not args.token and not _is_loopback(args.host):
+        print(f"Recusado: escutar em {args.host} sem token deixaria a API aberta à rede. "
+              f"Informe --token ou {TOKEN_ENV}.")
+        return 2
+
+    inventory = open_inventory()
+    jobs = ScanJobManager(inventory)
+    server = ScanServer((args.host, args.port), jobs, inventory, args.token)
+    print(f"Servidor de scan em http://{args.host}:{args.port} (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        jobs.shutdown()
+        if inventory is not None:
+            inventory.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
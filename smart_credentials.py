@@ -7,6 +7,10 @@ import base64
 import threading
 from typing import Optional, Tuple, Callable
 from printer_utils import WindowsPrinterManager
+from credential_context import CredentialContext
+from auth_cache import get_auth_cache
+from smb_probe import get_smb_info, domain_of, SMB_PORTS
+from srvsvc_enum import check_credentials
 
 
 class SmartCredentialsManager:
@@ -16,8 +20,10 @@ class SmartCredentialsManager:
         self.parent_app = parent_app
         self.credentials_file = "scanner_credentials.json"
         self.cached_credentials = {}
+        # Hosts em que o usuário cancelou o diálogo nesta sessão
         self.failed_hosts = set()
-        self.authenticated_hosts = set()
+        self.auth_cache = get_auth_cache()
+        self._lock = threading.Lock()
         self.load_saved_credentials()
     
     def load_saved_credentials(self):
@@ -74,49 +80,102 @@ class SmartCredentialsManager:
         except:
             return ""
     
-    def request_credentials_if_needed(self, ip: str, operation_name: str = "acessar") -> bool:
+    def request_credentials_if_needed(self, ip: str, operation_name: str = "acessar",
+                                      domain: str = None) -> bool:
         """
         Solicita credenciais se necessário para um host específico.
         
         Args:
             ip (str): Endereço IP do host
             operation_name (str): Nome da operação sendo executada
+            domain (str): Domínio do host (padrão: obtido pelo desafio NTLM do SMB)
             
         Returns:
             bool: True se credenciais foram configuradas (ou não necessárias)
         """
-        # Se já foi autenticado com sucesso neste host
-        if ip in self.authenticated_hosts:
-            return True
+        with self._lock:
+            # Se o usuário já cancelou o diálogo para este host
+            if ip in self.failed_hosts:
+                return False
         
-        # Se já falhou antes e usuário cancelou
-        if ip in self.failed_hosts:
-            return False
+        if domain is None:
+            domain = self._host_domain(ip)
         
         # Primeiro tenta com credenciais em cache (se existirem)
-        if self.cached_credentials:
-            success = self._test_credentials(ip, 
-                                           self.cached_credentials['username'], 
-                                           self.cached_credentials['password'])
-            if success:
-                self.authenticated_hosts.add(ip)
-                return True
+        context = self.get_context()
+        if context.is_set and self._check_credentials(ip, context, domain):
+            return True
         
         # Se chegou aqui, precisa solicitar credenciais ao usuário
-        return self._prompt_for_credentials(ip, operation_name)
+        return self._prompt_for_credentials(ip, operation_name, domain)
     
-    def _test_credentials(self, ip: str, username: str, password: str) -> bool:
-        """Testa se as credenciais funcionam para um host específico."""
+    @staticmethod
+    def _host_domain(ip: str) -> str:
+        """Domínio do host pelo desafio NTLM (em cache durante o scan)."""
+        return domain_of(get_smb_info(ip, {port: {'state': 'open'} for port in SMB_PORTS}))
+    
+    def _check_credentials(self, ip: str, credentials: CredentialContext, domain: str = '') -> bool:
+        """
+        Consulta o cache de autenticação e só testa o host quando não há resultado válido.
+        
+        Um resultado em qualquer host do domínio vale para os demais hosts do
+        mesmo domínio até expirar. A validação é só o SESSION_SETUP autenticado:
+        uma enumeração não serve, porque os métodos anônimos listam os
+        compartilhamentos de muitos hosts com qualquer senha. Sem resposta do
+        SMB a credencial não é considerada válida (e nada entra no cache).
+        """
+        known = self.auth_cache.lookup(ip, credentials.fingerprint, domain)
+        if known is not None:
+            return known
         try:
-            # Define credenciais temporariamente
-            old_username, old_password = WindowsPrinterManager.get_credentials()
-            WindowsPrinterManager.set_credentials(username, password)
-            
-            # Testa a conexão
-            printers = WindowsPrinterManager.get_shared_printers(ip)
-            
-            # Restaura credenciais antigas
-            WindowsPrinterManager.set_credentials(old_username, old_password)
-            
-            # Se chegou até aqui sem erro, as credenciais funcionam
+            authenticated = check_credentials(ip, credentials.username, credentials.password,
+                                              credentials.domain)
+        except Exception as e:
+            print(f"Erro ao verificar credenciais em {ip}: {e}")
+            authenticated = None
+        if authenticated is None:
+            return False
+        self.auth_cache.record(ip, credentials.fingerprint, authenticated, domain)
+        return authenticated
+    
+    def get_context(self) -> CredentialContext:
+        """Retorna as credenciais em cache como contexto imutável."""
+        return CredentialContext.from_input(self.cached_credentials.get('username'),
+                                            self.cached_credentials.get('password'))
+    
+    def _prompt_for_credentials(self, ip: str, operation_name: str, domain: str = '') -> bool:
+        """Abre o diálogo de credenciais (na thread da interface) e testa o resultado."""
+        from credentials_dialog import CredentialsDialog
+        
+        result = {}
+        done = threading.Event()
+        
+        def ask():
+            try:
+                dialog = CredentialsDialog(self.parent_app)
+                dialog.title(f"Credenciais para {operation_name} {ip}")
+                self.parent_app.wait_window(dialog)
+                result['value'] = dialog.result
+            finally:
+                done.set()
+        
+        if threading.current_thread() is threading.main_thread():
+            ask()
+        else:
+            self.parent_app.after(0, ask)
+            done.wait()
+        
+        value = result.get('value')
+        if not value or not value.get('use_credentials'):
+            with self._lock:
+                self.failed_hosts.add(ip)
+            return False
+        
+        credentials = CredentialContext.from_input(value['username'], value['password'])
+        if self._check_credentials(ip, credentials, domain):
+            self.cached_credentials = {'username': value['username'], 'password': value['password']}
             return True
+        
+        with self._lock:
+            self.failed_hosts.add(ip)
+        return False
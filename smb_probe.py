@@ -0,0 +1,373 @@
+# smb_probe.py
+import asyncio
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from probe_runtime import ProbeLimiter, run_probe
+from scan_cache import AsyncScanCache
+
+
+SMB_PORTS = (445, 139)
+
+CONNECT_TIMEOUT = 2.0
+RESPONSE_TIMEOUT = 3.0
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+# Comandos SMB2
+SMB2_NEGOTIATE = 0x0000
+SMB2_SESSION_SETUP = 0x0001
+
+# Códigos NTSTATUS relevantes
+STATUS_SUCCESS = 0x00000000
+STATUS_PENDING = 0x00000103
+STATUS_MORE_PROCESSING_REQUIRED = 0xC0000016
+
+SMB2_FLAGS_SERVER_TO_REDIR = 0x00000001
+SMB2_FLAGS_SIGNED = 0x00000008
+
+SMB2_HEADER = struct.Struct('<4sHHIHHIIQIIQ16s')
+
+# Dialetos 2.0.2 e 2.1: assinatura por HMAC-SHA256, sem contextos de negociação
+SMB2_DIALECTS = (0x0202, 0x0210)
+
+# Flags NTLMSSP usadas na mensagem NEGOTIATE
+NTLMSSP_NEGOTIATE_UNICODE = 0x00000001
+NTLMSSP_REQUEST_TARGET = 0x00000004
+NTLMSSP_NEGOTIATE_SIGN = 0x00000010
+NTLMSSP_NEGOTIATE_NTLM = 0x00000200
+NTLMSSP_NEGOTIATE_ALWAYS_SIGN = 0x00008000
+NTLMSSP_NEGOTIATE_EXTENDED_SESSIONSECURITY = 0x00080000
+NTLMSSP_NEGOTIATE_TARGET_INFO = 0x00800000
+NTLMSSP_NEGOTIATE_VERSION = 0x02000000
+NTLMSSP_NEGOTIATE_128 = 0x20000000
+NTLMSSP_NEGOTIATE_KEY_EXCH = 0x40000000
+NTLMSSP_NEGOTIATE_56 = 0x80000000
+
+NTLMSSP_NEGOTIATE_FLAGS = (
+    NTLMSSP_NEGOTIATE_UNICODE | NTLMSSP_REQUEST_TARGET | NTLMSSP_NEGOTIATE_NTLM
+    | NTLMSSP_NEGOTIATE_ALWAYS_SIGN | NTLMSSP_NEGOTIATE_EXTENDED_SESSIONSECURITY
+    | NTLMSSP_NEGOTIATE_TARGET_INFO | NTLMSSP_NEGOTIATE_VERSION
+    | NTLMSSP_NEGOTIATE_128 | NTLMSSP_NEGOTIATE_56
+)
+
+# AV_PAIR ids do TargetInfo do desafio NTLM
+_AV_PAIRS = {
+    1: 'netbios_name',
+    2: 'netbios_domain',
+    3: 'dns_hostname',
+    4: 'dns_domain',
+    5: 'dns_forest',
+}
+MSV_AV_TIMESTAMP = 7
+
+# OIDs SPNEGO e NTLMSSP já codificados em DER
+SPNEGO_OID = bytes.fromhex('06062b0601050502')
+NTLMSSP_OID = bytes.fromhex('060a2b06010401823702020a')
+
+_limiter = ProbeLimiter(global_limit=64, per_host_limit=1)
+_cache = AsyncScanCache("smb")
+
+
+class SMBError(Exception):
+    """Erro de protocolo ou de status em uma troca SMB2."""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+def der_encode(tag: int, content: bytes) -> bytes:
+    """Codifica um elemento DER com o tamanho na forma curta ou longa."""
+    length = len(content)
+    if length < 0x80:
+        return bytes([tag, length]) + content
+    size = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([tag, 0x80 | len(size)]) + size + content
+
+
+def spnego_init(mech_token: bytes) -> bytes:
+    """Envolve um token NTLMSSP em um NegTokenInit SPNEGO."""
+    mech_types = der_encode(0xA0, der_encode(0x30, NTLMSSP_OID))
+    token = der_encode(0xA2, der_encode(0x04, mech_token))
+    neg_token_init = der_encode(0xA0, der_encode(0x30, mech_types + token))
+    return der_encode(0x60, SPNEGO_OID + neg_token_init)
+
+
+def spnego_response(response_token: bytes) -> bytes:
+    """Envolve um token NTLMSSP em um NegTokenResp SPNEGO."""
+    return der_encode(0xA1, der_encode(0x30, der_encode(0xA2, der_encode(0x04, response_token))))
+
+
+def extract_ntlmssp(security_blob: bytes) -> bytes:
+    """Localiza a mensagem NTLMSSP dentro de um blob SPNEGO (ou bruto)."""
+    index = security_blob.find(b'NTLMSSP\x00')
+    if index < 0:
+        raise SMBError("resposta sem mensagem NTLMSSP")
+    return security_blob[index:]
+
+
+def build_ntlm_negotiate(flags: int = NTLMSSP_NEGOTIATE_FLAGS) -> bytes:
+    """Monta a mensagem NTLMSSP NEGOTIATE (tipo 1) sem domínio nem estação."""
+    version = struct.pack('<BBH3sB', 10, 0, 0, b'\x00' * 3, 15)
+    return b'NTLMSSP\x00' + struct.pack('<II', 1, flags) + b'\x00' * 16 + version
+
+
+def parse_ntlm_challenge(message: bytes) -> Dict[str, object]:
+    """
+    Interpreta a mensagem NTLMSSP CHALLENGE (tipo 2).
+
+    Args:
+        message (bytes): Mensagem começando em 'NTLMSSP\\0'
+
+    Returns:
+        dict: 'flags', 'server_challenge', 'target_info' (bytes brutos), os nomes
+              NetBIOS/DNS presentes, 'os_version'/'os_build' e 'timestamp' se houver
+    """
+    if len(message) < 48 or message[:8] != b'NTLMSSP\x00':
+        raise SMBError("desafio NTLM inválido")
+    message_type, = struct.unpack_from('<I', message, 8)
+    if message_type != 2:
+        raise SMBError(f"mensagem NTLM inesperada: tipo {message_type}")
+
+    flags, = struct.unpack_from('<I', message, 20)
+    info = {
+        'flags': flags,
+        'server_challenge': message[24:32],
+    }
+
+    target_len, _, target_offset = struct.unpack_from('<HHI', message, 12)
+    if target_len:
+        info['target_name'] = message[target_offset:target_offset + target_len].decode('utf-16-le', 'replace')
+
+    info_len, _, info_offset = struct.unpack_from('<HHI', message, 40)
+    target_info = message[info_offset:info_offset + info_len]
+    info['target_info'] = target_info
+
+    offset = 0
+    while offset + 4 <= len(target_info):
+        av_id, av_len = struct.unpack_from('<HH', target_info, offset)
+        value = target_info[offset + 4:offset + 4 + av_len]
+        offset += 4 + av_len
+        if av_id == 0:
+            break
+        if av_id in _AV_PAIRS:
+            info[_AV_PAIRS[av_id]] = value.decode('utf-16-le', 'replace')
+        elif av_id == MSV_AV_TIMESTAMP and len(value) == 8:
+            info['timestamp'] = struct.unpack('<Q', value)[0]
+
+    if flags & NTLMSSP_NEGOTIATE_VERSION and len(message) >= 56 and info_offset >= 56:
+        major, minor, build = struct.unpack_from('<BBH', message, 48)
+        info['os_version'] = f"{major}.{minor}.{build}"
+        info['os_build'] = build
+
+    return info
+
+
+def filetime_to_datetime(filetime: int) -> datetime:
+    """Converte um FILETIME do Windows (100 ns desde 1601) para datetime UTC."""
+    return datetime(1601, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=filetime // 10)
+
+
+def _netbios_session_request() -> bytes:
+    """Pedido de sessão NetBIOS (porta 139) para o nome genérico *SMBSERVER."""
+    def encode_name(name: str) -> bytes:
+        padded = name.ljust(15)[:15].encode('ascii') + b'\x20'
+        encoded = b''.join(bytes([0x41 + (b >> 4), 0x41 + (b & 0x0F)]) for b in padded)
+        return b'\x20' + encoded + b'\x00'
+
+    payload = encode_name('*SMBSERVER') + encode_name('PRINTERFINDER')
+    return struct.pack('>BBH', 0x81, 0, len(payload)) + payload
+
+
+class SMB2Connection:
+    """
+    Conexão SMB2 mínima sobre asyncio, com uma requisição por vez.
+
+    Mantém MessageId e SessionId. Quando a sessão exige assinatura, quem
+    autenticou define `signer` (função que recebe o pacote e retorna a assinatura).
+    """
+
+    def __init__(self, host: str, port: int = 445, timeout: float = RESPONSE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.message_id = 0
+        self.session_id = 0
+        self.dialect = None
+        self.security_mode = 0
+        self.server_guid = b''
+        self.max_transact = 65536
+        self.session_flags = 0
+        self.signer = None
+
+    async def connect(self, connect_timeout: float = CONNECT_TIMEOUT):
+        """Abre a conexão TCP (e a sessão NetBIOS, na porta 139)."""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), connect_timeout
+        )
+        if self.port == 139:
+            self.writer.write(_netbios_session_request())
+            await self.writer.drain()
+            header = await asyncio.wait_for(self.reader.readexactly(4), self.timeout)
+            length, = struct.unpack('>H', header[2:])
+            await asyncio.wait_for(self.reader.readexactly(length), self.timeout)
+            if header[0] != 0x82:
+                raise SMBError("sessão NetBIOS recusada")
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def build_header(self, command: int, tree_id: int = 0, credit_request: int = 32) -> bytes:
+        header = SMB2_HEADER.pack(b'\xfeSMB', 64, 1 if self.dialect and self.dialect >= 0x0210 else 0,
+                                  0, command, credit_request, 0, 0, self.message_id,
+                                  0, tree_id, self.session_id, b'\x00' * 16)
+        self.message_id += 1
+        return header
+
+    async def _read_message(self) -> bytes:
+        header = await asyncio.wait_for(self.reader.readexactly(4), self.timeout)
+        length = int.from_bytes(header[1:], 'big')
+        if length > MAX_MESSAGE_BYTES:
+            raise SMBError("mensagem SMB muito grande")
+        return await asyncio.wait_for(self.reader.readexactly(length), self.timeout)
+
+    async def request(self, command: int, body: bytes, tree_id: int = 0,
+                      sign: bool = False) -> Tuple[Dict[str, int], bytes]:
+        """
+        Envia uma requisição e aguarda a resposta final (ignorando STATUS_PENDING).
+
+        Returns:
+            tuple: (cabeçalho interpretado, mensagem completa da resposta)
+        """
+        packet = bytearray(self.build_header(command, tree_id) + body)
+        if sign and self.signer is not None:
+            struct.pack_into('<I', packet, 16, SMB2_FLAGS_SIGNED)
+            packet[48:64] = self.signer(bytes(packet))
+        self.writer.write(struct.pack('>I', len(packet)) + packet)
+        await self.writer.drain()
+
+        while True:
+            message = await self._read_message()
+            if message[:4] != b'\xfeSMB':
+                raise SMBError("resposta não é SMB2")
+            fields = SMB2_HEADER.unpack_from(message)
+            header = {'status': fields[3], 'command': fields[4], 'flags': fields[6],
+                      'message_id': fields[8], 'tree_id': fields[10], 'session_id': fields[11]}
+            if header['status'] != STATUS_PENDING:
+                return header, message
+
+    async def negotiate(self):
+        """Negocia o dialeto SMB2 (2.0.2 ou 2.1)."""
+        body = struct.pack('<HHHHI16sQ', 36, len(SMB2_DIALECTS), 1, 0, 0, os.urandom(16), 0)
+        body += b''.join(struct.pack('<H', d) for d in SMB2_DIALECTS)
+        header, message = await self.request(SMB2_NEGOTIATE, body)
+        if header['status'] != STATUS_SUCCESS:
+            raise SMBError("negociação SMB2 recusada", header['status'])
+        _, self.security_mode, self.dialect, _, self.server_guid, _, self.max_transact = struct.unpack_from(
+            '<HHHH16sII', message, 64
+        )
+
+    async def session_setup(self, security_blob: bytes) -> Tuple[Dict[str, int], bytes]:
+        """
+        Envia um SESSION_SETUP com o blob de segurança informado.
+
+        Returns:
+            tuple: (cabeçalho da resposta, blob de segurança retornado pelo servidor)
+        """
+        body = struct.pack('<HBBIIHHQ', 25, 0, 1, 0, 0, 64 + 24, len(security_blob), 0) + security_blob
+        header, message = await self.request(SMB2_SESSION_SETUP, body)
+        if header['status'] not in (STATUS_SUCCESS, STATUS_MORE_PROCESSING_REQUIRED):
+            raise SMBError("SESSION_SETUP recusado", header['status'])
+        self.session_id = header['session_id']
+        _, self.session_flags, blob_offset, blob_length = struct.unpack_from('<HHHH', message, 64)
+        return header, message[blob_offset:blob_offset + blob_length]
+
+
+def summarize_challenge(challenge: Dict[str, object], port: int) -> Dict[str, object]:
+    """Seleciona os campos do desafio NTLM úteis para o registro do dispositivo."""
+    info = {key: challenge[key] for key in
+            ('netbios_name', 'netbios_domain', 'dns_hostname', 'dns_domain', 'dns_forest',
+             'os_version', 'os_build') if key in challenge}
+    if 'timestamp' in challenge:
+        info['server_time'] = filetime_to_datetime(challenge['timestamp']).isoformat()
+    info['port'] = port
+    return info
+
+
+async def _query_smb_uncached(ip: str, port: int) -> Optional[Dict[str, object]]:
+    """NEGOTIATE + SESSION_SETUP anônimo: lê os nomes do desafio NTLM e encerra."""
+    async with _limiter.slot(ip):
+        connection = SMB2Connection(ip, port)
+        try:
+            await connection.connect()
+            await connection.negotiate()
+            _, blob = await connection.session_setup(spnego_init(build_ntlm_negotiate()))
+            challenge = parse_ntlm_challenge(extract_ntlmssp(blob))
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                struct.error, SMBError):
+            return None
+        finally:
+            connection.close()
+
+    return summarize_challenge(challenge, port)
+
+
+async def query_smb_info(ip: str, port: int = 445) -> Optional[Dict[str, object]]:
+    """
+    Obtém nome NetBIOS, hostname DNS, domínio e build do SO pelo desafio NTLM do SMB2.
+
+    Não autentica: a sessão é abandonada logo após o desafio. O resultado fica
+    em cache até o próximo scan.
+
+    Args:
+        ip (str): Endereço IP do host
+        port (int): 445 (SMB direto) ou 139 (NetBIOS)
+
+    Returns:
+        dict | None: Informações do host ou None se o SMB2 não respondeu
+    """
+    return await _cache.get_or_fetch((ip, port), lambda: _query_smb_uncached(ip, port))
+
+
+def domain_of(smb_info: Optional[Dict[str, object]]) -> str:
+    """
+    Domínio do host a partir do desafio NTLM.
+
+    Hosts fora de domínio informam o próprio nome NetBIOS como domínio; nesse
+    caso não há domínio a compartilhar com outros hosts e retorna ''.
+
+    Args:
+        smb_info (dict | None): Resultado de query_smb_info
+
+    Returns:
+        str: Domínio DNS (ou NetBIOS) do host, ou '' se não pertence a um domínio
+    """
+    if not smb_info:
+        return ''
+    netbios_domain = smb_info.get('netbios_domain', '')
+    if netbios_domain and netbios_domain.upper() == smb_info.get('netbios_name', '').upper():
+        return ''
+    return smb_info.get('dns_domain') or netbios_domain
+
+
+def get_smb_info(ip: str, tcp_ports: dict) -> Optional[Dict[str, object]]:
+    """
+    Versão síncrona para as threads de scan: consulta a primeira porta SMB aberta.
+
+    Args:
+        ip (str): Endereço IP do host
+        tcp_ports (dict): Portas TCP retornadas pelo Nmap
+
+    Returns:
+        dict | None: Informações do host (ver query_smb_info) ou None
+    """
+    for port in SMB_PORTS:
+        if tcp_ports.get(port, {}).get('state') == 'open':
+            return run_probe(query_smb_info(ip, port), timeout=CONNECT_TIMEOUT + RESPONSE_TIMEOUT * 2 + 5)
+    return None
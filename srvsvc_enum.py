@@ -0,0 +1,549 @@
+# srvsvc_enum.py
+import asyncio
+import hashlib
+import hmac
+import os
+import struct
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from probe_runtime import ProbeLimiter, ProbeLoop, run_probe
+from scan_cache import register_scan_cache
+from smb_probe import (SMB2Connection, SMBError, SMB_PORTS, STATUS_SUCCESS,
+                       build_ntlm_negotiate, extract_ntlmssp, parse_ntlm_challenge, spnego_init,
+                       spnego_response, NTLMSSP_NEGOTIATE_FLAGS, NTLMSSP_NEGOTIATE_SIGN)
+
+
+ENUM_TIMEOUT = 10.0
+
+# Comandos SMB2 usados após a autenticação
+SMB2_TREE_CONNECT = 0x0003
+SMB2_TREE_DISCONNECT = 0x0004
+SMB2_CREATE = 0x0005
+SMB2_CLOSE = 0x0006
+SMB2_READ = 0x0008
+SMB2_IOCTL = 0x000B
+
+STATUS_BUFFER_OVERFLOW = 0x80000005
+
+SMB2_NEGOTIATE_SIGNING_REQUIRED = 0x0002
+SMB2_SESSION_FLAG_IS_GUEST = 0x0001
+SMB2_SESSION_FLAG_IS_NULL = 0x0002
+
+FSCTL_PIPE_TRANSCEIVE = 0x0011C017
+SMB2_0_IOCTL_IS_FSCTL = 0x00000001
+PIPE_DESIRED_ACCESS = 0x0012019F
+MAX_PIPE_RESPONSE = 65536
+
+NTLMSSP_NEGOTIATE_ANONYMOUS = 0x00000800
+
+# NTSTATUS de SESSION_SETUP que indicam credencial rejeitada (e não host inacessível)
+LOGON_FAILURE_STATUSES = frozenset({
+    0xC000006D,  # STATUS_LOGON_FAILURE
+    0xC000006A,  # STATUS_WRONG_PASSWORD
+    0xC0000064,  # STATUS_NO_SUCH_USER
+    0xC000006E,  # STATUS_ACCOUNT_RESTRICTION
+    0xC0000071,  # STATUS_PASSWORD_EXPIRED
+    0xC0000072,  # STATUS_ACCOUNT_DISABLED
+    0xC0000224,  # STATUS_PASSWORD_MUST_CHANGE
+    0xC0000234,  # STATUS_ACCOUNT_LOCKED_OUT
+})
+
+# DCE/RPC: interface SRVSVC v3.0 sobre NDR 2.0
+SRVSVC_UUID = uuid.UUID('4b324fc8-1670-01d3-1278-5a47bf6ee188').bytes_le
+NDR_UUID = uuid.UUID('8a885d04-1ceb-11c9-9fe8-08002b104860').bytes_le
+RPC_REQUEST, RPC_RESPONSE, RPC_FAULT, RPC_BIND, RPC_BIND_ACK = 0, 2, 3, 11, 12
+RPC_FIRST_FRAG, RPC_LAST_FRAG = 0x01, 0x02
+RPC_MAX_FRAG = 4280
+OPNUM_NETR_SHARE_ENUM = 15
+
+# Tipos de compartilhamento (shi1_type); os bits altos marcam compartilhamentos especiais
+STYPE_MASK = 0x000000FF
+STYPE_PRINTQ = 0x00000001
+
+# Sessões autenticadas mantidas abertas por (host, usuário); as mais antigas são fechadas
+MAX_POOLED_SESSIONS = 64
+
+_limiter = ProbeLimiter(global_limit=64, per_host_limit=1)
+
+
+# ---------------------------------------------------------------------- #
+# NTLMv2
+# ---------------------------------------------------------------------- #
+def md4(data: bytes) -> bytes:
+    """MD4 (RFC 1320). O OpenSSL 3 não oferece mais o algoritmo pelo hashlib."""
+    def rotl(value, shift):
+        value &= 0xFFFFFFFF
+        return ((value << shift) | (value >> (32 - shift))) & 0xFFFFFFFF
+
+    message = data + b'\x80' + b'\x00' * ((55 - len(data)) % 64) + struct.pack('<Q', len(data) * 8)
+    a, b, c, d = 0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476
+    for chunk in range(0, len(message), 64):
+        x = struct.unpack('<16I', message[chunk:chunk + 64])
+        aa, bb, cc, dd = a, b, c, d
+        for i in (0, 4, 8, 12):
+            a = rotl(a + ((b & c) | (~b & d)) + x[i], 3)
+            d = rotl(d + ((a & b) | (~a & c)) + x[i + 1], 7)
+            c = rotl(c + ((d & a) | (~d & b)) + x[i + 2], 11)
+            b = rotl(b + ((c & d) | (~c & a)) + x[i + 3], 19)
+        for i in (0, 1, 2, 3):
+            a = rotl(a + ((b & c) | (b & d) | (c & d)) + x[i] + 0x5A827999, 3)
+            d = rotl(d + ((a & b) | (a & c) | (b & c)) + x[i + 4] + 0x5A827999, 5)
+            c = rotl(c + ((d & a) | (d & b) | (a & b)) + x[i + 8] + 0x5A827999, 9)
+            b = rotl(b + ((c & d) | (c & a) | (d & a)) + x[i + 12] + 0x5A827999, 13)
+        for i in (0, 2, 1, 3):
+            a = rotl(a + (b ^ c ^ d) + x[i] + 0x6ED9EBA1, 3)
+            d = rotl(d + (a ^ b ^ c) + x[i + 8] + 0x6ED9EBA1, 9)
+            c = rotl(c + (d ^ a ^ b) + x[i + 4] + 0x6ED9EBA1, 11)
+            b = rotl(b + (c ^ d ^ a) + x[i + 12] + 0x6ED9EBA1, 15)
+        a, b, c, d = [(v + w) & 0xFFFFFFFF for v, w in ((a, aa), (b, bb), (c, cc), (d, dd))]
+    return struct.pack('<4I', a, b, c, d)
+
+
+def split_username(username: str, domain: str = '') -> Tuple[str, str]:
+    """Separa 'DOMINIO\\usuario' ou 'usuario@dominio' em (usuario, dominio)."""
+    if '\\' in username:
+        domain, username = username.split('\\', 1)
+    elif '@' in username and not domain:
+        username, domain = username.split('@', 1)
+    return username, domain
+
+
+def _filetime_now() -> int:
+    return int((time.time() + 11644473600) * 10_000_000)
+
+
+def ntlmv2_response(password: str, username: str, domain: str, server_challenge: bytes,
+                    target_info: bytes, timestamp: int = None,
+                    client_challenge: bytes = None) -> Tuple[bytes, bytes]:
+    """
+    Calcula a resposta NTLMv2 ao desafio do servidor.
+
+    Returns:
+        tuple: (NtChallengeResponse, SessionBaseKey)
+    """
+    nt_hash = md4(password.encode('utf-16-le'))
+    ntowf_v2 = hmac.new(nt_hash, (username.upper() + domain).encode('utf-16-le'), hashlib.md5).digest()
+    blob = (b'\x01\x01' + b'\x00' * 6 + struct.pack('<Q', _filetime_now() if timestamp is None else timestamp)
+            + (client_challenge or os.urandom(8)) + b'\x00' * 4 + target_info + b'\x00' * 4)
+    nt_proof = hmac.new(ntowf_v2, server_challenge + blob, hashlib.md5).digest()
+    session_base_key = hmac.new(ntowf_v2, nt_proof, hashlib.md5).digest()
+    return nt_proof + blob, session_base_key
+
+
+def build_ntlm_authenticate(challenge: Dict[str, object], username: str, password: str,
+                            domain: str = '', workstation: str = 'PRINTERFINDER') -> Tuple[bytes, bytes]:
+    """
+    Monta a mensagem NTLMSSP AUTHENTICATE (tipo 3). Sem usuário, autentica como anônimo.
+
+    Returns:
+        tuple: (mensagem, chave de sessão) — a chave é vazia na sessão anônima
+    """
+    flags = NTLMSSP_NEGOTIATE_FLAGS | NTLMSSP_NEGOTIATE_SIGN
+    if username:
+        nt_response, session_key = ntlmv2_response(
+            password, username, domain, challenge['server_challenge'], challenge['target_info'],
+            challenge.get('timestamp')
+        )
+        # Com MsvAvTimestamp no desafio a resposta LMv2 deve ser zerada
+        lm_response = b'\x00' * 24
+    else:
+        flags |= NTLMSSP_NEGOTIATE_ANONYMOUS
+        nt_response, session_key, lm_response = b'', b'', b'\x00'
+
+    fields = [lm_response, nt_response, domain.encode('utf-16-le'), username.encode('utf-16-le'),
+              workstation.encode('utf-16-le'), b'']
+    offset = 72
+    header = b'NTLMSSP\x00' + struct.pack('<I', 3)
+    for value in fields:
+        header += struct.pack('<HHI', len(value), len(value), offset)
+        offset += len(value)
+    header += struct.pack('<I', flags) + struct.pack('<BBH3sB', 10, 0, 0, b'\x00' * 3, 15)
+    return header + b''.join(fields), session_key
+
+
+async def authenticate(connection: SMB2Connection, username: str = '', password: str = '',
+                       domain: str = '') -> bytes:
+    """
+    Negocia o dialeto e autentica a sessão SMB2 com NTLMv2 (ou anonimamente).
+
+    Returns:
+        bytes: Chave de sessão (vazia na sessão anônima)
+
+    Raises:
+        SMBError: Se o servidor recusar a autenticação (status em .status)
+    """
+    await connection.negotiate()
+    _, blob = await connection.session_setup(
+        spnego_init(build_ntlm_negotiate(NTLMSSP_NEGOTIATE_FLAGS | NTLMSSP_NEGOTIATE_SIGN))
+    )
+    challenge = parse_ntlm_challenge(extract_ntlmssp(blob))
+    authenticate_message, session_key = build_ntlm_authenticate(challenge, username, password, domain)
+    header, _ = await connection.session_setup(spnego_response(authenticate_message))
+    if header['status'] != STATUS_SUCCESS:
+        raise SMBError("autenticação NTLM recusada", header['status'])
+    return session_key
+
+
+# ---------------------------------------------------------------------- #
+# NDR / DCE-RPC
+# ---------------------------------------------------------------------- #
+class NDRReader:
+    """Leitura sequencial de tipos NDR 2.0 (little-endian) com alinhamento."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def u32(self) -> int:
+        self.offset = (self.offset + 3) & ~3
+        value, = struct.unpack_from('<I', self.data, self.offset)
+        self.offset += 4
+        return value
+
+    def wstring(self) -> str:
+        """Lê uma string conformant-varying de wchar_t."""
+        self.u32()  # max_count
+        self.u32()  # offset
+        count = self.u32()
+        value = self.data[self.offset:self.offset + count * 2]
+        if len(value) < count * 2:
+            raise SMBError("string NDR truncada")
+        self.offset += count * 2
+        return value.decode('utf-16-le', 'replace').rstrip('\x00')
+
+
+def _ndr_wstring(value: str) -> bytes:
+    encoded = (value + '\x00').encode('utf-16-le')
+    count = len(value) + 1
+    data = struct.pack('<III', count, 0, count) + encoded
+    return data + b'\x00' * (-len(data) % 4)
+
+
+def build_share_enum_request(server_name: str) -> bytes:
+    """Stub NDR de NetrShareEnum (nível 1, sem limite de tamanho)."""
+    return (struct.pack('<I', 0x00020000) + _ndr_wstring(server_name)
+            + struct.pack('<IIIII', 1, 1, 0x00020004, 0, 0)      # InfoStruct: nível 1, contêiner vazio
+            + struct.pack('<III', 0xFFFFFFFF, 0x00020008, 0))    # PreferedMaximumLength, ResumeHandle
+
+
+def parse_share_enum_response(stub: bytes) -> List[Tuple[str, int, str]]:
+    """
+    Interpreta a resposta de NetrShareEnum nível 1.
+
+    Returns:
+        list: (nome, tipo, comentário) de cada compartilhamento
+    """
+    reader = NDRReader(stub)
+    reader.u32()  # Level
+    reader.u32()  # discriminante da união
+    shares = []
+    if reader.u32():  # ponteiro do contêiner
+        reader.u32()  # EntriesRead
+        if reader.u32():  # ponteiro do vetor
+            count = reader.u32()
+            entries = [(reader.u32(), reader.u32(), reader.u32()) for _ in range(count)]
+            for name_ptr, share_type, remark_ptr in entries:
+                name = reader.wstring() if name_ptr else ''
+                remark = reader.wstring() if remark_ptr else ''
+                shares.append((name, share_type, remark))
+    reader.u32()  # TotalEntries
+    if reader.u32():
+        reader.u32()  # ResumeHandle
+    status = reader.u32()
+    if status != 0:
+        raise SMBError(f"NetrShareEnum retornou erro {status:#x}", status)
+    return shares
+
+
+def _rpc_header(ptype: int, call_id: int, body_length: int) -> bytes:
+    return struct.pack('<BBBB4sHHI', 5, 0, ptype, RPC_FIRST_FRAG | RPC_LAST_FRAG,
+                       b'\x10\x00\x00\x00', 16 + body_length, 0, call_id)
+
+
+def build_bind(call_id: int) -> bytes:
+    body = struct.pack('<HHIB3s', RPC_MAX_FRAG, RPC_MAX_FRAG, 0, 1, b'\x00' * 3)
+    body += struct.pack('<HBB', 0, 1, 0) + SRVSVC_UUID + struct.pack('<HH', 3, 0) + NDR_UUID + struct.pack('<I', 2)
+    return _rpc_header(RPC_BIND, call_id, len(body)) + body
+
+
+def build_rpc_request(call_id: int, opnum: int, stub: bytes) -> bytes:
+    body = struct.pack('<IHH', len(stub), 0, opnum) + stub
+    return _rpc_header(RPC_REQUEST, call_id, len(body)) + body
+
+
+# ---------------------------------------------------------------------- #
+# Sessão SMB2 + pipe \srvsvc
+# ---------------------------------------------------------------------- #
+class SRVSVCSession:
+    """Sessão autenticada com o pipe \\srvsvc aberto e vinculado, pronta para NetrShareEnum."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.connection = SMB2Connection(host, port, timeout=ENUM_TIMEOUT)
+        self.tree_id = 0
+        self.file_id = b''
+        self.call_id = 0
+        self.sign = False
+        self.lock = asyncio.Lock()
+
+    async def open(self, username: str = '', password: str = '', domain: str = ''):
+        connection = self.connection
+        await connection.connect()
+        session_key = await authenticate(connection, username, password, domain)
+
+        # Dialetos 2.0.2/2.1: assinatura HMAC-SHA256 com a chave de sessão NTLM
+        anonymous = connection.session_flags & (SMB2_SESSION_FLAG_IS_GUEST | SMB2_SESSION_FLAG_IS_NULL)
+        if session_key and not anonymous and connection.security_mode & SMB2_NEGOTIATE_SIGNING_REQUIRED:
+            connection.signer = lambda packet: hmac.new(session_key, packet, hashlib.sha256).digest()[:16]
+            self.sign = True
+
+        path = f"\\\\{self.host}\\IPC$".encode('utf-16-le')
+        header, _ = await connection.request(
+            SMB2_TREE_CONNECT, struct.pack('<HHHH', 9, 0, 64 + 8, len(path)) + path, sign=self.sign
+        )
+        if header['status'] != STATUS_SUCCESS:
+            raise SMBError("TREE_CONNECT em IPC$ recusado", header['status'])
+        self.tree_id = header['tree_id']
+
+        name = 'srvsvc'.encode('utf-16-le')
+        body = struct.pack('<HBBIQQIIIIIHHII', 57, 0, 0, 2, 0, 0, PIPE_DESIRED_ACCESS, 0, 3, 1, 0x40,
+                           64 + 56, len(name), 0, 0) + name
+        header, message = await connection.request(SMB2_CREATE, body, self.tree_id, sign=self.sign)
+        if header['status'] != STATUS_SUCCESS:
+            raise SMBError("pipe \\srvsvc indisponível", header['status'])
+        self.file_id = message[64 + 64:64 + 80]
+
+        response = await self._transceive(build_bind(self._next_call_id()))
+        if response[2] != RPC_BIND_ACK:
+            raise SMBError("bind SRVSVC recusado")
+        port_length, = struct.unpack_from('<H', response, 24)
+        results_offset = 26 + port_length
+        results_offset += -results_offset % 4
+        result, = struct.unpack_from('<H', response, results_offset + 4)
+        if result != 0:
+            raise SMBError(f"bind SRVSVC rejeitado (resultado {result})")
+
+    def _next_call_id(self) -> int:
+        self.call_id += 1
+        return self.call_id
+
+    async def _read_pipe(self) -> bytes:
+        body = struct.pack('<HBBIQ16sIIIHH', 49, 0x50, 0, MAX_PIPE_RESPONSE, 0, self.file_id,
+                           0, 0, 0, 0, 0) + b'\x00'
+        header, message = await self.connection.request(SMB2_READ, body, self.tree_id, sign=self.sign)
+        if header['status'] not in (STATUS_SUCCESS, STATUS_BUFFER_OVERFLOW):
+            raise SMBError("leitura do pipe falhou", header['status'])
+        data_offset, _, data_length = struct.unpack_from('<BBI', message, 66)
+        return message[data_offset:data_offset + data_length]
+
+    async def _transceive(self, pdu: bytes) -> bytes:
+        """Escreve um PDU no pipe e lê a resposta completa (todos os fragmentos)."""
+        max_output = min(MAX_PIPE_RESPONSE, self.connection.max_transact)
+        body = struct.pack('<HHI16sIIIIIIII', 57, 0, FSCTL_PIPE_TRANSCEIVE, self.file_id,
+                           64 + 56, len(pdu), 0, 64 + 56, 0, max_output, SMB2_0_IOCTL_IS_FSCTL, 0) + pdu
+        header, message = await self.connection.request(SMB2_IOCTL, body, self.tree_id, sign=self.sign)
+        if header['status'] not in (STATUS_SUCCESS, STATUS_BUFFER_OVERFLOW):
+            raise SMBError("FSCTL_PIPE_TRANSCEIVE falhou", header['status'])
+        output_offset, output_count = struct.unpack_from('<II', message, 64 + 32)
+        buffer = message[output_offset:output_offset + output_count]
+
+        # Junta os fragmentos DCE/RPC; o que não veio no IOCTL é lido do pipe
+        first_pdu, stub = None, b''
+        while True:
+            while len(buffer) < 16 or len(buffer) < struct.unpack_from('<H', buffer, 8)[0]:
+                buffer += await self._read_pipe()
+            frag_length, = struct.unpack_from('<H', buffer, 8)
+            fragment, buffer = buffer[:frag_length], buffer[frag_length:]
+            if fragment[2] != RPC_RESPONSE:
+                if fragment[2] == RPC_FAULT:
+                    raise SMBError(f"falha DCE/RPC {struct.unpack_from('<I', fragment, 24)[0]:#x}")
+                return fragment
+            if first_pdu is None:
+                first_pdu = fragment[:24]
+            stub += fragment[24:]
+            if fragment[3] & RPC_LAST_FRAG:
+                return first_pdu + stub
+
+    async def enum_shares(self) -> List[Tuple[str, int, str]]:
+        """Executa NetrShareEnum (nível 1) e retorna (nome, tipo, comentário)."""
+        stub = build_share_enum_request(f"\\\\{self.host}")
+        response = await self._transceive(build_rpc_request(self._next_call_id(), OPNUM_NETR_SHARE_ENUM, stub))
+        return parse_share_enum_response(response[24:])
+
+    def close(self):
+        self.connection.close()
+
+
+class SRVSVCPool:
+    """
+    Sessões SRVSVC abertas por (host, credencial), reutilizadas entre consultas.
+
+    Vive no loop compartilhado (ProbeLoop); as sessões são fechadas ao iniciar
+    um novo scan e, acima de MAX_POOLED_SESSIONS, as menos usadas são descartadas.
+    """
+
+    def __init__(self, max_sessions: int = MAX_POOLED_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[tuple, SRVSVCSession]" = OrderedDict()
+        self.opened = 0
+        self.reused = 0
+        register_scan_cache(self)
+
+    async def _open(self, ip: str, username: str, password: str, domain: str) -> SRVSVCSession:
+        last_error = None
+        for port in SMB_PORTS:
+            session = SRVSVCSession(ip, port)
+            try:
+                await session.open(username, password, domain)
+                return session
+            except (OSError, asyncio.TimeoutError) as e:
+                # Porta fechada: tenta a próxima
+                last_error = e
+                session.close()
+            except BaseException:
+                session.close()
+                raise
+        raise last_error
+
+    async def enum_shares(self, ip: str, username: str = '', password: str = '',
+                          domain: str = '') -> List[Tuple[str, int, str]]:
+        # A senha entra na chave só como impressão digital, para não reaproveitar
+        # a sessão de uma credencial diferente
+        fingerprint = hashlib.sha256(password.encode('utf-8')).hexdigest()[:16]
+        key = (ip, username.lower(), domain.lower(), fingerprint)
+        session = self._sessions.get(key)
+        if session is not None:
+            self._sessions.move_to_end(key)
+            try:
+                async with session.lock:
+                    shares = await session.enum_shares()
+                self.reused += 1
+                return shares
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, SMBError):
+                # Sessão expirada ou derrubada pelo servidor: reabre
+                self._discard(key)
+
+        session = await self._open(ip, username, password, domain)
+        self.opened += 1
+        try:
+            async with session.lock:
+                shares = await session.enum_shares()
+        except BaseException:
+            session.close()
+            raise
+
+        self._discard(key)
+        self._sessions[key] = session
+        while len(self._sessions) > self.max_sessions:
+            self._discard(next(iter(self._sessions)))
+        return shares
+
+    def _discard(self, key: tuple):
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            session.close()
+
+    def clear(self):
+        """Fecha as sessões do scan anterior (executado no loop compartilhado)."""
+        loop = ProbeLoop.get_loop()
+
+        def close_all():
+            for key in list(self._sessions):
+                self._discard(key)
+            self.opened = self.reused = 0
+
+        loop.call_soon_threadsafe(close_all)
+
+    def stats(self) -> Dict[str, int]:
+        return {'opened': self.opened, 'reused': self.reused, 'pooled': len(self._sessions)}
+
+
+_pool = SRVSVCPool()
+
+
+def shares_to_printers(shares: List[Tuple[str, int, str]], ip: str) -> List[Dict[str, str]]:
+    """Filtra as filas de impressão (STYPE_PRINTQ) no formato de WindowsPrinterManager."""
+    printers = []
+    for name, share_type, remark in shares:
+        if share_type & STYPE_MASK != STYPE_PRINTQ:
+            continue
+        printers.append({
+            'Name': name,
+            'ShareName': name,
+            'Status': 'Compartilhada',
+            'DriverName': remark or 'Impressora',
+            'Location': f'Rede - {ip}',
+            'Comment': remark or 'Detectada via SRVSVC',
+            'IsDefault': 'FALSE'
+        })
+    return printers
+
+
+async def enum_print_shares(ip: str, username: str = '', password: str = '',
+                            domain: str = '') -> Optional[List[Dict[str, str]]]:
+    """
+    Lista as impressoras compartilhadas de um host via SMB2 + DCE/RPC NetrShareEnum.
+
+    Args:
+        ip (str): Endereço IP do host
+        username (str): Usuário ('DOMINIO\\usuario' ou 'usuario@dominio'); vazio = sessão anônima
+        password (str): Senha
+        domain (str): Domínio, se não vier no usuário
+
+    Returns:
+        list | None: Impressoras compartilhadas, ou None se o host não respondeu
+    """
+    username, domain = split_username(username or '', domain or '')
+    async with _limiter.slot(ip):
+        try:
+            shares = await _pool.enum_shares(ip, username, password or '', domain)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                struct.error, IndexError, SMBError):
+            return None
+    return shares_to_printers(shares, ip)
+
+
+def get_print_shares(ip: str, username: str = '', password: str = '',
+                     domain: str = '') -> Optional[List[Dict[str, str]]]:
+    """Versão síncrona de enum_print_shares para as threads de scan."""
+    return run_probe(enum_print_shares(ip, username, password, domain), timeout=ENUM_TIMEOUT * 3)
+
+
+async def verify_credentials(ip: str, username: str, password: str,
+                             domain: str = '') -> Optional[bool]:
+    """
+    Verifica uma credencial só com NEGOTIATE + SESSION_SETUP, sem enumerar nada.
+
+    Returns:
+        bool | None: True se autenticou (sem cair em convidado), False se a
+                     credencial foi rejeitada, None se o host não respondeu
+    """
+    username, domain = split_username(username or '', domain or '')
+    async with _limiter.slot(ip):
+        for port in SMB_PORTS:
+            connection = SMB2Connection(ip, port, timeout=ENUM_TIMEOUT)
+            try:
+                await connection.connect()
+                await authenticate(connection, username, password or '', domain)
+                return not connection.session_flags & (SMB2_SESSION_FLAG_IS_GUEST | SMB2_SESSION_FLAG_IS_NULL)
+            except SMBError as e:
+                return False if e.status in LOGON_FAILURE_STATUSES else None
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, struct.error):
+                continue
+            finally:
+                connection.close()
+    return None
+
+
+def check_credentials(ip: str, username: str, password: str, domain: str = '') -> Optional[bool]:
+    """Versão síncrona de verify_credentials para as threads de scan e da interface."""
+    return run_probe(verify_credentials(ip, username, password, domain), timeout=ENUM_TIMEOUT * 2)
+
+
+def get_pool_stats() -> Dict[str, int]:
+    """Sessões abertas e reutilizadas pelo pool desde o início do scan."""
+    return _pool.stats()
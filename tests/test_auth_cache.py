@@ -0,0 +1,85 @@
+# tests/test_auth_cache.py
+import json
+
+import pytest
+
+import auth_cache
+import printer_utils
+from auth_cache import AuthResultCache
+from credential_context import CredentialContext, ANONYMOUS
+from printer_utils import WindowsPrinterManager, get_windows_shared_printers
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = AuthResultCache(str(tmp_path / "auth_cache.json"))
+    monkeypatch.setattr(auth_cache, '_auth_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def enumerations(monkeypatch):
+    """Substitui a enumeração real; registra (ip, credenciais) de cada chamada."""
+    calls = []
+
+    def enumerate_shared_printers(ip, domain='', credentials=ANONYMOUS):
+        calls.append((ip, credentials))
+        return []
+
+    monkeypatch.setattr(WindowsPrinterManager, '_enumerate_shared_printers', staticmethod(enumerate_shared_printers))
+    return calls
+
+
+def test_domain_success_covers_other_hosts(cache):
+    cache.record('10.0.0.1', 'abc', True, 'CORP.local')
+    assert cache.lookup('10.0.0.2', 'abc', 'corp.local') is True
+    assert cache.lookup('10.0.0.2', 'abc') is None
+    assert cache.lookup('10.0.0.2', 'other', 'corp.local') is None
+
+
+def test_domain_failure_replaces_success(cache):
+    cache.record('10.0.0.1', 'abc', True, 'corp.local')
+    cache.record('10.0.0.3', 'abc', False, 'corp.local')
+    assert cache.lookup('10.0.0.2', 'abc', 'corp.local') is False
+    # O resultado do próprio host vale mais que o do domínio
+    assert cache.lookup('10.0.0.1', 'abc', 'corp.local') is True
+
+
+def test_save_and_load_legacy_domain_format(tmp_path):
+    path = tmp_path / "auth_cache.json"
+    path.write_text(json.dumps({'hosts': {}, 'domains': {'corp.local|abc': 4102444800.0}}))
+    assert AuthResultCache(str(path)).lookup('10.0.0.9', 'abc', 'corp.local') is True
+
+    cache = AuthResultCache(str(path))
+    cache.record('10.0.0.1', 'def', False, 'corp.local')
+    cache.save()
+    assert AuthResultCache(str(path)).lookup('10.0.0.2', 'def', 'corp.local') is False
+
+
+def test_rejected_credential_is_skipped_on_next_host_in_domain(cache, enumerations, monkeypatch):
+    checked = []
+
+    def check_credentials(ip, username, password, domain=''):
+        checked.append(ip)
+        return False
+
+    monkeypatch.setattr(printer_utils, 'check_credentials', check_credentials)
+    credentials = CredentialContext.from_input('CORP\\alice', 'errada')
+
+    get_windows_shared_printers('10.77.0.1', 'corp.local', credentials)
+    get_windows_shared_printers('10.77.0.2', 'corp.local', credentials)
+
+    # Só o primeiro host testa a credencial; os dois enumeram sem ela
+    assert checked == ['10.77.0.1']
+    assert [context for _, context in enumerations] == [ANONYMOUS, ANONYMOUS]
+    assert cache.lookup('10.77.0.2', credentials.fingerprint, 'corp.local') is False
+
+
+def test_inconclusive_check_keeps_credentials_and_records_nothing(cache, enumerations, monkeypatch):
+    monkeypatch.setattr(printer_utils, 'check_credentials', lambda ip, username, password, domain='': None)
+    credentials = CredentialContext.from_input('alice', 'senha')
+
+    get_windows_shared_printers('10.77.1.1', '', credentials)
+
+    assert enumerations == [('10.77.1.1', credentials)]
+    assert cache.lookup('10.77.1.1', credentials.fingerprint) is None
@@ -0,0 +1,71 @@
+# tests/test_blob_store.py
+import os
+
+import pytest
+
+from blob_store import MAGIC, BlobStore
+
+
+def test_values_survive_reopen(tmp_path):
+    path = str(tmp_path / "details.blob")
+    store = BlobStore(path)
+    store.put('10.0.0.5', {'nmap': '<xml/>', 'ports': [80, 9100]})
+    store.put('10.0.0.5', {'nmap': '<xml v2/>'})
+    store.close()
+
+    store = BlobStore(path)
+    assert store.get('10.0.0.5') == {'nmap': '<xml v2/>'}
+    assert len(store) == 1
+    store.close()
+
+
+@pytest.mark.parametrize('cut', [1, 5, 20])
+def test_truncated_tail_record_is_dropped(tmp_path, cut):
+    path = str(tmp_path / "details.blob")
+    store = BlobStore(path)
+    store.put('10.0.0.1', {'host': 'a'})
+    store.flush()
+    intact_size = os.path.getsize(path)
+    store.put('10.0.0.2', {'host': 'b' * 100})
+    store.close()
+
+    # Queda no meio da gravação do segundo registro
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - cut)
+
+    store = BlobStore(path)
+    assert store.get('10.0.0.1') == {'host': 'a'}
+    assert store.get('10.0.0.2') is None
+    assert os.path.getsize(path) == intact_size
+
+    # O arquivo continua utilizável depois da recuperação
+    store.put('10.0.0.3', {'host': 'c'})
+    store.close()
+    store = BlobStore(path)
+    assert sorted(store.keys()) == ['10.0.0.1', '10.0.0.3']
+    store.close()
+
+
+def test_corrupted_tail_record_is_dropped(tmp_path):
+    path = str(tmp_path / "details.blob")
+    store = BlobStore(path)
+    store.put('10.0.0.1', {'host': 'a'})
+    store.put('10.0.0.2', {'host': 'b'})
+    store.close()
+
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+    store = BlobStore(path)
+    assert list(store.keys()) == ['10.0.0.1']
+    store.close()
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "other.blob"
+    path.write_bytes(b'not a blob store' + MAGIC)
+    with pytest.raises(ValueError):
+        BlobStore(str(path))
@@ -0,0 +1,47 @@
+# tests/test_enum_worker.py
+import base64
+import json
+import os
+import subprocess
+import sys
+
+from enum_worker import WORKER_SCRIPT, EnumWorkerPool, parse_printer_csv, powershell_command
+
+
+CSV_OUTPUT = ('"Name","ShareName","DriverName","Location","Comment"\n'
+              '"HP Recepcao","recepcao","HP Universal","Térreo",""\n'
+              '"Local","","Microsoft PDF","",""\n')
+
+
+def test_parse_printer_csv_keeps_shared_printers():
+    printers = parse_printer_csv(CSV_OUTPUT)
+    assert [printer['ShareName'] for printer in printers] == ['recepcao']
+    assert printers[0]['Status'] == 'Compartilhada'
+
+
+def test_powershell_command_is_encoded_utf16():
+    command = powershell_command("Write-Output 'ok'\nWrite-Output 'fim'")
+    assert command[-2] == '-EncodedCommand'
+    assert base64.b64decode(command[-1]).decode('utf-16-le') == "Write-Output 'ok'\nWrite-Output 'fim'"
+
+
+def test_worker_does_not_import_printer_utils():
+    # Uma consulta inteira no processo do worker, com a sessão do PowerShell simulada
+    code = ("import sys, enum_worker\n"
+            "enum_worker.PowerShellSession.run = lambda self, script: ''\n"
+            "enum_worker.PowerShellEnumerator().enumerate(['10.0.0.5'])\n"
+            "print('printer_utils' in sys.modules)\n")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, input='', timeout=30,
+                            cwd=os.path.dirname(WORKER_SCRIPT))
+    assert result.stdout.strip() == 'False'
+
+
+def test_stub_pool_round_trip(tmp_path):
+    stub = tmp_path / "stub.json"
+    stub.write_text(json.dumps({'10.0.0.5': [{'Name': 'recepcao', 'ShareName': 'recepcao'}]}))
+    pool = EnumWorkerPool(size=1, command=[sys.executable, WORKER_SCRIPT, '--stub', str(stub)])
+    try:
+        assert pool.enumerate('10.0.0.5', timeout=10) == [{'Name': 'recepcao', 'ShareName': 'recepcao'}]
+        assert pool.enumerate('10.0.0.6', timeout=10) is None
+    finally:
+        pool.close()
@@ -0,0 +1,45 @@
+# tests/test_export_sinks.py
+import sqlite3
+
+from device_record import DeviceRecord
+from export_sinks import SqliteSink
+
+
+def printer_record(ip: str, *shares: str) -> DeviceRecord:
+    record = DeviceRecord(ip, hostname=f"host-{ip}")
+    record.shared_printers = [{'Name': share, 'ShareName': share} for share in shares]
+    return record
+
+
+def test_repeated_ip_in_batch_keeps_last_record(tmp_path):
+    path = str(tmp_path / "scan.db")
+    sink = SqliteSink(path)
+    sink.write(printer_record('10.0.0.5', 'antiga'))
+    sink.write(printer_record('10.0.0.5', 'recepcao', 'financeiro'))
+    sink.close()
+
+    db = sqlite3.connect(path)
+    shares = sorted(row[0] for row in db.execute("SELECT share_name FROM shared_printers WHERE ip = '10.0.0.5'"))
+    assert shares == ['financeiro', 'recepcao']
+    assert db.execute("SELECT COUNT(*) FROM devices").fetchone()[0] == 1
+
+
+def test_failed_batch_stays_in_buffer(tmp_path, monkeypatch):
+    sink = SqliteSink(str(tmp_path / "scan.db"))
+    calls = []
+
+    def fail_once(records):
+        calls.append(list(records))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(sink, '_write_batch', fail_once)
+    sink.write(DeviceRecord('10.0.0.1'))
+    sink.flush()
+    assert sink.written == 0
+
+    sink.write(DeviceRecord('10.0.0.2'))
+    sink.flush()
+    assert [record.ip for record in calls[-1]] == ['10.0.0.1', '10.0.0.2']
+    assert sink.written == 2
+    sink.close()
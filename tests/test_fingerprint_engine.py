@@ -0,0 +1,84 @@
+# tests/test_fingerprint_engine.py
+import pytest
+
+from fingerprint_engine import FingerprintEngine
+
+
+@pytest.fixture
+def engine():
+    return FingerprintEngine()
+
+
+def host(**ports):
+    return {'tcp': {int(port[1:]): info for port, info in ports.items()}}
+
+
+def test_signature_lowercases_rule_texts_once(engine):
+    ports, _, _, _ = engine.signature(host(p80={'state': 'open', 'name': 'HTTP', 'product': 'HP LaserJet',
+                                                'version': '2.0'}))
+    assert ports == ((80, 'open', 'http', 'hp laserjet', 'HP LaserJet', '2.0'),)
+
+
+def test_product_match_keeps_original_case_in_label(engine):
+    result = engine.classify(host(p80={'state': 'open', 'name': 'http', 'product': 'HP LaserJet',
+                                       'version': '2.0'}))
+    assert result.device_type == 'network_printer'
+    assert result.label == 'HP LaserJet 2.0'
+
+
+def test_vendor_ignores_product_case(engine):
+    assert engine.vendor_from_products(host(p80={'product': 'Canon HTTPD'}))[0] == 'Canon'
+    assert engine.vendor_from_products(host(p80={'product': 'CANON httpd'}))[0] == 'Canon'
+    assert engine.stats()['hits'] == 1
+
+
+def test_printer_ports_combine_confidence(engine):
+    result = engine.classify(host(p9100={'state': 'open'}, p631={'state': 'open'}))
+    assert result.device_type == 'network_printer'
+    assert result.rule_id == 'printer.port.raw'
+    assert result.confidence == pytest.approx(1 - 0.1 * 0.15)
+    assert result.label == 'Impressora de Rede'
+
+
+def test_closed_printer_port_is_ignored(engine):
+    result = engine.classify(host(p9100={'state': 'closed'}))
+    assert (result.device_type, result.rule_id) == ('device', 'device.default')
+
+
+def test_service_and_snmp_rules(engine):
+    assert engine.classify(host(p9999={'state': 'open', 'name': 'jetdirect'})).rule_id == 'printer.service.jetdirect'
+    assert engine.classify(host(), snmp_oid='1.3.6.1.2.1.43.5.1').rule_id == 'printer.snmp.printer-mib'
+    assert engine.classify(host(), snmp_oid='1.3.6.1.2.1.430').device_type == 'device'
+
+
+def test_embedded_web_server_marks_printer(engine):
+    result = engine.classify(host(p80={'state': 'open', 'name': 'http'}), {'is_printer': True, 'model': 'MFC-L2750DW'})
+    assert (result.rule_id, result.label) == ('printer.web.embedded', 'MFC-L2750DW')
+
+
+def test_service_label_includes_os(engine):
+    data = host(p22={'state': 'open', 'name': 'ssh'})
+    data['osmatch'] = [{'name': 'Linux 5.4'}]
+    result = engine.classify(data)
+    assert (result.label, result.os_type) == ('Servidor SSH (Linux)', 'Linux')
+
+
+def test_os_rule_order_follows_the_file(engine):
+    data = host()
+    data['osmatch'] = [{'name': 'HP printer embedded Linux'}]
+    result = engine.classify(data)
+    assert (result.label, result.rule_id) == ('Dispositivo Linux', 'device.os')
+
+
+def test_vendor_by_oui_and_snmp(engine):
+    assert engine.vendor_by_oui('F4:CE:46:12:34:56') == 'Hewlett-Packard'
+    assert engine.vendor_by_oui('52-54-00-12-34-56') == 'QEMU/KVM'
+    assert engine.vendor_by_oui('00:00:00:12:34:56') == ''
+    assert engine.vendor_from_products(host(), snmp_oid='1.3.6.1.4.1.11.2.3.9') == ('Hewlett-Packard', 'vendor.hp')
+
+
+def test_unsupported_rules_version(tmp_path):
+    rules = tmp_path / "fingerprints.json"
+    rules.write_text('{"version": 2}')
+    with pytest.raises(ValueError):
+        FingerprintEngine(str(rules))
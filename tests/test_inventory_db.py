@@ -0,0 +1,78 @@
+# tests/test_inventory_db.py
+import pytest
+
+from device_record import DeviceRecord
+from inventory_db import InventoryDB, merge_join
+
+
+def test_merge_join_pairs_rows_by_key():
+    left = iter([(1, 'a'), (3, 'c'), (5, 'e')])
+    right = iter([(2, 'B'), (3, 'C'), (6, 'F')])
+    assert list(merge_join(left, right, key=lambda row: row[0])) == [
+        (1, (1, 'a'), None),
+        (2, None, (2, 'B')),
+        (3, (3, 'c'), (3, 'C')),
+        (5, (5, 'e'), None),
+        (6, None, (6, 'F')),
+    ]
+
+
+def test_merge_join_with_empty_side():
+    rows = [(1,), (2,)]
+    assert list(merge_join(iter(rows), iter([]), key=lambda row: row[0])) == [(1, (1,), None), (2, (2,), None)]
+    assert list(merge_join(iter([]), iter([]), key=lambda row: row[0])) == []
+
+
+def host(ip, hostname='', shares=(), ports=(9100,), skipped=()):
+    record = DeviceRecord(ip, hostname, mac='00:11:22:33:44:55', type='shared_printer' if shares else 'device')
+    record.set_ports({port: {'state': 'open', 'name': '', 'product': '', 'version': ''} for port in ports})
+    record.shared_printers = [{'Name': share, 'ShareName': share} for share in shares]
+    record.skipped = tuple(skipped)
+    return record
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    inventory = InventoryDB(str(tmp_path / "inventory.db"))
+    yield inventory
+    inventory.close()
+
+
+def record_scan(inventory, ips, records):
+    scan_id = inventory.begin_scan(ips[0], ips)
+    inventory.add_hosts(scan_id, records)
+    inventory.finish_scan(scan_id)
+    return scan_id
+
+
+def test_diff_reports_new_gone_and_changed(inventory):
+    ips = ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4']
+    old = record_scan(inventory, ips, [host('10.0.0.1', 'a', ['P1']), host('10.0.0.2', 'b'),
+                                       host('10.0.0.3', 'c', ports=(80,))])
+    new = record_scan(inventory, ips, [host('10.0.0.1', 'a', ['P1', 'P2']), host('10.0.0.3', 'c2', ports=(80, 22)),
+                                       host('10.0.0.4', 'd')])
+
+    diff = inventory.diff(old, new)
+    assert [h['ip'] for h in diff.new_hosts] == ['10.0.0.4']
+    assert [h['ip'] for h in diff.gone_hosts] == ['10.0.0.2']
+    assert diff.changed_hosts['10.0.0.3'] == {'hostname': ('c', 'c2'), 'porta 22': ('-', 'open')}
+    assert diff.new_printers == [('10.0.0.1', 'P2')]
+    assert diff.gone_printers == []
+    assert inventory.previous_scan(new) == old
+
+
+def test_diff_ignores_hosts_outside_the_new_range(inventory):
+    old = record_scan(inventory, ['10.0.0.1', '10.0.0.9'], [host('10.0.0.1'), host('10.0.0.9')])
+    new = record_scan(inventory, ['10.0.0.1', '10.0.0.2'], [host('10.0.0.1')])
+    assert inventory.diff(old, new).is_empty
+
+
+def test_partial_host_is_not_compared(inventory):
+    ips = ['10.0.0.1', '10.0.0.2']
+    old = record_scan(inventory, ips, [host('10.0.0.1', 'a', ['P1']), host('10.0.0.2', 'b')])
+    new = record_scan(inventory, ips, [host('10.0.0.1', '', skipped=('shares',)), host('10.0.0.2', 'b2')])
+
+    diff = inventory.diff(old, new)
+    assert list(diff.changed_hosts) == ['10.0.0.2']
+    assert diff.gone_printers == []
+    assert inventory.load_records(new)['10.0.0.1'].skipped == ('shares',)
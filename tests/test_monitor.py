@@ -0,0 +1,34 @@
+# tests/test_monitor.py
+import threading
+
+import monitor
+from monitor import NetworkMonitor
+
+
+def test_concurrent_sweep_does_not_reset_shared_caches(monkeypatch):
+    resets = []
+    monkeypatch.setattr(monitor, 'reset_scan_caches', lambda: resets.append(1))
+    network = NetworkMonitor.__new__(NetworkMonitor)
+    network._sweeps_lock = threading.Lock()
+    network._active_sweeps = 0
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_sweep(subnet, executor):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(network, '_sweep', slow_sweep)
+    first = threading.Thread(target=network.sweep, args=(None, None))
+    first.start()
+    started.wait(5)
+
+    monkeypatch.setattr(network, '_sweep', lambda subnet, executor: None)
+    network.sweep(None, None)
+    assert len(resets) == 1
+
+    release.set()
+    first.join(5)
+    network.sweep(None, None)
+    assert len(resets) == 2
@@ -0,0 +1,51 @@
+# tests/test_printer_utils.py
+import pytest
+
+import printer_utils
+from credential_context import ANONYMOUS
+from method_affinity import MethodAffinityStore
+from printer_utils import WindowsPrinterManager
+
+
+PRINTER = {'Name': 'recepcao', 'ShareName': 'recepcao'}
+
+
+@pytest.fixture
+def affinity(tmp_path, monkeypatch):
+    store = MethodAffinityStore(str(tmp_path / "method_affinity.json"))
+    monkeypatch.setattr(printer_utils, '_affinity', store)
+    return store
+
+
+def use_methods(monkeypatch, **results):
+    methods = {name: (lambda ip, credentials, cancel=None, value=value: value) for name, value in results.items()}
+    monkeypatch.setattr(WindowsPrinterManager, '_available_methods', classmethod(lambda cls, credentials: methods))
+
+
+def test_empty_heuristic_answer_does_not_stop_the_chain(affinity, monkeypatch):
+    use_methods(monkeypatch, net_view=[], srvsvc=[PRINTER])
+
+    assert WindowsPrinterManager._enumerate_shared_printers('10.0.0.5', '', ANONYMOUS) == [PRINTER]
+    assert affinity.rank('10.0.0.5', ['net_view', 'srvsvc'])[0] == 'srvsvc'
+
+
+def test_empty_heuristic_answer_alone_is_not_recorded(affinity, monkeypatch):
+    use_methods(monkeypatch, net_view=[], srvsvc=None)
+
+    assert WindowsPrinterManager._enumerate_shared_printers('10.0.0.5', '', ANONYMOUS) == []
+    assert not affinity.is_unreachable('10.0.0.5', ANONYMOUS.fingerprint)
+    assert affinity.rank('10.0.0.5', ['net_view', 'srvsvc']) == ['net_view', 'srvsvc']
+
+
+def test_empty_trusted_answer_is_a_success(affinity, monkeypatch):
+    use_methods(monkeypatch, srvsvc=[], net_view=[PRINTER])
+
+    assert WindowsPrinterManager._enumerate_shared_printers('10.0.0.5', '', ANONYMOUS) == []
+    assert affinity.has_history('10.0.0.5', '')
+
+
+def test_affinity_store_is_created_on_first_use(monkeypatch):
+    monkeypatch.setattr(printer_utils, '_affinity', None)
+    monkeypatch.setattr(printer_utils, 'MethodAffinityStore', lambda: 'store')
+
+    assert printer_utils._get_affinity() == 'store'
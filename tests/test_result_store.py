@@ -0,0 +1,66 @@
+# tests/test_result_store.py
+import pytest
+
+from device_record import DeviceRecord
+from result_store import QueryError, ResultStore
+
+
+def device(ip, hostname='', vendor='', type='device', domain='', ports=()):
+    record = DeviceRecord(ip, hostname, vendor=vendor, type=type, domain=domain)
+    record.set_ports({port: {'state': 'open', 'name': '', 'product': '', 'version': ''} for port in ports})
+    return record
+
+
+@pytest.fixture
+def store():
+    store = ResultStore()
+    store.add_many([
+        device('10.0.1.5', 'prn-recepcao', 'Hewlett-Packard', 'network_printer', 'corp', (80, 9100)),
+        device('10.0.1.6', 'prn-financeiro', 'Canon', 'network_printer', 'corp', (9100, 445)),
+        device('10.0.2.7', 'srv-arquivos', 'Microsoft', 'device', 'corp', (139, 445)),
+        device('10.0.2.8', 'notebook', 'Apple', 'device', '', (22,)),
+    ])
+    return store
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', ['10.0.1.5', '10.0.1.6', '10.0.2.7', '10.0.2.8']),
+    ('9100', ['10.0.1.5', '10.0.1.6']),
+    ('port:445', ['10.0.1.6', '10.0.2.7']),
+    ('port 9100 AND vendor=hewlett', ['10.0.1.5']),
+    ('9100 vendor=canon', ['10.0.1.6']),
+    ('vendor=canon OR vendor=apple', ['10.0.1.6', '10.0.2.8']),
+    ('9100 AND NOT 445', ['10.0.1.5']),
+    ('NOT domain=corp', ['10.0.2.8']),
+    ('(vendor=canon OR vendor=microsoft) AND NOT type=printer', ['10.0.2.7']),
+])
+def test_boolean_queries(store, query, expected):
+    assert store.query(query) == expected
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('subnet=10.0.1.0/24', ['10.0.1.5', '10.0.1.6']),
+    ('subnet=10.0.0.0/16', ['10.0.1.5', '10.0.1.6', '10.0.2.7', '10.0.2.8']),
+    ('ip=10.0.2.7', ['10.0.2.7']),
+])
+def test_cidr_queries(store, query, expected):
+    assert store.query(query) == expected
+
+
+def test_host_prefix(store):
+    assert store.query('host=prn-') == ['10.0.1.5', '10.0.1.6']
+    assert store.query('hostname=PRN-F') == ['10.0.1.6']
+    assert store.query('host=recepcao') == []
+
+
+def test_replaced_record_is_reindexed(store):
+    store.add(device('10.0.1.5', 'scanner', 'Epson', 'device', 'corp', (80,)))
+    assert store.query('9100') == ['10.0.1.6']
+    assert store.query('host=prn-') == ['10.0.1.6']
+    assert store.count('vendor=epson') == 1
+
+
+@pytest.mark.parametrize('query', ['(9100', 'subnet=10.0.0.0/33', 'port:abc', '9100 AND'])
+def test_invalid_queries(store, query):
+    with pytest.raises(QueryError):
+        store.query(query)
@@ -0,0 +1,33 @@
+# tests/test_scan_cache.py
+import threading
+
+from probe_runtime import ProbeLoop
+from scan_cache import AsyncScanCache
+
+
+def test_clear_from_another_thread_runs_on_the_loop():
+    cache = AsyncScanCache("test_clear")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert ProbeLoop.run(cache.get_or_fetch('10.0.0.5', fetch), 5) == 1
+    assert ProbeLoop.run(cache.get_or_fetch('10.0.0.5', fetch), 5) == 1
+
+    cleared_on = []
+    original = cache._clear
+    cache._clear = lambda: (cleared_on.append(threading.current_thread().name), original())
+    cache.clear()
+
+    # A consulta submetida depois da limpeza já encontra o cache vazio
+    assert ProbeLoop.run(cache.get_or_fetch('10.0.0.5', fetch), 5) == 2
+    assert cleared_on == ['probe-loop']
+
+
+def test_clear_before_first_use_is_immediate():
+    cache = AsyncScanCache("test_clear_unused")
+    cache.hits = 3
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'entries': 0}
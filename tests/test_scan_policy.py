@@ -0,0 +1,72 @@
+# tests/test_scan_policy.py
+import pytest
+
+import scan_policy
+from device_record import DeviceRecord
+from inventory_db import InventoryDB
+from scan_policy import DeltaScanPolicy
+
+
+IPS = [f"10.0.0.{n}" for n in range(20)]
+
+
+def printer(ip, skipped=()):
+    record = DeviceRecord(ip, f"prn-{ip}", type='network_printer')
+    record.set_ports({9100: {'state': 'open', 'name': 'jetdirect', 'product': '', 'version': ''},
+                      80: {'state': 'open', 'name': 'http', 'product': '', 'version': ''}})
+    record.skipped = tuple(skipped)
+    return record
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    inventory = InventoryDB(str(tmp_path / "inventory.db"))
+    scan_id = inventory.begin_scan('10.0.0.0-19', IPS)
+    inventory.add_hosts(scan_id, [printer('10.0.0.1'), printer('10.0.0.2', skipped=('shares',))])
+    inventory.finish_scan(scan_id)
+    yield inventory
+    inventory.close()
+
+
+def test_plan_keeps_known_hosts_and_a_rotating_sample(inventory):
+    policy = DeltaScanPolicy(inventory, sample_rate=0.25)
+    planned = policy.plan(IPS)
+    # Scan base #1, período 4: a amostra é o resto 1 dos endereços
+    assert planned == ['10.0.0.1', '10.0.0.2', '10.0.0.5', '10.0.0.9', '10.0.0.13', '10.0.0.17']
+    assert policy.counts['skipped'] == 14
+
+
+def test_plan_without_baseline_scans_everything(tmp_path):
+    inventory = InventoryDB(str(tmp_path / "empty.db"))
+    policy = DeltaScanPolicy(inventory)
+    assert policy.plan(IPS) == IPS
+    assert policy.summary() == ''
+    inventory.close()
+
+
+def test_scan_confirms_known_host_without_full_scan(inventory, monkeypatch):
+    probed = []
+    monkeypatch.setattr(scan_policy, 'tcp_connect', lambda ip, port, timeout=None: probed.append(port) or True)
+    policy = DeltaScanPolicy(inventory, sample_rate=0.25)
+    policy.plan(IPS)
+
+    result = policy.scan('10.0.0.1', lambda ip: pytest.fail("scan completo desnecessário"))
+    assert result['data'].hostname == 'prn-10.0.0.1'
+    assert probed[0] == 9100
+    assert policy.counts['verified'] == 1
+
+
+def test_scan_rescans_unreachable_partial_and_sampled_hosts(inventory, monkeypatch):
+    monkeypatch.setattr(scan_policy, 'tcp_connect', lambda ip, port, timeout=None: False)
+    policy = DeltaScanPolicy(inventory, sample_rate=0.25)
+    policy.plan(IPS)
+    scanned = []
+
+    def full_scan(ip):
+        scanned.append(ip)
+        return None
+
+    for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.5'):
+        policy.scan(ip, full_scan)
+    assert scanned == ['10.0.0.1', '10.0.0.2', '10.0.0.5']
+    assert (policy.counts['rescanned'], policy.counts['sampled']) == (2, 1)
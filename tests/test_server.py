@@ -0,0 +1,51 @@
+# tests/test_server.py
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from scan_jobs import ScanJobManager
+from server import ScanServer, main
+
+
+@pytest.fixture
+def server():
+    jobs = ScanJobManager(None, workers=2, scan_function=lambda ip, deadline=None: None)
+    server = ScanServer(('127.0.0.1', 0), jobs, None, token='segredo')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    jobs.shutdown()
+
+
+def post_scan(url: str, target: str, token: str = 'segredo'):
+    request = urllib.request.Request(url + '/scans', data=json.dumps({'range': target}).encode('utf-8'),
+                                     method='POST', headers={'Authorization': f'Bearer {token}'})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_request_without_token_is_rejected(server):
+    assert post_scan(server, '10.0.0.1', token='errado')[0] == 401
+
+
+def test_oversized_range_is_rejected(server):
+    status, body = post_scan(server, '10.0.0.0/8')
+    assert status == 400
+    assert 'máximo' in body['error']
+
+
+def test_small_range_is_accepted(server):
+    status, body = post_scan(server, '10.0.0.0/30')
+    assert status == 202
+    assert body['total'] == 2
+
+
+def test_public_address_requires_token():
+    assert main(['server.py', '--host', '0.0.0.0', '--token', '']) == 2
@@ -0,0 +1,40 @@
+# tests/test_smart_credentials.py
+import threading
+
+import pytest
+
+import smart_credentials
+from auth_cache import AuthResultCache
+from credential_context import CredentialContext
+from printer_utils import WindowsPrinterManager
+from smart_credentials import SmartCredentialsManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = SmartCredentialsManager.__new__(SmartCredentialsManager)
+    manager.parent_app = None
+    manager.cached_credentials = {}
+    manager.failed_hosts = set()
+    manager.auth_cache = AuthResultCache(str(tmp_path / "auth_cache.json"))
+    manager._lock = threading.Lock()
+    return manager
+
+
+def test_wrong_password_fails_even_with_anonymous_share_listing(manager, monkeypatch):
+    # Host que lista compartilhamentos sem autenticação: a enumeração "funcionaria" com qualquer senha
+    monkeypatch.setattr(WindowsPrinterManager, 'get_shared_printers',
+                        staticmethod(lambda ip, domain='', credentials=None: []))
+    monkeypatch.setattr(smart_credentials, 'check_credentials', lambda ip, username, password, domain='': False)
+    credentials = CredentialContext.from_input('alice', 'errada')
+
+    assert manager._check_credentials('10.0.0.5', credentials, 'corp.local') is False
+    assert manager.auth_cache.lookup('10.0.0.6', credentials.fingerprint, 'corp.local') is False
+
+
+def test_unanswered_check_is_not_a_success(manager, monkeypatch):
+    monkeypatch.setattr(smart_credentials, 'check_credentials', lambda ip, username, password, domain='': None)
+    credentials = CredentialContext.from_input('alice', 'senha')
+
+    assert manager._check_credentials('10.0.0.5', credentials) is False
+    assert manager.auth_cache.lookup('10.0.0.5', credentials.fingerprint) is None
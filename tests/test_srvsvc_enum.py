@@ -0,0 +1,43 @@
+# tests/test_srvsvc_enum.py
+import pytest
+
+from srvsvc_enum import md4, ntlmv2_response, split_username
+
+
+# RFC 1320, apêndice A.5
+@pytest.mark.parametrize('message, digest', [
+    (b'', '31d6cfe0d16ae931b73c59d7e0c089c0'),
+    (b'a', 'bde52cb31de33e46245e05fbdbd6fb24'),
+    (b'abc', 'a448017aaf21d8525fc10ae87aa6729d'),
+    (b'message digest', 'd9130a8164549fe818874806e1c7014b'),
+    (b'abcdefghijklmnopqrstuvwxyz', 'd79e1c308aa5bbcdeea8ed63df412da9'),
+    (b'1234567890' * 8, 'e33b4ddc9c38f2199c3e7b164fcc0536'),
+])
+def test_md4_rfc1320_vectors(message, digest):
+    assert md4(message).hex() == digest
+
+
+def test_nt_hash_of_password():
+    # MS-NLMP 4.2.2.1.2: NTOWFv1 de "Password"
+    assert md4('Password'.encode('utf-16-le')).hex() == 'a4f49c406510bdcab6824ee7c30fd852'
+
+
+def test_ntlmv2_ms_nlmp_vector():
+    # MS-NLMP 4.2.4: usuário "User", domínio "Domain", senha "Password", servidor "Server"
+    target_info = bytes.fromhex('02000c0044006f006d00610069006e00'
+                                '01000c005300650072007600650072000000' '0000')
+    response, session_key = ntlmv2_response('Password', 'User', 'Domain', bytes.fromhex('0123456789abcdef'),
+                                            target_info, timestamp=0, client_challenge=b'\xaa' * 8)
+    assert response[:16].hex() == '68cd0ab851e51c96aabc927bebef6a1c'
+    assert session_key.hex() == '8de40ccadbc14a82f15cb0ad0de95ca3'
+    assert response[16:].startswith(bytes.fromhex('0101000000000000' '0000000000000000' 'aaaaaaaaaaaaaaaa'))
+
+
+@pytest.mark.parametrize('username, domain, expected', [
+    ('CORP\\alice', '', ('alice', 'CORP')),
+    ('alice@corp.local', '', ('alice', 'corp.local')),
+    ('alice@corp.local', 'CORP', ('alice@corp.local', 'CORP')),
+    ('alice', 'CORP', ('alice', 'CORP')),
+])
+def test_split_username(username, domain, expected):
+    assert split_username(username, domain) == expected
@@ -0,0 +1,43 @@
+# tests/test_vendor_lookup.py
+import pytest
+
+from fingerprint_engine import FingerprintEngine
+from oui_registry import lookup_vendor
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return FingerprintEngine()
+
+
+@pytest.mark.parametrize('mac, organization', [
+    ('00:00:AA:11:22:33', 'XEROX CORPORATION'),          # MA-L
+    ('00:55:DA:10:00:01', 'KoolPOS Inc.'),               # MA-M (/28)
+    ('70:B3:D5:00:10:00', 'SOREDI touch systems GmbH'),  # MA-S (/36)
+    ('00:1B:C5:00:10:00', 'OpenRB.com, Direct SIA'),     # IAB (/36)
+])
+def test_registry_covers_every_block_size(mac, organization):
+    assert lookup_vendor(mac) == organization
+
+
+@pytest.mark.parametrize('organization, vendor', [
+    ('HP Inc.', 'Hewlett-Packard'),
+    ('Hewlett Packard', 'Hewlett-Packard'),
+    ('CANON INC.', 'Canon'),
+    ('Seiko Epson Corporation', 'Epson'),
+    ('Brother Industries, LTD.', 'Brother'),
+    ('Microsoft Corporation', 'Microsoft'),
+])
+def test_normalize_vendor_maps_known_organizations(engine, organization, vendor):
+    assert engine.normalize_vendor(organization) == vendor
+
+
+@pytest.mark.parametrize('organization', [
+    'HP Tuners LLC',
+    'Aruba, a Hewlett Packard Enterprise Company',
+    'Vulcanonet Ltd',
+    'McKay Brothers LLC',
+    'Seiko Instruments Inc.',
+])
+def test_normalize_vendor_keeps_unrelated_organizations(engine, organization):
+    assert engine.normalize_vendor(organization) == organization
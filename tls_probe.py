@@ -0,0 +1,258 @@
+# tls_probe.py
+import asyncio
+import ipaddress
+import re
+import ssl
+from typing import Dict, List, Optional, Tuple
+
+from probe_runtime import ProbeLimiter, run_probe
+from scan_cache import AsyncScanCache
+from web_probe import insecure_tls_context, PRINTER_WEB_KEYWORDS
+
+
+# Portas onde impressoras e hosts Windows costumam apresentar certificados
+TLS_PORTS = (443, 631, 9443)
+
+HANDSHAKE_TIMEOUT = 1.5
+
+# OIDs dos atributos de nome e da extensão subjectAltName (DER)
+OID_COMMON_NAME = bytes.fromhex('550403')
+OID_SERIAL_NUMBER = bytes.fromhex('550405')
+OID_ORGANIZATION = bytes.fromhex('55040a')
+OID_ORGANIZATIONAL_UNIT = bytes.fromhex('55040b')
+OID_SUBJECT_ALT_NAME = bytes.fromhex('551d11')
+
+_NAME_ATTRIBUTES = {
+    OID_COMMON_NAME: 'common_name',
+    OID_SERIAL_NUMBER: 'serial_number',
+    OID_ORGANIZATION: 'organization',
+    OID_ORGANIZATIONAL_UNIT: 'organizational_unit',
+}
+
+# Fabricantes que aparecem no campo O/CN de certificados, além dos de web_probe
+CERT_VENDOR_KEYWORDS = dict(PRINTER_WEB_KEYWORDS, **{
+    'hewlett-packard': 'Hewlett-Packard', 'hewlett packard': 'Hewlett-Packard',
+    'hp inc': 'Hewlett-Packard', 'canon': 'Canon', 'samsung': 'Samsung',
+    'konica minolta': 'Konica Minolta', 'microsoft': 'Microsoft',
+})
+_VENDOR_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(k) for k in sorted(CERT_VENDOR_KEYWORDS, key=len, reverse=True)) + r')\b'
+)
+_HOSTNAME_RE = re.compile(r'^(?=.{1,253}$)[A-Za-z0-9]([A-Za-z0-9-]{0,62})(\.[A-Za-z0-9-]{1,63})*$')
+
+# Nomes genéricos que não identificam o host
+_GENERIC_NAMES = {'localhost', 'localhost.localdomain', 'printer', 'default', 'server'}
+
+_limiter = ProbeLimiter(global_limit=128, per_host_limit=2)
+_cache = AsyncScanCache("tls")
+_TLS_CONTEXT = insecure_tls_context()
+
+
+def _read_tlv(data: bytes, offset: int) -> Tuple[int, int, int]:
+    """Lê um elemento DER. Retorna (tag, início do conteúdo, fim do conteúdo)."""
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        num_bytes = length & 0x7F
+        length = int.from_bytes(data[offset:offset + num_bytes], 'big')
+        offset += num_bytes
+    end = offset + length
+    if end > len(data):
+        raise ValueError("elemento DER truncado")
+    return tag, offset, end
+
+
+def _children(data: bytes, start: int, end: int) -> List[Tuple[int, int, int]]:
+    """Lista os elementos contidos em um SEQUENCE/SET."""
+    items = []
+    while start < end:
+        tag, content_start, content_end = _read_tlv(data, start)
+        items.append((tag, content_start, content_end))
+        start = content_end
+    return items
+
+
+def _decode_string(tag: int, value: bytes) -> str:
+    if tag == 0x1E:  # BMPString
+        return value.decode('utf-16-be', errors='replace')
+    return value.decode('utf-8', errors='replace')
+
+
+def _parse_name(data: bytes, start: int, end: int) -> Dict[str, str]:
+    """Interpreta um Name X.501 (RDNSequence)."""
+    fields = {}
+    for _, set_start, set_end in _children(data, start, end):
+        for _, attr_start, attr_end in _children(data, set_start, set_end):
+            parts = _children(data, attr_start, attr_end)
+            if len(parts) < 2:
+                continue
+            oid = data[parts[0][1]:parts[0][2]]
+            key = _NAME_ATTRIBUTES.get(oid)
+            if key and key not in fields:
+                fields[key] = _decode_string(parts[1][0], data[parts[1][1]:parts[1][2]]).strip()
+    return fields
+
+
+def _parse_san(data: bytes) -> List[str]:
+    """Extrai os dNSName de uma extensão subjectAltName."""
+    names = []
+    _, start, end = _read_tlv(data, 0)
+    for tag, value_start, value_end in _children(data, start, end):
+        if tag == 0x82:  # [2] dNSName
+            names.append(data[value_start:value_end].decode('ascii', errors='replace'))
+    return names
+
+
+def parse_certificate(der: bytes) -> Dict[str, object]:
+    """
+    Extrai sujeito, emissor e SAN de um certificado X.509 em DER.
+
+    Args:
+        der (bytes): Certificado em formato DER
+
+    Returns:
+        dict: 'subject', 'issuer' (dicts com common_name, organization, ...)
+              e 'san_dns' (lista de nomes DNS)
+    """
+    _, cert_start, cert_end = _read_tlv(der, 0)
+    _, tbs_start, tbs_end = _children(der, cert_start, cert_end)[0]
+    fields = _children(der, tbs_start, tbs_end)
+
+    # O campo version ([0] EXPLICIT) é opcional
+    if fields and fields[0][0] == 0xA0:
+        fields = fields[1:]
+
+    # serialNumber, signature, issuer, validity, subject, subjectPublicKeyInfo, ...
+    issuer = _parse_name(der, fields[2][1], fields[2][2])
+    subject = _parse_name(der, fields[4][1], fields[4][2])
+
+    san_dns = []
+    for tag, start, end in fields[6:]:
+        if tag != 0xA3:  # [3] extensions
+            continue
+        _, ext_start, ext_end = _read_tlv(der, start)
+        for _, item_start, item_end in _children(der, ext_start, ext_end):
+            parts = _children(der, item_start, item_end)
+            if der[parts[0][1]:parts[0][2]] == OID_SUBJECT_ALT_NAME:
+                value = parts[-1]
+                san_dns = _parse_san(der[value[1]:value[2]])
+
+    return {'subject': subject, 'issuer': issuer, 'san_dns': san_dns}
+
+
+def _looks_like_hostname(name: str) -> bool:
+    if not name or name.lower() in _GENERIC_NAMES or '*' in name:
+        return False
+    try:
+        ipaddress.ip_address(name)
+        return False
+    except ValueError:
+        return bool(_HOSTNAME_RE.match(name))
+
+
+def summarize_certificate(cert: Dict[str, object]) -> Dict[str, object]:
+    """
+    Deriva hostname, fabricante e modelo a partir de um certificado interpretado.
+
+    Args:
+        cert (dict): Resultado de parse_certificate
+
+    Returns:
+        dict: Campos do certificado mais 'hostname', 'vendor' e 'model' (podem ser vazios)
+    """
+    subject = cert['subject']
+    common_name = subject.get('common_name', '')
+
+    # Prefere nomes totalmente qualificados do SAN; depois o CN
+    candidates = sorted(cert['san_dns'], key=lambda n: '.' not in n) + [common_name]
+    hostname = next((name for name in candidates if _looks_like_hostname(name)), '')
+
+    vendor = ''
+    haystack = ' '.join([subject.get('organization', ''), subject.get('organizational_unit', ''),
+                         common_name, cert['issuer'].get('organization', '')]).lower()
+    for keyword in _VENDOR_RE.findall(haystack):
+        if CERT_VENDOR_KEYWORDS[keyword]:
+            vendor = CERT_VENDOR_KEYWORDS[keyword]
+            break
+
+    # CN com espaços e palavra-chave de impressora costuma ser o modelo ("HP LaserJet M402dn")
+    model = common_name if ' ' in common_name and _VENDOR_RE.search(common_name.lower()) else ''
+
+    return {
+        'common_name': common_name,
+        'organization': subject.get('organization', ''),
+        'organizational_unit': subject.get('organizational_unit', ''),
+        'serial_number': subject.get('serial_number', ''),
+        'issuer': cert['issuer'].get('common_name', ''),
+        'san_dns': cert['san_dns'],
+        'hostname': hostname,
+        'vendor': vendor,
+        'model': model,
+    }
+
+
+async def _grab_certificate_uncached(ip: str, port: int, timeout: float) -> Optional[Dict[str, object]]:
+    """Faz apenas o handshake TLS e lê o certificado do servidor, sem enviar HTTP."""
+    async with _limiter.slot(ip):
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port, ssl=_TLS_CONTEXT, server_hostname=''),
+                timeout
+            )
+        except (OSError, ssl.SSLError, asyncio.TimeoutError):
+            return None
+
+        try:
+            der = writer.get_extra_info('ssl_object').getpeercert(binary_form=True)
+        finally:
+            writer.close()
+
+    if not der:
+        return None
+    try:
+        info = summarize_certificate(parse_certificate(der))
+    except (ValueError, IndexError):
+        return None
+    info['port'] = port
+    return info
+
+
+async def grab_certificate(ip: str, port: int, timeout: float = HANDSHAKE_TIMEOUT) -> Optional[Dict[str, object]]:
+    """
+    Obtém e interpreta o certificado TLS de um host (com cache por scan).
+
+    Args:
+        ip (str): Endereço IP do host
+        port (int): Porta TLS
+        timeout (float): Prazo para conexão e handshake
+
+    Returns:
+        dict | None: Resumo do certificado ou None se não houve handshake
+    """
+    return await _cache.get_or_fetch((ip, port), lambda: _grab_certificate_uncached(ip, port, timeout))
+
+
+async def _grab_first_certificate(ip: str, ports: List[int]) -> Optional[Dict[str, object]]:
+    results = await asyncio.gather(*(grab_certificate(ip, port) for port in ports))
+    certs = [cert for cert in results if cert]
+    # Prefere o certificado que identifica o host pelo nome
+    certs.sort(key=lambda cert: not cert['hostname'])
+    return certs[0] if certs else None
+
+
+def get_certificate_info(ip: str, tcp_ports: dict) -> Optional[Dict[str, object]]:
+    """
+    Versão síncrona para as threads de scan: lê o certificado das portas TLS abertas.
+
+    Args:
+        ip (str): Endereço IP do host
+        tcp_ports (dict): Portas TCP retornadas pelo Nmap
+
+    Returns:
+        dict | None: Resumo do melhor certificado encontrado ou None
+    """
+    ports = [port for port in TLS_PORTS if tcp_ports.get(port, {}).get('state') == 'open']
+    if not ports:
+        return None
+    return run_probe(_grab_first_certificate(ip, ports), timeout=HANDSHAKE_TIMEOUT * 2 + 5)
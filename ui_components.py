@@ -1,14 +1,123 @@
 # ui_components.py
+import bisect
+import ipaddress
 import customtkinter as ctk
 from tkinter import ttk
 
+
+COLUMNS = ("IP", "Hostname", "MAC", "Status")
+
+# Linhas visíveis da tabela e linhas roladas por passo da roda do mouse
+VISIBLE_ROWS = 8
+WHEEL_ROWS = 3
+
+
+def _sort_key(column: str, value):
+    """Chave de ordenação de uma célula: IPs em ordem numérica, o resto sem diferenciar maiúsculas."""
+    if column == "IP":
+        try:
+            return (0, int(ipaddress.ip_address(value)))
+        except ValueError:
+            return (1, str(value))
+    return (0, str(value).casefold())
+
+
+class RowStore:
+    """
+    Linhas de uma tabela de resultados, mantidas em memória na ordem de exibição.
+
+    Com uma coluna de ordenação ativa, as linhas novas são inseridas na
+    posição certa (busca binária) em vez de reordenar tudo. A ordem
+    decrescente é só uma leitura invertida da lista crescente. Um filtro
+    (conjunto de IPs) mantém uma segunda lista só com as linhas visíveis.
+    """
+
+    def __init__(self, columns: tuple = COLUMNS):
+        self.columns = columns
+        self._rows = []
+        self._view = None
+        self._filter = None
+        self.sort_column = None
+        self.reverse = False
+
+    def __len__(self) -> int:
+        return len(self._visible())
+
+    @property
+    def total(self) -> int:
+        """Quantidade de linhas, ignorando o filtro."""
+        return len(self._rows)
+
+    @property
+    def is_filtered(self) -> bool:
+        return self._filter is not None
+
+    def _visible(self) -> list:
+        return self._rows if self._view is None else self._view
+
+    def _key(self, row: tuple):
+        return _sort_key(self.columns[self.sort_column], row[self.sort_column])
+
+    def _insert(self, target: list, rows: list):
+        if self.sort_column is None:
+            target.extend(rows)
+            return
+        for row in rows:
+            bisect.insort(target, row, key=self._key)
+
+    def extend(self, rows: list):
+        """Adiciona linhas respeitando a ordenação e o filtro atuais."""
+        self._insert(self._rows, rows)
+        if self._filter is not None:
+            self._insert(self._view, [row for row in rows if row[0] in self._filter])
+
+    def clear(self):
+        """Descarta todas as linhas em O(1)."""
+        self._rows = []
+        if self._view is not None:
+            self._view = []
+
+    def set_filter(self, ips):
+        """Mostra só as linhas cujo IP está no conjunto; None remove o filtro."""
+        self._filter = ips
+        self._view = None if ips is None else [row for row in self._rows if row[0] in ips]
+
+    def sort(self, column: int, reverse: bool = False):
+        """Ordena pela coluna indicada."""
+        if column != self.sort_column:
+            self.sort_column = column
+            self._rows.sort(key=self._key)
+            if self._view is not None:
+                self._view.sort(key=self._key)
+        self.reverse = reverse
+
+    def window(self, start: int, count: int) -> list:
+        """Retorna as linhas de exibição [start, start + count)."""
+        rows = self._visible()
+        if not self.reverse:
+            return rows[start:start + count]
+        end = len(rows) - start
+        return rows[max(0, end - count):max(0, end)][::-1]
+
+
 class CollapsibleFrame(ctk.CTkFrame):
+    """
+    Categoria de resultados recolhível com tabela virtualizada.
+
+    As linhas ficam em um RowStore; o Treeview só contém as VISIBLE_ROWS
+    linhas da janela atual, cujos itens são reaproveitados ao rolar. A barra
+    de rolagem, a roda do mouse e as setas movem a janela sobre o RowStore.
+    """
+
     def __init__(self, parent, category_name: str, app):
         super().__init__(parent, fg_color="transparent")
         self.columnconfigure(0, weight=1)
         self.category_name = category_name
         self.item_count = 0
         self.is_collapsed = True
+        self.rows = RowStore(COLUMNS)
+        self.offset = 0
+        self.selected_ip = None
         
         self.header_button = ctk.CTkButton(
             self, text=f"▶ {self.category_name} (0)", anchor="w",
@@ -20,50 +129,166 @@ class CollapsibleFrame(ctk.CTkFrame):
         self.content_frame.columnconfigure(0, weight=1)
         
         self.tree = ttk.Treeview(self.content_frame, 
-                                columns=("IP", "Hostname", "MAC", "Status"), 
-                                show="headings", height=8)
+                                columns=COLUMNS, 
+                                show="headings", height=VISIBLE_ROWS, selectmode="browse")
         
         col_widths = {"IP": 140, "Hostname": 200, "MAC": 140, "Status": 400}
         for col, width in col_widths.items():
-            self.tree.heading(col, text=col)
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
             self.tree.column(col, width=width, anchor="w")
         
         self.tree.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
         
-        scrollbar = ttk.Scrollbar(self.content_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.grid(row=0, column=1, sticky="ns", pady=5)
+        # A rolagem é da janela sobre o RowStore, não do Treeview
+        self.scrollbar = ttk.Scrollbar(self.content_frame, orient="vertical", command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky="ns", pady=5)
+        
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_selection(-VISIBLE_ROWS))
+        self.tree.bind("<Next>", lambda e: self._move_selection(VISIBLE_ROWS))
 
     def toggle(self):
         self.is_collapsed = not self.is_collapsed
-        prefix = "▶" if self.is_collapsed else "▼"
         
         if self.is_collapsed:
             self.content_frame.grid_forget()
         else:
             self.content_frame.grid(row=1, column=0, sticky="nsew", padx=(10, 0))
+            self._refresh()
             
-        self.header_button.configure(text=f"{prefix} {self.category_name} ({self.item_count})")
+        self._update_header()
 
     def add_entry(self, values: tuple):
-        self.tree.insert("", "end", values=values)
-        self.item_count += 1
+        self.add_entries([values])
+
+    def add_entries(self, rows: list):
+        """Adiciona várias linhas e atualiza a tabela e o cabeçalho uma única vez."""
+        self.rows.extend(rows)
+        self.item_count += len(rows)
+        self._update_header()
+        if not self.is_collapsed:
+            self._refresh()
+
+    def set_filter(self, ips, keep_position: bool = False):
+        """Aplica o filtro da interface (conjunto de IPs ou None); por padrão volta ao topo."""
+        self.rows.set_filter(ips)
+        self.offset = max(0, min(self.offset, len(self.rows) - VISIBLE_ROWS)) if keep_position else 0
+        self._update_header()
+        if not self.is_collapsed:
+            self._refresh()
+
+    def _update_header(self):
         prefix = "▼" if not self.is_collapsed else "▶"
-        self.header_button.configure(text=f"{prefix} {self.category_name} ({self.item_count})")
+        count = f"{len(self.rows)}/{self.item_count}" if self.rows.is_filtered else f"{self.item_count}"
+        self.header_button.configure(text=f"{prefix} {self.category_name} ({count})")
 
     def clear(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.rows.clear()
+        self.offset = 0
+        self.selected_ip = None
+        self.tree.delete(*self.tree.get_children())
         self.item_count = 0
         self.is_collapsed = True
         self.content_frame.grid_forget()
-        self.header_button.configure(text=f"▶ {self.category_name} (0)")
+        self._update_header()
+
+    def sort_by(self, column: str):
+        """Ordena pela coluna clicada; um segundo clique inverte a ordem."""
+        index = COLUMNS.index(column)
+        reverse = not self.rows.reverse if self.rows.sort_column == index else False
+        self.rows.sort(index, reverse)
+        for col in COLUMNS:
+            arrow = (" ▼" if reverse else " ▲") if col == column else ""
+            self.tree.heading(col, text=col + arrow)
+        self.offset = 0
+        self._refresh()
+
+    def _refresh(self):
+        """Mostra no Treeview só as linhas da janela atual, reaproveitando os itens."""
+        visible = self.rows.window(self.offset, VISIBLE_ROWS)
+        items = list(self.tree.get_children())
+        if len(items) > len(visible):
+            self.tree.delete(*items[len(visible):])
+            del items[len(visible):]
+        
+        selected_item = None
+        for position, values in enumerate(visible):
+            if position < len(items):
+                self.tree.item(items[position], values=values)
+            else:
+                items.append(self.tree.insert("", "end", values=values))
+            if values[0] == self.selected_ip:
+                selected_item = items[position]
+        
+        if selected_item:
+            if self.tree.selection() != (selected_item,):
+                self.tree.selection_set(selected_item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+        
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + VISIBLE_ROWS) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_to(self, offset: int):
+        offset = max(0, min(offset, len(self.rows) - VISIBLE_ROWS))
+        if offset != self.offset:
+            self.offset = offset
+            self._refresh()
+
+    def _scroll_by(self, rows: int):
+        self._scroll_to(self.offset + rows)
+        return "break"
+
+    def yview(self, *args):
+        """Comando da barra de rolagem ('moveto' fração | 'scroll' n units/pages)."""
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= VISIBLE_ROWS
+            self._scroll_by(amount)
+
+    def _on_mousewheel(self, event):
+        # Windows usa múltiplos de 120; no macOS o delta é pequeno
+        return self._scroll_by(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS)
+
+    def _on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            self.selected_ip = self.tree.item(selection[0], 'values')[0]
+
+    def _move_selection(self, delta: int):
+        """Move a seleção pelas setas, rolando a janela quando ela sai da área visível."""
+        total = len(self.rows)
+        if not total:
+            return "break"
+        current = self.offset
+        selection = self.tree.selection()
+        if selection:
+            current = self.offset + self.tree.index(selection[0])
+        target = max(0, min(current + delta, total - 1))
+        if target < self.offset:
+            self.offset = target
+        elif target >= self.offset + VISIBLE_ROWS:
+            self.offset = target - VISIBLE_ROWS + 1
+        self.selected_ip = self.rows.window(target, 1)[0][0]
+        self._refresh()
+        return "break"
 
 
 class DetailsWindow(ctk.CTkToplevel):
-    def __init__(self, parent, device_data):
+    def __init__(self, parent, device_data, detail: dict = None):
         super().__init__(parent)
-        self.title(f"Detalhes de {device_data.get('ip', 'N/A')}")
+        self.title(f"Detalhes de {device_data.ip}")
         self.geometry("600x450")
         self.transient(parent)
         self.grab_set()
@@ -71,33 +296,90 @@ class DetailsWindow(ctk.CTkToplevel):
         textbox = ctk.CTkTextbox(self, wrap="word", font=("Consolas", 12))
         textbox.pack(expand=True, fill="both", padx=10, pady=10)
         
-        details_text = self.format_details(device_data)
+        details_text = self.format_details(device_data, detail)
         textbox.insert("1.0", details_text)
         textbox.configure(state="disabled")
 
-    def format_details(self, data):
-        text = f"IP Address: {data.get('ip', 'N/A')}\n"
-        text += f"Hostname:   {data.get('hostname', 'N/A')}\n"
-        text += f"MAC Address: {data.get('mac', 'N/A')}\n"
-        text += f"Fabricante: {data.get('vendor', 'N/A')}\n"
-        text += f"Status:     {data.get('status', {}).get('state', 'N/A').capitalize()}\n"
+    def format_details(self, data, detail: dict = None):
+        """Monta o texto de detalhes; detail é o blob completo do host, quando disponível."""
+        detail = detail or {}
+        text = f"IP Address: {data.ip}\n"
+        text += f"Hostname:   {data.hostname or 'N/A'}\n"
+        text += f"MAC Address: {data.mac or 'N/A'}\n"
+        text += f"Fabricante: {data.vendor or 'N/A'}\n"
+        if data.domain:
+            text += f"Domínio:    {data.domain}\n"
+        text += f"Status:     {(data.state or 'N/A').capitalize()}\n"
+        if data.rule:
+            text += f"Regra:      {data.rule} (confiança {data.confidence:.0%})\n"
+        if data.skipped:
+            text += f"Parcial:    etapas puladas: {', '.join(data.skipped)}\n"
         text += "-"*50 + "\n"
         
-        if data.get('shared_printers'):
+        if data.shared_printers:
             text += "IMPRESSORAS COMPARTILHADAS (via WMI):\n"
-            for printer in data['shared_printers']:
+            for printer in data.shared_printers:
                 text += f"  - Nome do Driver: {printer.get('Name', 'N/A')}\n"
                 text += f"    Nome do Compartilhamento: {printer.get('ShareName', 'N/A')}\n"
                 text += f"    Status do Dispositivo: {printer.get('Status', 'N/A')}\n"
             text += "-"*50 + "\n"
 
-        if 'tcp' in data:
+        pjl = detail.get('pjl') or data.pjl
+        if pjl:
+            text += "IMPRESSORA (via PJL):\n"
+            text += f"  - Modelo: {pjl.get('model', 'N/A')}\n"
+            text += f"    Status: {pjl.get('status', 'N/A')}\n"
+            if 'status_code' in pjl:
+                text += f"    Código PJL: {pjl['status_code']}\n"
+            text += "-"*50 + "\n"
+
+        web = detail.get('web') or data.web
+        if web:
+            text += f"SERVIDOR WEB ({web.get('scheme', 'http')}:{web.get('port', '')}):\n"
+            text += f"  - Título: {web.get('title') or 'N/A'}\n"
+            if web.get('model'):
+                text += f"    Modelo: {web['model']} (via {web.get('source_path', '/')})\n"
+            if web.get('server'):
+                text += f"    Servidor: {web['server']}\n"
+            text += "-"*50 + "\n"
+
+        smb = detail.get('smb') or data.smb
+        if smb:
+            text += "WINDOWS/SMB (desafio NTLM):\n"
+            text += f"  - Nome NetBIOS: {smb.get('netbios_name', 'N/A')}\n"
+            text += f"    Hostname DNS: {smb.get('dns_hostname', 'N/A')}\n"
+            text += f"    Domínio: {smb.get('dns_domain') or smb.get('netbios_domain', 'N/A')}\n"
+            if smb.get('os_version'):
+                text += f"    Versão do SO: {smb['os_version']}\n"
+            text += "-"*50 + "\n"
+
+        cert = detail.get('certificate') or data.certificate
+        if cert:
+            text += f"CERTIFICADO TLS (porta {cert.get('port', '')}):\n"
+            text += f"  - CN: {cert.get('common_name') or 'N/A'}\n"
+            text += f"    Organização: {cert.get('organization') or 'N/A'}\n"
+            if cert.get('san_dns'):
+                text += f"    SAN: {', '.join(cert['san_dns'])}\n"
+            text += "-"*50 + "\n"
+
+        nmap_data = detail.get('nmap') or {}
+        if nmap_data.get('osmatch'):
+            text += "SISTEMA OPERACIONAL (Nmap):\n"
+            for match in nmap_data['osmatch'][:3]:
+                text += f"  - {match.get('name', 'N/A')} ({match.get('accuracy', '?')}%)\n"
+            text += "-"*50 + "\n"
+
+        if nmap_data.get('tcp'):
+            text += "PORTAS E SERVIÇOS ABERTOS:\n"
+            for port, info in sorted(nmap_data['tcp'].items(), key=lambda item: int(item[0])):
+                service = " ".join(filter(None, (info.get('product'), info.get('version'), info.get('extrainfo'))))
+                text += f"  - Porta {port}/{info.get('state', '')}: {info.get('name', '')} ({service})\n"
+            text += "-"*50 + "\n"
+        elif data.ports:
             text += "PORTAS E SERVIÇOS ABERTOS:\n"
-            for port, info in data['tcp'].items():
-                product = info.get('product', '')
-                version = info.get('version', '')
-                name = info.get('name', '')
-                text += f"  - Porta {port}/{info['state']}: {name} ({product} {version})\n".strip()
+            for port, state, name, product, version in data.iter_ports():
+                service = f"{product} {version}".strip()
+                text += f"  - Porta {port}/{state}: {name} ({service})\n"
             text += "-"*50 + "\n"
 
         return text
\ No newline at end of file
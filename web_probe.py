@@ -0,0 +1,330 @@
+# web_probe.py
+import asyncio
+import html
+import re
+import ssl
+from typing import Dict, List, Optional, Tuple
+
+from probe_runtime import ProbeLimiter, run_probe
+from scan_cache import AsyncScanCache
+
+
+# Portas web escaneadas e se usam TLS
+WEB_PORTS = {80: False, 443: True}
+
+CONNECT_TIMEOUT = 2.0
+REQUEST_TIMEOUT = 3.0
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+
+# Conexões ociosas mantidas por host (keep-alive)
+MAX_IDLE_PER_HOST = 2
+
+# Caminhos de status por fabricante, consultados depois da página inicial.
+# A chave é o fabricante detectado no título/cabeçalho Server da página inicial.
+VENDOR_STATUS_PATHS = {
+    'Hewlett-Packard': ['/DevMgmt/ProductConfigDyn.xml', '/hp/device/DeviceInformation/View'],
+    'Brother': ['/general/information.html'],
+    'Canon': ['/rps/', '/m_top.cgi'],
+    'Epson': ['/PRESENTATION/ADVANCED/INFO_PRTINFO/TOP'],
+    'Kyocera': ['/js/jssrc/model/startwlm/Hme_DvcSts.model.htm'],
+    'Lexmark': ['/cgi-bin/dynamic/printer/config/reports/deviceinfo.html'],
+    'Ricoh': ['/web/guest/en/websys/webArch/getStatus.cgi'],
+    'Xerox': ['/header.php', '/properties/description.dhtml'],
+    'Samsung': ['/sws/app/information/home/home.json'],
+}
+
+# Palavras-chave que indicam o servidor web embutido de uma impressora
+PRINTER_WEB_KEYWORDS = {
+    'laserjet': 'Hewlett-Packard', 'officejet': 'Hewlett-Packard', 'deskjet': 'Hewlett-Packard',
+    'hp http server': 'Hewlett-Packard', 'hp embedded web server': 'Hewlett-Packard',
+    'imagerunner': 'Canon', 'canon http server': 'Canon', 'imageclass': 'Canon', 'pixma': 'Canon',
+    'epson': 'Epson', 'brother': 'Brother', 'kyocera': 'Kyocera', 'ecosys': 'Kyocera',
+    'command center': 'Kyocera', 'lexmark': 'Lexmark', 'ricoh': 'Ricoh', 'aficio': 'Ricoh',
+    'web image monitor': 'Ricoh', 'xerox': 'Xerox', 'workcentre': 'Xerox', 'versalink': 'Xerox',
+    'syncthru': 'Samsung', 'bizhub': 'Konica Minolta', 'sharp': 'Sharp', 'oki': 'OKI',
+    'jetdirect': 'Hewlett-Packard', 'printer': '', 'impressora': '', 'mfp': '',
+}
+
+_TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+_MODEL_TAG_RE = re.compile(
+    rb'<(?:[\w-]+:)?(MakeAndModel|ModelName|ProductName|model|modelName)>\s*([^<]{2,120}?)\s*</',
+    re.IGNORECASE
+)
+_KEYWORD_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(k) for k in sorted(PRINTER_WEB_KEYWORDS, key=len, reverse=True)) + r')\b'
+)
+
+_limiter = ProbeLimiter(global_limit=48, per_host_limit=2)
+_cache = AsyncScanCache("web")
+
+
+def insecure_tls_context() -> ssl.SSLContext:
+    """
+    Cria um contexto TLS que aceita certificados autoassinados e protocolos antigos.
+
+    Servidores embutidos de impressoras raramente têm certificados válidos, e aqui
+    só queremos ler informações públicas do dispositivo.
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    try:
+        context.minimum_version = ssl.TLSVersion.TLSv1
+        context.set_ciphers('DEFAULT:@SECLEVEL=0')
+    except (ValueError, ssl.SSLError):
+        pass
+    return context
+
+
+_TLS_CONTEXT = insecure_tls_context()
+
+
+class HttpConnectionPool:
+    """
+    Pool de conexões HTTP/1.1 keep-alive por host.
+
+    Deve ser usado a partir do loop compartilhado (ProbeLoop). As conexões
+    ociosas são reaproveitadas entre as requisições ao mesmo host e porta.
+    """
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST):
+        self.max_idle_per_host = max_idle_per_host
+        self._idle: Dict[Tuple[str, int, bool], List[tuple]] = {}
+
+    async def acquire(self, host: str, port: int, use_tls: bool, timeout: float):
+        """Retorna uma conexão ociosa do host ou abre uma nova."""
+        idle = self._idle.get((host, port, use_tls), [])
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+
+        return await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=_TLS_CONTEXT if use_tls else None,
+                                    server_hostname='' if use_tls else None),
+            timeout
+        )
+
+    def release(self, host: str, port: int, use_tls: bool, conn: tuple, reusable: bool):
+        """Devolve a conexão ao pool ou a fecha se não puder ser reaproveitada."""
+        reader, writer = conn
+        idle = self._idle.setdefault((host, port, use_tls), [])
+        if reusable and not writer.is_closing() and len(idle) < self.max_idle_per_host:
+            idle.append(conn)
+            return
+        writer.close()
+
+    def close_host(self, host: str):
+        """Fecha todas as conexões ociosas de um host."""
+        for key in [k for k in self._idle if k[0] == host]:
+            for _, writer in self._idle.pop(key):
+                writer.close()
+
+
+_pool = HttpConnectionPool()
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> Tuple[bytes, bool]:
+    """Lê o corpo da resposta respeitando MAX_BODY_BYTES. Retorna (corpo, reaproveitável)."""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        body = b""
+        while True:
+            size_line = await reader.readline()
+            try:
+                size = int(size_line.split(b';')[0].strip() or b'0', 16)
+            except ValueError:
+                return body, False
+            if size == 0:
+                await reader.readline()
+                return body, True
+            if len(body) + size > MAX_BODY_BYTES:
+                body += await reader.read(MAX_BODY_BYTES - len(body))
+                return body, False
+            body += await reader.readexactly(size)
+            await reader.readline()
+
+    if 'content-length' in headers:
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            return b"", False
+        if length > MAX_BODY_BYTES:
+            return await reader.read(MAX_BODY_BYTES), False
+        return await reader.readexactly(length), True
+
+    # Sem tamanho declarado: lê até o servidor fechar a conexão
+    body = b""
+    while len(body) < MAX_BODY_BYTES:
+        chunk = await reader.read(MAX_BODY_BYTES - len(body))
+        if not chunk:
+            break
+        body += chunk
+    return body, False
+
+
+async def http_get(host: str, port: int, path: str, use_tls: bool,
+                   timeout: float = REQUEST_TIMEOUT) -> Optional[Dict[str, object]]:
+    """
+    Faz um GET limitado em tempo e tamanho usando o pool de conexões.
+
+    Args:
+        host (str): Endereço IP do host
+        port (int): Porta do servidor web
+        path (str): Caminho requisitado
+        use_tls (bool): Se a conexão usa HTTPS
+        timeout (float): Prazo total da requisição
+
+    Returns:
+        dict | None: 'status', 'headers' e 'body' ou None em caso de falha
+    """
+    try:
+        conn = await _pool.acquire(host, port, use_tls, CONNECT_TIMEOUT)
+    except (OSError, ssl.SSLError, asyncio.TimeoutError):
+        return None
+
+    reader, writer = conn
+    reusable = False
+    try:
+        request = (f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+                   "User-Agent: Mozilla/5.0 (printer-finder)\r\n"
+                   "Accept: */*\r\nConnection: keep-alive\r\n\r\n")
+        writer.write(request.encode('ascii'))
+
+        async def read_response():
+            head = await reader.readuntil(b"\r\n\r\n")
+            if len(head) > MAX_HEADER_BYTES:
+                raise ValueError("cabeçalho muito grande")
+            lines = head.decode('latin-1').split("\r\n")
+            parts = lines[0].split(' ', 2)
+            status = int(parts[1])
+            headers = {}
+            for line in lines[1:]:
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    headers[key.strip().lower()] = value.strip()
+            body, can_reuse = await _read_body(reader, headers)
+            if headers.get('connection', '').lower() == 'close':
+                can_reuse = False
+            return status, headers, body, can_reuse
+
+        await writer.drain()
+        status, headers, body, reusable = await asyncio.wait_for(read_response(), timeout)
+        return {'status': status, 'headers': headers, 'body': body}
+    except (OSError, ssl.SSLError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError, ValueError, IndexError):
+        return None
+    finally:
+        _pool.release(host, port, use_tls, conn, reusable)
+
+
+def _clean_text(raw: bytes) -> str:
+    text = html.unescape(raw.decode('utf-8', errors='replace'))
+    return ' '.join(text.split())
+
+
+def extract_page_info(response: Dict[str, object]) -> Dict[str, str]:
+    """
+    Extrai título, modelo e fabricante de uma resposta HTTP.
+
+    Args:
+        response (dict): Resposta retornada por http_get
+
+    Returns:
+        dict: Campos 'title', 'model', 'server', 'vendor' e 'is_printer'
+    """
+    body = response.get('body', b'')
+    server = response.get('headers', {}).get('server', '')
+    info = {'title': '', 'model': '', 'server': server, 'vendor': '', 'is_printer': False}
+
+    match = _TITLE_RE.search(body)
+    if match:
+        info['title'] = _clean_text(match.group(1))[:200]
+
+    match = _MODEL_TAG_RE.search(body)
+    if match:
+        info['model'] = _clean_text(match.group(2))
+
+    haystack = f"{info['title']} {info['model']} {server}".lower()
+    for keyword in _KEYWORD_RE.findall(haystack):
+        info['is_printer'] = True
+        if PRINTER_WEB_KEYWORDS[keyword] and not info['vendor']:
+            info['vendor'] = PRINTER_WEB_KEYWORDS[keyword]
+
+    return info
+
+
+async def _probe_web_uncached(ip: str, port: int, use_tls: bool) -> Optional[Dict[str, object]]:
+    """Lê a página inicial e, se um fabricante for reconhecido, os caminhos de status dele."""
+    async with _limiter.slot(ip):
+        try:
+            response = await http_get(ip, port, '/', use_tls)
+            if not response:
+                return None
+
+            result = extract_page_info(response)
+            result.update({'port': port, 'scheme': 'https' if use_tls else 'http',
+                           'http_status': response['status'], 'source_path': '/'})
+
+            for path in VENDOR_STATUS_PATHS.get(result['vendor'], []):
+                if result['model']:
+                    break
+                status_response = await http_get(ip, port, path, use_tls)
+                if not status_response or status_response['status'] != 200:
+                    continue
+                page = extract_page_info(status_response)
+                if page['model'] or (page['is_printer'] and page['title']):
+                    result['model'] = page['model'] or page['title']
+                    result['source_path'] = path
+                    result['is_printer'] = True
+        finally:
+            _pool.close_host(ip)
+
+    if not result['model'] and result['is_printer']:
+        result['model'] = result['title']
+    return result
+
+
+async def probe_web(ip: str, port: int, use_tls: bool) -> Optional[Dict[str, object]]:
+    """
+    Coleta título e modelo do servidor web de um host (com cache por scan).
+
+    Args:
+        ip (str): Endereço IP do host
+        port (int): Porta do servidor web
+        use_tls (bool): Se a porta usa HTTPS
+
+    Returns:
+        dict | None: Informações da página ou None se o servidor não respondeu
+    """
+    return await _cache.get_or_fetch((ip, port), lambda: _probe_web_uncached(ip, port, use_tls))
+
+
+async def _probe_open_web_ports(ip: str, ports: List[int]) -> Optional[Dict[str, object]]:
+    fallback = None
+    for port in ports:
+        info = await probe_web(ip, port, WEB_PORTS[port])
+        if info and info['is_printer']:
+            return info
+        fallback = fallback or info
+    return fallback
+
+
+def get_web_info(ip: str, tcp_ports: dict) -> Optional[Dict[str, object]]:
+    """
+    Versão síncrona para as threads de scan: consulta as portas web abertas do host.
+
+    Args:
+        ip (str): Endereço IP do host
+        tcp_ports (dict): Portas TCP retornadas pelo Nmap
+
+    Returns:
+        dict | None: Informações da primeira página que identificou uma impressora
+                     (ou da primeira que respondeu), None se nenhuma respondeu
+    """
+    ports = [port for port in WEB_PORTS if tcp_ports.get(port, {}).get('state') == 'open']
+    if not ports:
+        return None
+    budget = len(ports) * (CONNECT_TIMEOUT + REQUEST_TIMEOUT) * (1 + 2) + 10
+    return run_probe(_probe_open_web_ports(ip, ports), timeout=budget)